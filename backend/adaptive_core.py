@@ -12,6 +12,13 @@ import hashlib
 import difflib
 from datetime import datetime
 from backend.gemini_manager import IR_POOL
+from backend.llm_schemas import IR_STEP_LIST_SCHEMA, MAX_TOKENS
+from backend.json_repair import repair_json
+from backend.model_cascade import cascade_ask
+from backend.prompt_compact import for_ir
+from backend.log import get_logger
+
+log = get_logger(__name__)
 
 # 🗂️ Adaptive memory folder
 ADAPTIVE_DIR = os.path.join(os.path.dirname(__file__), "adaptive_memory")
@@ -22,22 +29,11 @@ os.makedirs(ADAPTIVE_DIR, exist_ok=True)
 # 🔹 Safe JSON parsing for LLM responses
 # ------------------------------------------------
 def safe_json_parse(text):
-    """Parse model text to JSON safely."""
-    import re
-
+    """Parse model text to a JSON step list safely."""
     try:
-        cleaned = text.strip()
-        cleaned = re.sub(r"^```[a-zA-Z]*", "", cleaned)
-        cleaned = re.sub(r"```$", "", cleaned)
-        cleaned = cleaned.strip()
-
-        match = re.search(r"\[.*\]", cleaned, re.DOTALL)
-        if match:
-            cleaned = match.group(0)
-
-        return json.loads(cleaned)
+        return repair_json(text, expect="array")
     except Exception as e:
-        print(f"[AIM] ⚠️ Could not parse IR JSON → {e}")
+        log.warning("[AIM] ⚠️ Could not parse IR JSON → %s", e)
         return [{"action": "note", "description": "Parse error in IR", "vars": {}}]
 
 
@@ -62,7 +58,7 @@ def save_adaptive_patch(concept, code, ir_steps, rating=None, meta=None):
     with open(path, "a", encoding="utf-8") as f:
         f.write(json.dumps(record) + "\n")
 
-    print(f"[AIM] ✅ Saved adaptive {concept} patch → {path}")
+    log.info("[AIM] ✅ Saved adaptive %s patch → %s", concept, path)
 
 
 # ------------------------------------------------
@@ -80,13 +76,13 @@ def get_best_patch(concept, code, min_rating=3):
         with open(path, "r", encoding="utf-8") as f:
             records = [json.loads(l) for l in f if l.strip()]
     except Exception as e:
-        print(f"[AIM] ⚠️ Could not read adaptive patches for {concept} → {e}")
+        log.warning("[AIM] ⚠️ Could not read adaptive patches for %s → %s", concept, e)
         return None
 
     # 🔹 Try exact hash match first
     for r in records:
         if r["pattern_hash"] == sig and r.get("rating", 0) >= min_rating:
-            print(f"[AIM] 🎯 Using cached {concept} animation (exact hash match)")
+            log.info("[AIM] 🎯 Using cached %s animation (exact hash match)", concept)
             return r
 
     # 🔹 Fuzzy match fallback
@@ -96,7 +92,7 @@ def get_best_patch(concept, code, min_rating=3):
         default=None,
     )
     if best and best.get("rating", 0) >= min_rating:
-        print(f"[AIM] 🪄 Using similar {concept} animation (fuzzy match)")
+        log.info("[AIM] 🪄 Using similar %s animation (fuzzy match)", concept)
         return best
 
     return None
@@ -126,7 +122,7 @@ def clean_ir_steps(steps):
 # ------------------------------------------------
 def learn_missing_logic(code, concept="generic"):
     """Learn or reuse animation IR adaptively."""
-    print(f"[AIM] 🚀 Learning missing logic for {concept}")
+    log.info("[AIM] 🚀 Learning missing logic for %s", concept)
 
     # 🧠 Step 1 — try to reuse best-rated patch
     cached = get_best_patch(concept, code)
@@ -139,17 +135,20 @@ def learn_missing_logic(code, concept="generic"):
     Analyze this {concept}-related Python code and output JSON with steps.
     Each step must include: action, description, vars.
     Code:
-    {code}
+    {for_ir(code, site="adaptive")}
     """
 
     try:
-        resp = IR_POOL.ask(prompt, hint="Generate missing IR for AlgoMap")
+        resp = cascade_ask(
+            IR_POOL, "adaptive", prompt, hint="Generate missing IR for AlgoMap",
+            schema=IR_STEP_LIST_SCHEMA, max_tokens=MAX_TOKENS["ir"],
+        )
         ir = safe_json_parse(resp)
         ir = clean_ir_steps(ir)
         save_adaptive_patch(concept, code, ir)
         return {"implementation": f"adaptive-{concept}", "steps": ir}
     except Exception as e:
-        print(f"[AIM] ❌ Learning failed → {e}")
+        log.warning("[AIM] ❌ Learning failed → %s", e)
         return {"implementation": f"fallback-{concept}", "steps": []}
 
 
@@ -158,6 +157,6 @@ def learn_missing_logic(code, concept="generic"):
 # ------------------------------------------------
 def record_user_feedback(concept, code, rating, meta=None):
     """Record rating feedback from frontend."""
-    print(f"[AIM] ⭐ Received feedback: {concept} rated {rating}/5")
+    log.info("[AIM] ⭐ Received feedback: %s rated %s/5", concept, rating)
     save_adaptive_patch(concept, code, meta.get("steps", []), rating, meta)
     return {"status": "ok", "message": "Feedback stored successfully"}
@@ -5,6 +5,9 @@
 # ==========================================================
 
 from backend.instrument_master import resolve_parent_animator
+from backend.log import get_logger
+
+log = get_logger(__name__)
 
 def borrow_animation(concept: str, steps: list, meta: dict = None):
     """
@@ -12,13 +15,13 @@ def borrow_animation(concept: str, steps: list, meta: dict = None):
     from Gemini’s IR and builds a lightweight motion plan.
     """
 
-    print(f"\n[BORROWER] 🎬 Borrowing animation for concept: {concept}")
+    log.debug("[BORROWER] 🎬 Borrowing animation for concept: %s", concept)
     c = (concept or "").lower()
     mk = (meta.get("kind", "") if meta else "").lower()
 
     # Step 1. Resolve parent animator
     parent = resolve_parent_animator(concept, meta)
-    print(f"[BORROWER] 🧭 Parent resolved as: {parent}")
+    log.debug("[BORROWER] 🧭 Parent resolved as: %s", parent)
 
     # Step 2. Intelligent map (supports circular & doubly cases)
     if "circular" in c or "circular" in mk:
@@ -49,7 +52,7 @@ def borrow_animation(concept: str, steps: list, meta: dict = None):
     else:
         borrowed_animator = "GenericAIAnimator"
 
-    print(f"[BORROWER] ✅ Selected animator: {borrowed_animator}")
+    log.debug("[BORROWER] ✅ Selected animator: %s", borrowed_animator)
 
     # Step 3. Build generic motion list
     generic_motions = []
@@ -71,5 +74,5 @@ def borrow_animation(concept: str, steps: list, meta: dict = None):
 
         generic_motions.append(motion)
 
-    print(f"[BORROWER] 🧩 Generated {len(generic_motions)} generic motions.")
+    log.debug("[BORROWER] 🧩 Generated %s generic motions.", len(generic_motions))
     return borrowed_animator, generic_motions
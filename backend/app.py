@@ -4,35 +4,66 @@ import re
 import json
 import tempfile
 import time
-from flask import Flask, request, jsonify
+from backend.startup_report import BOOT_TIMER
+from backend.log import get_logger, lazy_json, stats as log_stats
+
+BOOT_TIMER.install()   # time every import below (printed once the app is wired up)
+
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import google.generativeai as genai
-import requests
 
 # ✅ Corrected imports with backend prefix
-from backend.gemini_manager import DETECT_POOL, IR_POOL, ANIMATE_POOL, GeminiKeyManager
-from backend.instrument_sort import translate_sort_from_code
+from backend.gemini_manager import DETECT_POOL, IR_POOL, ANIMATE_POOL, endpoint_url
 from backend.instrument_master import translate_ir, resolve_parent_animator, merge_all_segments
-from backend.fallback_reconstruct import reconstruct_with_gemini, generate_animation_plan
-from backend.instrument_graph import translate_graph_ir
+from backend.fallback_reconstruct import reconstruct_with_gemini, iter_reconstruct_with_gemini, generate_animation_plan
 from backend.complexity_checker import analyze_complexity
+from backend.gemini_cache import RESPONSE_CACHE
+from backend.gemini_cassette import CASSETTE
+from backend.gemini_http import pooled_post, format_timing, http_stats
+from backend.speculative_gates import SPECULATIVE_GATES, SPEC_STATS, speculative_detect
+from backend.singleflight import TRANSLATE_FLIGHT, FLIGHT_STATS, request_key
+from backend.detect_mode import local_pregate, PREGATE_STATS
+from backend.llm_schemas import GATE1_SCHEMA, GATE2_SCHEMA, MAX_TOKENS
+from backend.json_repair import REPAIR_STATS
+from backend.deadline import Deadline
+from backend.prompt_compact import PROMPT_STATS
+from backend.prompt_prefix import prefix_snapshot
+from backend.concept_gates import (
+    gate1_prompt, parse_gate1, gate1_failed, gate2_prompt, parse_gate2, gate2_failed, merge_gate2,
+)
+from backend.model_cascade import cascade_ask, final_model, CASCADE_STATS
+from backend.debug_capture import DEBUG_CAPTURE
+from backend.fast_json import encode_payload, dumps as fast_dumps, WIRE_STATS
+from backend.step_delta import requested_encoding, encode_payload_steps, encode_batch_steps
+from backend.internal_access import internal_allowed
+
+log = get_logger(__name__)
 
-# ✅ Initialize Gemini key manager
-gemini_keys = GeminiKeyManager()  # ✅ no arguments
+# ✅ Gemini key manager → the shared detection pool (one scheduler per process)
+gemini_keys = DETECT_POOL
 
 
 
 
+CORS_ORIGINS = [
+    "https://algomappppp.vercel.app",  # ✅ your deployed frontend
+    "http://localhost:5173"            # ✅ your local dev (optional)
+]
+
 app = Flask(__name__)
 CORS(
     app,
-    resources={r"/*": {"origins": [
-        "https://algomappppp.vercel.app",  # ✅ your deployed frontend
-        "http://localhost:5173"            # ✅ your local dev (optional)
-    ]}},
+    resources={r"^/(?!internal/).*": {"origins": CORS_ORIGINS}},   # /internal/* is never cross-origin
     supports_credentials=True
 )
 
+
+@app.before_request
+def guard_internal_routes():
+    """/internal/* → INTERNAL_TOKEN header or a loopback client only (backend/internal_access.py)."""
+    if not internal_allowed(request.path, request.headers, request.remote_addr):
+        return jsonify({"error": "forbidden"}), 403
+
 # -------------------------------------------------
 # 🧠 CONCEPT DETECTION PROMPTS (legacy templates)
 # -------------------------------------------------
@@ -69,27 +100,33 @@ CODE:
 {code}
 ```"""
 
-DEBUG_SAVE_PATH = os.path.join(os.getcwd(), "debug_cache.json")
-
 def save_debug_ir(payload: dict):
-    """Save last analyzed IR to a debug JSON file (auto-overwrites each time)."""
-    try:
-        with open(DEBUG_SAVE_PATH, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2, ensure_ascii=False)
-        print(f"🧾 [DEBUG SAVE] IR saved to {DEBUG_SAVE_PATH}")
-    except Exception as e:
-        print(f"⚠️ [DEBUG SAVE ERROR]: {e}")
-
-def call_gemini(prompt: str, model_name="gemini-2.0-flash") -> str:
-    """Send a prompt to Gemini and return its reply text."""
+    """Keep the analyzed IR in this worker's debug capture ring (see /internal/debug_captures)."""
+    capture_id = DEBUG_CAPTURE.capture(payload)
+    if capture_id is not None:
+        log.debug("🧾 [DEBUG SAVE] IR captured as #%s", capture_id)
+
+def json_response(payload, status=200):
+    """Translate payloads: FAST_JSON encoder + gzip / br when the client accepts it."""
+    body, encoding = encode_payload(payload, request.headers.get("Accept-Encoding", ""))
+    resp = Response(body, status=status, mimetype="application/json")
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+def call_gemini(prompt: str, model_name=None) -> str:
+    """Send a prompt to Gemini and return its reply text (model: the "chat" cascade site)."""
     try:
+        import google.generativeai as genai   # heavy SDK (grpc, protobuf) → loaded on first chat call
+        model_name = model_name or final_model("chat")
         key = gemini_keys.next_key()
         genai.configure(api_key=key)
         model = genai.GenerativeModel(model_name)
         response = model.generate_content(prompt)
         return response.text.strip()
     except Exception as e:
-        print("⚠️ [GEMINI ERROR]", e)
+        log.warning("⚠️ [GEMINI ERROR] %s", e)
         return f"Error: {e}"
 # =========================================================
 # 🧠 GEMINI CONCEPT + SUB-CONCEPT DETECTION (Enhanced v2)
@@ -111,82 +148,57 @@ def quiz():
     return jsonify({"reply": reply}), 200
 
 
-def llm_detect_concept_strict(code: str):
+def llm_detect_concept_strict(code: str, deadline=None):
     """Gate-1: detects only canonical DSA families; returns 'unknown' if uncertain."""
-    print("🔎 [GATE-1: STRICT] Sending code to Gemini (DSA-only)…")
-    detect_prompt = f"""
-    You are a **strict DSA concept detector** for the AlgoMap visualizer.
-    You must classify the student's Python code ONLY if it clearly belongs to one of these families:
-    [stack, queue, linkedlist, tree, graph, sorting, searching].
-    If the code does not belong to any of them with HIGH confidence,
-    output exactly "unknown" as concept.
-
-    Return JSON only:
-    {{
-      "concept": "<family or 'unknown'>",
-      "sub_concept": "<variant or ''>",
-      "explanation": "<1-2 line reasoning>"
-    }}
-
-    CODE:
-    ```python
-    {code}
-    ```"""
+    log.info("🔎 [GATE-1: STRICT] Sending code to Gemini (DSA-only)…")
     try:
-        text = DETECT_POOL.ask(detect_prompt, hint="gate1-strict")
-        clean = text.replace("```json", "").replace("```", "").strip()
-        data = json.loads(clean)
-        print("✅ [GATE-1 RESULT]", data)
-        data["concept"] = data.get("concept", "").lower().strip()
-        data["sub_concept"] = data.get("sub_concept", "").lower().strip()
-        if data["concept"] not in [
-            "stack","queue","linkedlist","tree","graph","sorting","searching"
-        ]:
-            data["concept"] = "unknown"
-        return data
+        return parse_gate1(cascade_ask(
+            DETECT_POOL, "gate1", gate1_prompt(code), hint="gate1-strict",
+            schema=GATE1_SCHEMA, max_tokens=MAX_TOKENS["gate1"], deadline=deadline,
+        ))
     except Exception as e:
-        print("⚠️ [GATE-1 ERROR]", e)
-        return {"concept": "unknown", "sub_concept": "", "explanation": str(e)}
+        return gate1_failed(e)
 
 
-def llm_detect_concept_unlimited(code: str):
+def llm_detect_concept_unlimited(code: str, deadline=None):
     """Gate-2: open Gemini; free to name any concept or idea."""
-    print("🧠 [GATE-2: OPEN] Triggered for unknown code…")
-    detect_prompt = f"""
-    You are an **open concept identifier** for the AlgoMap system.
-    Identify what the following Python code demonstrates — even if it is not a data-structure algorithm.
-    It can be OOP, recursion, hashing, string processing, file I/O, pattern printing, etc.
-
-    Return concise JSON:
-    {{
-      "concept": "<general concept>",
-      "explanation": "<short reasoning>"
-    }}
-
-    CODE:
-    ```python
-    {code}
-    ```"""
+    log.info("🧠 [GATE-2: OPEN] Triggered for unknown code…")
     try:
-        text = DETECT_POOL.ask(detect_prompt, hint="gate2-open")
-        clean = text.replace("```json", "").replace("```", "").strip()
-        data = json.loads(clean)
-        print("✅ [GATE-2 RESULT]", data)
-        return data
+        return parse_gate2(cascade_ask(
+            DETECT_POOL, "gate2", gate2_prompt(code), hint="gate2-open",
+            schema=GATE2_SCHEMA, max_tokens=MAX_TOKENS["gate2"], deadline=deadline,
+        ))
     except Exception as e:
-        print("⚠️ [GATE-2 ERROR]", e)
-        return {"concept": "unknown_general", "explanation": str(e)}
+        return gate2_failed(e)
+
+
+def llm_detect_concept(code: str, speculative: bool = False, deadline=None) -> dict:
+    """Gate-1, then Gate-2 if Gate-1 says unknown (or both at once when speculative).
+    Gate-2 is optional: it is dropped when the request deadline is nearly spent."""
+    if speculative and (deadline is None or deadline.allows("gate2")):
+        # 🎲 Gate-1 + Gate-2 in parallel; Gate-2 discarded if Gate-1 is canonical
+        return speculative_detect(
+            code,
+            lambda c: llm_detect_concept_strict(c, deadline),
+            lambda c: llm_detect_concept_unlimited(c, deadline),
+            merge_gate2,
+        )
+
+    # 🎯 Gate-1 strict classification
+    concept_result = llm_detect_concept_strict(code, deadline)
+
+    # 🔄 Gate-2 open reasoning if unknown
+    if concept_result.get("concept") == "unknown" and not speculative and (
+        deadline is None or deadline.allows("gate2")
+    ):
+        log.info("🔄 [CHAIN] Gate-1 returned unknown → triggering Gate-2 (open mode)")
+        merge_gate2(concept_result, llm_detect_concept_unlimited(code, deadline))
+    return concept_result
 
 
 
 def _print_steps_json(tag: str, payload):
-    import sys
-    print(f"\n===== {tag} =====")
-    try:
-        print(json.dumps(payload, ensure_ascii=False, indent=2))
-    except Exception as e:
-        print(f"(could not JSON-dump: {e})\n{payload!r}")
-    sys.stdout.flush()
+    log.debug("===== %s =====\n%s", tag, lazy_json(payload, indent=2))
 
 
 # -------------------------------------------------
@@ -251,12 +263,12 @@ def normalize_concept_family(concept: str, sub: str) -> str:
 
     # --- Queue family ---
     if "queue" in combo:
+        if "deque" in combo and "circular" in combo:
+            return "queue-circulardeque"
         if "circular" in combo:
             return "queue-circularqueue"
         if "priority" in combo:
             return "queue-priorityqueue"
-        if "deque" in combo and "circular" in combo:
-            return "queue-circulardeque"
         if "deque" in combo:
             return "queue-deque"
         return "queue-linearqueue"
@@ -307,44 +319,109 @@ def check_complexity():
     data = request.get_json(force=True) or {}
     code = (data.get("code") or "").strip()
     result = analyze_complexity(code)
-    print(f"🧩 [CHECKER] {result}")
+    log.debug("🧩 [CHECKER] %s", result)
     return jsonify(result), 200
 
 
+# -------------------------------------------------
+# translate_one pipeline stages (shared by the sync view and backend/async_pipeline.py)
+# -------------------------------------------------
+LOCAL_TRANSLATOR_CONCEPTS = [
+    "stack", "queue", "queue-linearqueue", "queue-priorityqueue",
+    "queue-circularqueue", "queue-deque", "queue-circular deque","queue-circulardeque",
+    "linkedlist", "linkedlist-singly", "linkedlist-doubly",
+    "linkedlist-circularsingly", "linkedlist-circulardoubly",
+    "tree", "bst", "avl", "redblack", "btree", "tree-btree",
+    "graph", "dfs", "bfs", "graph-bfs", "graph-dfs",
+    "sorting-bubble", "sorting-insertion", "sorting-selection",
+    "sorting-merge", "sorting-quick",
+]
+
+
+def build_segment_payload(code: str, full_concept: str, steps, meta) -> dict:
+    return {
+        "segments": [{
+            "idx": 1,
+            "concept": full_concept,
+            "code": code,
+            "steps": steps,
+            "meta": meta,
+            "step_count": len(steps),
+        }]
+    }
+
+
+def translate_local(code: str, concept: str, sub_concept: str, full_concept: str, skip_refine: bool = False,
+                    deadline=None) -> dict:
+    """Run the local instrumentor for a known concept family → {steps, meta}."""
+    log.debug("🧩 [ROUTE] Using local instrumentor → %s", resolve_known_animator(full_concept))
+    log.debug("💡 incoming concept: '%s'", full_concept)  # ✅ use normalized name here!
+
+    if full_concept in ["graph", "dfs", "bfs"]:
+        from backend.instrument_graph import translate_graph_ir
+        return translate_graph_ir(code, variant=sub_concept or concept)
+    if concept == "sorting" or concept == "sort" or full_concept.startswith("sorting-"):
+        from backend.instrument_sort import translate_sort_from_code
+        return translate_sort_from_code(code)
+    return translate_ir(full_concept, code, skip_refine=skip_refine, deadline=deadline)  # ✅ normalized
+
+
 @app.post("/translate_one")
 def translate_one():
-    import time
-    start_total = time.time()  # 🕒 Start overall timer
-
     data = request.get_json(force=True) or {}
+    try:
+        step_encoding = requested_encoding(data)   # "step_encoding": "delta" → keyframe + delta steps
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     code = (data.get("code") or "").strip()
     if not code:
-        return jsonify({"segments": [], "summary": {"note": "empty code"}}), 200
+        return json_response({"segments": [], "summary": {"note": "empty code"}})
+
+    # 🤝 identical in-flight requests (same code + options + deadline bucket) share one pipeline run
+    speculative = bool(data.get("speculative", SPECULATIVE_GATES))
+    deadline = Deadline.from_request(data)
+    payload, _ = TRANSLATE_FLIGHT.do(
+        request_key(code, speculative=speculative, deadline=deadline.bucket()),
+        lambda: run_translate_one(code, speculative, deadline=deadline),
+        wait=deadline.remaining(),
+    )
+    if step_encoding:
+        payload = encode_payload_steps(payload, step_encoding)
+    return json_response(payload)
 
-    # 1️⃣ Concept detection
-    t0 = time.time()
-    # 🎯 Gate-1 strict classification
-    concept_result = llm_detect_concept_strict(code)
 
-    # 🔄 Gate-2 open reasoning if unknown
-    if concept_result.get("concept") == "unknown":
-        print("🔄 [CHAIN] Gate-1 returned unknown → triggering Gate-2 (open mode)")
-        gate2 = llm_detect_concept_unlimited(code)
-        # merge reasoning for display
-        concept_result["explanation"] = (
-            concept_result.get("explanation","") + " | " +
-            gate2.get("explanation","")
-        )
-        # record secondary label for GenericAIAnimator
-        concept_result["meta_alt_concept"] = gate2.get("concept","")
+def run_translate_one(code: str, speculative: bool, concept_result: dict = None, deadline=None) -> dict:
+    """Detection → local translator or Gemini fallback → segment payload."""
+    for event in iter_translate_one(code, speculative, concept_result=concept_result, deadline=deadline):
+        if event["event"] == "payload":
+            return event["payload"]
 
-    print(f"⏱️ [TIMER] llm_detect_concept → {time.time() - t0:.2f}s")
+
+def iter_translate_one(code: str, speculative: bool, stream_steps: bool = False, concept_result: dict = None,
+                       deadline=None):
+    """
+    The translate_one pipeline as events: concept → (step …) → payload.
+    With stream_steps, the Gemini fallback streams its IR and every finished step
+    is yielded before the final (authoritative) payload. A precomputed
+    concept_result (e.g. from batched Gate-1) skips detection. Every Gemini hop is
+    bounded by `deadline` (server default when None); optional stages are skipped
+    once it runs low and the payload reports what was skipped.
+    """
+    start_total = time.time()  # 🕒 Start overall timer
+    deadline = deadline or Deadline()
+
+    # 1️⃣ Concept detection (⚡ confident local guess → no Gemini gate at all)
+    if concept_result is None:
+        t0 = time.time()
+        concept_result = local_pregate(code) or llm_detect_concept(code, speculative, deadline)
+        log.info("⏱️ [TIMER] llm_detect_concept → %.2fs", time.time() - t0)
 
     concept = concept_result.get("concept", "unknown").lower().strip()
     sub_concept = concept_result.get("sub_concept", "").lower().strip()
     full_concept = normalize_concept_family(concept, sub_concept)
 
     explanation = concept_result.get("explanation", "")
+    yield {"event": "concept", "concept": full_concept, "sub_concept": sub_concept, "explanation": explanation}
 
     # full_concept = concept
 
@@ -352,84 +429,109 @@ def translate_one():
 
     # 🚀 Fast shortcut for sorting
     if concept in ["sorting", "sort"]:
-        print("🧩 [FAST-PATH] Sorting detected → translate_sort_from_code()")
+        log.info("🧩 [FAST-PATH] Sorting detected → translate_sort_from_code()")
+        from backend.instrument_sort import translate_sort_from_code
         res = translate_sort_from_code(code)
-        payload = {
-            "segments": [{
-                "idx": 1,
-                "concept": full_concept,
-                "code": code,
-                "steps": res.get("steps", []),
-                "meta": res.get("meta", {}),
-                "step_count": len(res.get("steps", [])),
-            }]
-        }
+        payload = build_segment_payload(code, full_concept, res.get("steps", []), res.get("meta", {}))
+        payload["deadline"] = deadline.report()
         save_debug_ir(payload)
-        print(f"⏱️ [TIMER] TOTAL translate_one → {time.time() - start_total:.2f}s\n")
-        return jsonify(payload), 200
+        log.info("⏱️ [TIMER] TOTAL translate_one → %.2fs", time.time() - start_total)
+        yield {"event": "payload", "payload": payload}
+        return
 
     # 2️⃣ Translation or fallback
     t1 = time.time()
     try:
-        if full_concept in [
-            "stack", "queue", "queue-linearqueue", "queue-priorityqueue",
-            "queue-circularqueue", "queue-deque", "queue-circular deque","queue-circulardeque",
-            "linkedlist", "linkedlist-singly", "linkedlist-doubly",
-            "linkedlist-circularsingly", "linkedlist-circulardoubly",
-            "tree", "bst", "avl", "redblack", "btree", "tree-btree",
-            "graph", "dfs", "bfs", "graph-bfs", "graph-dfs",
-            "sorting-bubble", "sorting-insertion", "sorting-selection",
-            "sorting-merge", "sorting-quick",
-        ]:
-            print(f"🧩 [ROUTE] Using local instrumentor → {resolve_known_animator(full_concept)}")
-            print(f"💡 incoming concept: '{full_concept}'")  # ✅ use normalized name here!
-
-            if full_concept in ["graph", "dfs", "bfs"]:
-                res = translate_graph_ir(code, variant=sub_concept or concept)
-            elif concept == "sorting" or concept == "sort" or full_concept.startswith("sorting-"):
-                res = translate_sort_from_code(code)
-            else:
-                res = translate_ir(full_concept, code)  # ✅ normalized
-
+        if full_concept in LOCAL_TRANSLATOR_CONCEPTS:
+            res = translate_local(code, concept, sub_concept, full_concept, deadline=deadline)
 
             # ✅ extract steps/meta only once here
             steps = res.get("steps", [])
             meta = res.get("meta", {})
 
+        elif stream_steps:
+            log.info("🌌 [AUTO-FALLBACK] Unknown concept → streaming from Gemini IR_POOL")
+            for event in iter_reconstruct_with_gemini(code, full_concept, deadline=deadline):
+                if event["event"] == "step":
+                    yield event
+                else:
+                    steps, meta = event["steps"], event["meta"]
+            meta.update({"animation_plan": generate_animation_plan(steps, full_concept, deadline=deadline)})
+
         else:
-            print("🌌 [AUTO-FALLBACK] Unknown concept → using Gemini IR_POOL")
-            steps, meta = reconstruct_with_gemini(code, full_concept)
-            animation_plan = generate_animation_plan(steps, full_concept)
+            log.info("🌌 [AUTO-FALLBACK] Unknown concept → using Gemini IR_POOL")
+            steps, meta = reconstruct_with_gemini(code, full_concept, deadline=deadline)
+            animation_plan = generate_animation_plan(steps, full_concept, deadline=deadline)
             meta.update({"animation_plan": animation_plan})
 
     except Exception as e:
-        print("❌ [TRANSLATE_ONE ERROR]", e)
+        log.warning("❌ [TRANSLATE_ONE ERROR] %s", e)
         explanation += f" | Exception: {e}"
         steps, meta = [], {"layout": "linear", "theme": "error"}
 
-    print(f"⏱️ [TIMER] translate_ir / fallback → {time.time() - t1:.2f}s")
+    log.info("⏱️ [TIMER] translate_ir / fallback → %.2fs", time.time() - t1)
 
     # 3️⃣ Postprocessing (sanitizer + filter)
     t2 = time.time()
     # (keep your existing btree sanitizer & duplicate filter here)
-    print(f"⏱️ [TIMER] postprocessing → {time.time() - t2:.2f}s")
+    log.info("⏱️ [TIMER] postprocessing → %.2fs", time.time() - t2)
 
     # 4️⃣ Build payload & debug save
-    payload = {
-        "segments": [{
-            "idx": 1,
-            "concept": full_concept,
-            "code": code,
-            "steps": steps,
-            "meta": meta,
-            "step_count": len(steps),
-        }]
-    }
+    payload = build_segment_payload(code, full_concept, steps, meta)
+    payload["deadline"] = deadline.report()
 
     save_debug_ir(payload)
-    print(f"⏱️ [TIMER] TOTAL translate_one → {time.time() - start_total:.2f}s\n")
+    log.info("⏱️ [TIMER] TOTAL translate_one → %.2fs", time.time() - start_total)
 
-    return jsonify(payload), 200
+    yield {"event": "payload", "payload": payload}
+
+
+@app.post("/translate_batch")
+def translate_batch():
+    """
+    Many programs in one call: local pre-gate, Gate-1 packed into multi-program prompts,
+    translators in parallel. Each item gets its own result or error.
+    """
+    from backend.batch_translate import run_translate_batch
+
+    data = request.get_json(force=True) or {}
+    programs = data.get("programs")
+    if not isinstance(programs, list):
+        return jsonify({"error": "'programs' must be a list of code strings or {id, code} objects"}), 400
+    try:
+        step_encoding = requested_encoding(data)
+        result = run_translate_batch(programs, speculative=bool(data.get("speculative", False)),
+                                     deadline=Deadline.from_request(data))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if step_encoding:
+        result = encode_batch_steps(result, step_encoding)
+    return json_response(result)
+
+
+@app.post("/translate_one/stream")
+def translate_one_stream():
+    """
+    NDJSON variant of /translate_one: one JSON event per line —
+    concept, then each IR step as Gemini finishes it (fallback path), then the payload.
+    """
+    data = request.get_json(force=True) or {}
+    code = (data.get("code") or "").strip()
+    speculative = bool(data.get("speculative", SPECULATIVE_GATES))
+    deadline = Deadline.from_request(data)
+
+    def generate():
+        if not code:
+            yield fast_dumps({"event": "payload", "payload": {"segments": [], "summary": {"note": "empty code"}}}) + b"\n"
+            return
+        for event in iter_translate_one(code, speculative, stream_steps=True, deadline=deadline):
+            yield fast_dumps(event) + b"\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # -------------------------------------------------
@@ -438,8 +540,13 @@ def translate_one():
 @app.post("/translate_sort_code")
 def translate_sort_code():
     data = request.get_json(force=True) or {}
+    try:
+        step_encoding = requested_encoding(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     code = (data.get("code") or "").strip()
     try:
+        from backend.instrument_sort import translate_sort_from_code
         res = translate_sort_from_code(code)
         algorithm = res.get("algorithm", "unknown")
         steps = res.get("steps", [])
@@ -474,9 +581,11 @@ def translate_sort_code():
         }
 
     except Exception as e:
-        print("❌ [APP-DEBUG] Sorting instrumentor error:", repr(e))
+        log.warning("❌ [APP-DEBUG] Sorting instrumentor error: %s", repr(e))
         payload = {"segments": [], "summary": {"error": str(e)}}
-    return jsonify(payload), 200
+    if step_encoding:
+        payload = encode_payload_steps(payload, step_encoding)
+    return json_response(payload)
 
 
 @app.post("/api/chat")
@@ -489,13 +598,153 @@ def chatbot_proxy():
         data = request.get_json(force=True)
         # 🔹 get the first key from your GEMINI_KEYS list
         api_key = os.getenv("GEMINI_KEYS", "").split(",")[0].strip()
-        url = f"https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent?key={api_key}"
+        url = f"{endpoint_url(model=final_model('chat'))}?key={api_key}"
 
-        r = requests.post(url, headers={"Content-Type": "application/json"}, data=json.dumps(data))
+        r = pooled_post(url, headers={"Content-Type": "application/json"}, data=json.dumps(data))
+        log.info("💬 [CHATBOT PROXY] ⏱️ %s", format_timing(r.timing))
         return (r.text, r.status_code, {"Content-Type": "application/json"})
     except Exception as e:
-        print("❌ [CHATBOT PROXY ERROR]", e)
+        log.warning("❌ [CHATBOT PROXY ERROR] %s", e)
         return jsonify({"error": {"message": str(e)}}), 500
+# -------------------------------------------------
+# Internal stats (guarded by guard_internal_routes)
+# -------------------------------------------------
+@app.get("/internal/gemini_cache")
+def gemini_cache_stats():
+    """Hit/miss counters + latency saved by the Gemini response cache."""
+    return jsonify(RESPONSE_CACHE.stats()), 200
+
+
+@app.get("/internal/key_pools")
+def key_pool_stats():
+    """Per-key scheduler state: rate budget, cooldowns, breaker status, in-flight calls."""
+    return jsonify({
+        "detect": DETECT_POOL.scheduler.snapshot(),
+        "ir": IR_POOL.scheduler.snapshot(),
+        "animate": ANIMATE_POOL.scheduler.snapshot(),
+    }), 200
+
+
+@app.get("/internal/key_telemetry")
+def key_telemetry_stats():
+    """Per-key call telemetry: requests, error classes, latency histogram, tokens, cooldown time."""
+    return jsonify({
+        "detect": DETECT_POOL.telemetry.snapshot(),
+        "ir": IR_POOL.telemetry.snapshot(),
+        "animate": ANIMATE_POOL.telemetry.snapshot(),
+    }), 200
+
+
+@app.get("/internal/startup")
+def startup_stats():
+    """Boot import times per module, modules loaded lazily since, and which key pools are built."""
+    return jsonify({
+        **BOOT_TIMER.snapshot(),
+        "pools_built": {"detect": DETECT_POOL.built, "ir": IR_POOL.built, "animate": ANIMATE_POOL.built},
+    }), 200
+
+
+@app.get("/internal/logging")
+def logging_stats():
+    """Log levels in effect, queued records and records dropped by the non-blocking handler."""
+    return jsonify(log_stats()), 200
+
+
+@app.get("/internal/debug_captures")
+def debug_captures():
+    """Recent payloads captured by this worker (newest first) + ring / persistence counters."""
+    return jsonify({**DEBUG_CAPTURE.snapshot(), "captures": DEBUG_CAPTURE.list()}), 200
+
+
+@app.get("/internal/debug_captures/<int:capture_id>")
+def debug_capture(capture_id):
+    """One captured payload in full."""
+    entry = DEBUG_CAPTURE.get(capture_id)
+    if entry is None:
+        return jsonify({"error": f"capture {capture_id} not held (evicted or never captured)"}), 404
+    return jsonify(entry), 200
+
+
+@app.post("/internal/debug_captures/dump")
+def debug_captures_dump():
+    """Write the whole ring to debug_captures.<pid>.json (DEBUG_CAPTURE_DIR, else the working dir)."""
+    try:
+        path = DEBUG_CAPTURE.dump()
+    except (OSError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"path": path, "captures": len(DEBUG_CAPTURE.list())}), 200
+
+
+@app.get("/internal/wire")
+def wire_stats():
+    """Translate response encoding: encoder in use, raw vs. compressed bytes and time per codec."""
+    return jsonify(WIRE_STATS.snapshot()), 200
+
+
+@app.get("/internal/hedging")
+def hedging_stats():
+    """Hedged Gemini calls per pool: adaptive delay, hedges fired / won, budget denials."""
+    return jsonify({
+        "detect": DETECT_POOL.hedger.snapshot(),
+        "ir": IR_POOL.hedger.snapshot(),
+        "animate": ANIMATE_POOL.hedger.snapshot(),
+    }), 200
+
+
+@app.get("/internal/pregate")
+def pregate_stats():
+    """How often the local classifier answered without a Gemini Gate-1 call."""
+    return jsonify(PREGATE_STATS.snapshot()), 200
+
+
+@app.get("/internal/singleflight")
+def singleflight_stats():
+    """Coalesced /translate_one requests: leaders vs. followers, wait timeouts, shared errors."""
+    return jsonify(FLIGHT_STATS.snapshot()), 200
+
+
+@app.get("/internal/speculation")
+def speculation_stats():
+    """Speculative Gate-2: wasted calls vs. latency saved."""
+    return jsonify(SPEC_STATS.snapshot()), 200
+
+
+@app.get("/internal/json_repair")
+def json_repair_stats():
+    """How often Gemini replies needed repair, and how many steps were salvaged from truncated ones."""
+    return jsonify(REPAIR_STATS.snapshot()), 200
+
+
+@app.get("/internal/prompts")
+def prompt_stats():
+    """Prompt compaction per call site: estimated tokens before / after, skeletons sent."""
+    return jsonify(PROMPT_STATS.snapshot()), 200
+
+
+@app.get("/internal/prompt_prefixes")
+def prompt_prefix_stats():
+    """Static prompt prefixes sent ahead of the variable part: owning pool + estimated tokens."""
+    return jsonify(prefix_snapshot()), 200
+
+
+@app.get("/internal/cascade")
+def cascade_stats():
+    """Model cascade per call site: calls, escalations, latency and estimated cost per tier."""
+    return jsonify(CASCADE_STATS.snapshot()), 200
+
+
+@app.get("/internal/cassette")
+def cassette_stats():
+    """Record / replay state of the Gemini cassette (GEMINI_CASSETTE)."""
+    return jsonify(CASSETTE.stats()), 200
+
+
+@app.get("/internal/gemini_http")
+def gemini_http_stats():
+    """Connection-pool reuse + connect / time-to-first-byte / total latency breakdown."""
+    return jsonify(http_stats()), 200
+
+
 # -------------------------------------------------
 # Ping
 # -------------------------------------------------
@@ -508,8 +757,10 @@ def home():
     return "AlgoMap Backend Live 🌟 (Smart Split OFF)"
 
 
+BOOT_TIMER.finish("backend.app")
+
 
 
 if __name__ == "__main__":
-    print("🚀 Starting AlgoMap Backend (Blessed Hybrid v3) on http://127.0.0.1:5000")
+    log.info("🚀 Starting AlgoMap Backend (Blessed Hybrid v3) on http://127.0.0.1:5000")
     app.run(host="127.0.0.1", port=int(os.getenv("PORT", 5000)), debug=True, use_reloader=True)
@@ -0,0 +1,90 @@
+# backend/asgi.py
+# ASGI mode for AlgoMap:
+#     uvicorn backend.asgi:app --host 0.0.0.0 --port $PORT --workers 2
+# POST /translate_one runs natively on the event loop (async Gemini pools), so one
+# worker holds hundreds of in-flight LLM calls. Every other route is served by the
+# Flask app through asgiref's WSGI adapter, unchanged.
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+from backend.app import app as flask_app, CORS_ORIGINS
+from backend.async_pipeline import translate_one_async
+from backend.gemini_async import aclose_client
+from backend.startup_report import BOOT_TIMER
+from backend.fast_json import encode_payload
+
+_flask_asgi = WsgiToAsgi(flask_app)
+BOOT_TIMER.finish("backend.asgi")
+
+ASYNC_ROUTES = {
+    ("POST", "/translate_one"): translate_one_async,
+}
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, scope, payload, status=200):
+    request_headers = dict(scope.get("headers") or [])
+    # same encoder + gzip / br negotiation as app.json_response
+    body, encoding = encode_payload(payload, request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    if encoding:
+        headers.append((b"content-encoding", encoding.encode()))
+    vary = [b"Accept-Encoding"]
+    # mirror Flask-CORS for the natively served routes
+    origin = request_headers.get(b"origin", b"").decode()
+    if origin in CORS_ORIGINS:
+        headers += [
+            (b"access-control-allow-origin", origin.encode()),
+            (b"access-control-allow-credentials", b"true"),
+        ]
+        vary.append(b"Origin")
+    headers.append((b"vary", b", ".join(vary)))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await aclose_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+
+    handler = ASYNC_ROUTES.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+    if handler is None:
+        await _flask_asgi(scope, receive, send)
+        return
+
+    raw = await _read_body(receive)
+    try:
+        data = json.loads(raw or b"{}") or {}
+    except ValueError as e:
+        await _send_json(send, scope, {"error": f"Invalid JSON body: {e}"}, 400)
+        return
+    if not isinstance(data, dict):
+        await _send_json(send, scope, {"error": f"JSON body must be an object, got {type(data).__name__}"}, 400)
+        return
+
+    payload, status = await handler(data)
+    await _send_json(send, scope, payload, status)
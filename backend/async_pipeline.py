@@ -0,0 +1,160 @@
+# backend/async_pipeline.py
+# Async translate_one path (ASGI mode) — same stages as app.translate_one, but every
+# Gemini hop awaits on the event loop instead of pinning a worker thread.
+import time
+import asyncio
+
+from backend.app import (
+    normalize_concept_family, build_segment_payload, translate_local, save_debug_ir, LOCAL_TRANSLATOR_CONCEPTS,
+)
+from backend.concept_gates import (
+    gate1_prompt, parse_gate1, gate1_failed, gate2_prompt, parse_gate2, gate2_failed, merge_gate2,
+)
+from backend.gemini_async import ASYNC_DETECT_POOL
+from backend.llm_schemas import GATE1_SCHEMA, GATE2_SCHEMA, MAX_TOKENS
+from backend.model_cascade import acascade_ask
+from backend.speculative_gates import SPECULATIVE_GATES, speculative_detect_async
+from backend.singleflight import ASYNC_TRANSLATE_FLIGHT, request_key
+from backend.detect_mode import local_pregate
+from backend.deadline import Deadline
+from backend.instrument_master import _merge_refined
+from backend.fallback_reconstruct import reconstruct_with_gemini_async, generate_animation_plan_async
+from backend.step_delta import requested_encoding, encode_payload_steps
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+
+# -------------------------------------------------
+# Async concept gates
+# -------------------------------------------------
+async def llm_detect_concept_strict_async(code: str, deadline=None):
+    """Gate-1 (async): canonical DSA families only, 'unknown' if uncertain."""
+    log.info("🔎 [GATE-1: STRICT/async] Sending code to Gemini (DSA-only)…")
+    try:
+        return parse_gate1(await acascade_ask(
+            ASYNC_DETECT_POOL, "gate1", gate1_prompt(code), hint="gate1-strict",
+            schema=GATE1_SCHEMA, max_tokens=MAX_TOKENS["gate1"], deadline=deadline,
+        ))
+    except Exception as e:
+        return gate1_failed(e)
+
+
+async def llm_detect_concept_unlimited_async(code: str, deadline=None):
+    """Gate-2 (async): open Gemini; free to name any concept."""
+    log.info("🧠 [GATE-2: OPEN/async] Triggered for unknown code…")
+    try:
+        return parse_gate2(await acascade_ask(
+            ASYNC_DETECT_POOL, "gate2", gate2_prompt(code), hint="gate2-open",
+            schema=GATE2_SCHEMA, max_tokens=MAX_TOKENS["gate2"], deadline=deadline,
+        ))
+    except Exception as e:
+        return gate2_failed(e)
+
+
+async def llm_detect_concept_async(code: str, speculative: bool = False, deadline=None) -> dict:
+    """Async twin of app.llm_detect_concept."""
+    if speculative and (deadline is None or deadline.allows("gate2")):
+        return await speculative_detect_async(
+            code,
+            lambda c: llm_detect_concept_strict_async(c, deadline),
+            lambda c: llm_detect_concept_unlimited_async(c, deadline),
+            merge_gate2,
+        )
+    concept_result = await llm_detect_concept_strict_async(code, deadline)
+    if concept_result.get("concept") == "unknown" and not speculative and (
+        deadline is None or deadline.allows("gate2")
+    ):
+        log.info("🔄 [CHAIN] Gate-1 returned unknown → triggering Gate-2 (open mode, async)")
+        merge_gate2(concept_result, await llm_detect_concept_unlimited_async(code, deadline))
+    return concept_result
+
+
+async def _refine_async(code: str, res: dict, deadline=None) -> dict:
+    """Run the Hybrid-Refiner call that translate_ir(skip_refine=True) deferred to us."""
+    concept = res.pop("refine_pending", None)
+    if not concept:
+        return res
+    log.info("[MASTER] ✨ Refining %s IR via Gemini (hybrid mode, async)…", concept)
+    refined_steps, refined_meta = await reconstruct_with_gemini_async(
+        code,
+        concept,
+        local_ir={"steps": res.get("steps", []), "meta": res.get("meta", {})},
+        deadline=deadline,
+    )
+    return _merge_refined(res, concept, refined_steps, refined_meta)
+
+
+# -------------------------------------------------
+# Async translate_one
+# -------------------------------------------------
+async def translate_one_async(data: dict):
+    """Returns (payload, status) — mirrors the Flask translate_one view."""
+    try:
+        step_encoding = requested_encoding(data)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    code = (data.get("code") or "").strip()
+    if not code:
+        return {"segments": [], "summary": {"note": "empty code"}}, 200
+
+    # 🤝 identical in-flight requests (same code + options + deadline bucket) share one pipeline run
+    speculative = bool(data.get("speculative", SPECULATIVE_GATES))
+    deadline = Deadline.from_request(data)
+    payload, _ = await ASYNC_TRANSLATE_FLIGHT.do(
+        request_key(code, speculative=speculative, deadline=deadline.bucket()),
+        lambda: run_translate_one_async(code, speculative, deadline),
+        wait=deadline.remaining(),
+    )
+    if step_encoding:
+        payload = encode_payload_steps(payload, step_encoding)
+    return payload, 200
+
+
+async def run_translate_one_async(code: str, speculative: bool, deadline=None) -> dict:
+    """Async twin of app.run_translate_one."""
+    start_total = time.time()
+    deadline = deadline or Deadline()
+
+    # 1️⃣ Concept detection (⚡ confident local guess → no Gemini gate at all)
+    t0 = time.time()
+    concept_result = local_pregate(code) or await llm_detect_concept_async(code, speculative, deadline)
+    log.info("⏱️ [TIMER] llm_detect_concept (async) → %.2fs", time.time() - t0)
+
+    concept = concept_result.get("concept", "unknown").lower().strip()
+    sub_concept = concept_result.get("sub_concept", "").lower().strip()
+    full_concept = normalize_concept_family(concept, sub_concept)
+
+    # 🚀 Fast shortcut for sorting
+    if concept in ["sorting", "sort"]:
+        from backend.instrument_sort import translate_sort_from_code
+        res = await asyncio.to_thread(translate_sort_from_code, code)
+        payload = build_segment_payload(code, full_concept, res.get("steps", []), res.get("meta", {}))
+        payload["deadline"] = deadline.report()
+        save_debug_ir(payload)
+        log.info("⏱️ [TIMER] TOTAL translate_one (async) → %.2fs", time.time() - start_total)
+        return payload
+
+    # 2️⃣ Translation or fallback
+    t1 = time.time()
+    try:
+        if full_concept in LOCAL_TRANSLATOR_CONCEPTS:
+            # local instrumentors are CPU-only → worker thread; the Gemini refiner hop stays async
+            res = await asyncio.to_thread(translate_local, code, concept, sub_concept, full_concept, True, deadline)
+            res = await _refine_async(code, res, deadline)
+            steps = res.get("steps", [])
+            meta = res.get("meta", {})
+        else:
+            log.info("🌌 [AUTO-FALLBACK] Unknown concept → using Gemini IR_POOL (async)")
+            steps, meta = await reconstruct_with_gemini_async(code, full_concept, deadline=deadline)
+            meta.update({"animation_plan": await generate_animation_plan_async(steps, full_concept, deadline=deadline)})
+    except Exception as e:
+        log.warning("❌ [TRANSLATE_ONE ERROR] %s", e)
+        steps, meta = [], {"layout": "linear", "theme": "error"}
+    log.info("⏱️ [TIMER] translate_ir / fallback (async) → %.2fs", time.time() - t1)
+
+    payload = build_segment_payload(code, full_concept, steps, meta)
+    payload["deadline"] = deadline.report()
+    save_debug_ir(payload)
+    log.info("⏱️ [TIMER] TOTAL translate_one (async) → %.2fs", time.time() - start_total)
+    return payload
@@ -0,0 +1,199 @@
+# backend/batch_translate.py
+# /translate_batch — pre-generate visualizations for whole problem sets.
+# 1. duplicates collapse to one run (same request_key as singleflight)
+# 2. local pre-gate answers the confident ones without Gemini
+# 3. the rest share multi-program Gate-1 prompts (one DETECT_POOL call per chunk)
+# 4. Gate-2 / translators / IR fallback run per item on a thread pool
+# One Deadline (the request's deadline_ms) bounds the whole batch; each item also joins
+# /translate_one's singleflight, so a batch and single requests for one program share a run.
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.app import llm_detect_concept_unlimited, run_translate_one
+from backend.concept_gates import normalize_gate1, merge_gate2
+from backend.deadline import Deadline
+from backend.gemini_manager import DETECT_POOL
+from backend.llm_schemas import GATE1_BATCH_SCHEMA, MAX_TOKENS
+from backend.json_repair import repair_json
+from backend.model_cascade import cascade_ask
+from backend.prompt_compact import for_detection
+from backend.prompt_prefix import register_prefix, PrefixedPrompt
+from backend.detect_mode import local_pregate
+from backend.singleflight import TRANSLATE_FLIGHT, request_key
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+BATCH_GATE1_SIZE = int(os.getenv("BATCH_GATE1_SIZE", "20"))              # programs per Gate-1 prompt
+BATCH_GATE1_MAX_CHARS = int(os.getenv("BATCH_GATE1_MAX_CHARS", "24000"))  # code chars per Gate-1 prompt
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BATCH_WORKERS", "8")),
+    thread_name_prefix="translate-batch",
+)
+
+
+# -------------------------------------------------
+# Batched Gate-1
+# -------------------------------------------------
+GATE1_BATCH_PREFIX = register_prefix("gate1_batch", """
+    You are a **strict DSA concept detector** for the AlgoMap visualizer.
+    Classify EACH program below ONLY if it clearly belongs to one of these families:
+    [stack, queue, linkedlist, tree, graph, sorting, searching].
+    If a program does not belong to any of them with HIGH confidence,
+    use exactly "unknown" as its concept.
+
+    Return a JSON array only, one object per program:
+    [
+      {
+        "id": "<program id>",
+        "concept": "<family or 'unknown'>",
+        "sub_concept": "<variant or ''>",
+        "explanation": "<1 line reasoning>",
+        "confidence": <0.0-1.0>
+      }
+    ]
+""", DETECT_POOL)
+
+
+def _gate1_batch_prompt(items) -> str:
+    programs = "\n\n".join(
+        f"PROGRAM id={pid}:\n```python\n{for_detection(code, site='gate1_batch')}\n```" for pid, code in items
+    )
+    return PrefixedPrompt(GATE1_BATCH_PREFIX, f"""
+{programs}""")
+
+
+def _parse_gate1_batch(text: str) -> dict:
+    try:
+        rows = repair_json(text, expect="array")
+    except ValueError:
+        rows = []
+    out = {}
+    for row in rows if isinstance(rows, list) else []:
+        if isinstance(row, dict) and row.get("id") is not None:
+            out[str(row["id"])] = normalize_gate1(row)
+    return out
+
+
+def _chunk_for_gate1(items):
+    """Split [(id, code)] into prompts bounded by item count and code size."""
+    chunk, size = [], 0
+    for pid, code in items:
+        if chunk and (len(chunk) >= BATCH_GATE1_SIZE or size + len(code) > BATCH_GATE1_MAX_CHARS):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append((pid, code))
+        size += len(code)
+    if chunk:
+        yield chunk
+
+
+def _gate1_chunk(chunk, deadline=None) -> dict:
+    """One DETECT_POOL call for a whole chunk; {} on failure (items fall back to single Gate-1)."""
+    log.info("🔎 [GATE-1: BATCH] %s programs in one prompt…", len(chunk))
+    try:
+        return _parse_gate1_batch(cascade_ask(
+            DETECT_POOL, "gate1_batch", _gate1_batch_prompt(chunk), hint="gate1-batch",
+            schema=GATE1_BATCH_SCHEMA, max_tokens=MAX_TOKENS["gate1_batch"], deadline=deadline,
+        ))
+    except Exception as e:
+        log.warning("⚠️ [GATE-1 BATCH ERROR] %s", e)
+        return {}
+
+
+# -------------------------------------------------
+# Per-item translation
+# -------------------------------------------------
+def _translate_item(key: str, code: str, concept_result, speculative: bool, deadline) -> dict:
+    def run():
+        if (concept_result is not None and concept_result.get("concept") == "unknown"
+                and deadline.allows("gate2")):
+            log.info("🔄 [CHAIN] Gate-1 returned unknown → triggering Gate-2 (open mode)")
+            merge_gate2(concept_result, llm_detect_concept_unlimited(code, deadline))
+        # concept_result None → batched Gate-1 missed this item → normal single-item detection
+        return run_translate_one(code, speculative, concept_result=concept_result, deadline=deadline)
+
+    payload, _ = TRANSLATE_FLIGHT.do(key, run, wait=deadline.remaining())
+    return payload
+
+
+def _normalize_programs(programs):
+    items = []
+    for i, p in enumerate(programs):
+        if isinstance(p, str):
+            items.append((str(i), p))
+        elif isinstance(p, dict):
+            items.append((str(p.get("id", i)), p.get("code") or ""))
+        else:
+            items.append((str(i), None))
+    return items
+
+
+def run_translate_batch(programs, speculative=False, deadline=None) -> dict:
+    """Returns {"results": [{id, ok, payload | error}], "summary": {...}} in input order."""
+    if len(programs) > BATCH_MAX_ITEMS:
+        raise ValueError(f"Batch too large: {len(programs)} programs (max {BATCH_MAX_ITEMS})")
+
+    deadline = deadline or Deadline()
+    started = time.time()
+    items = _normalize_programs(programs)
+    results = [None] * len(items)
+    unique = {}            # request_key → (code, [positions in items])
+    for pos, (pid, code) in enumerate(items):
+        if not isinstance(code, str):
+            results[pos] = {"id": pid, "ok": False, "error": "code must be a string"}
+            continue
+        code = code.strip()
+        if not code:
+            results[pos] = {"id": pid, "ok": True, "payload": {"segments": [], "summary": {"note": "empty code"}}}
+            continue
+        key = request_key(code, speculative=bool(speculative), deadline=deadline.bucket())
+        unique.setdefault(key, (code, []))[1].append(pos)
+
+    # 2️⃣ local pre-gate, 3️⃣ batched Gate-1 for everything it wasn't sure about
+    concepts = {key: local_pregate(code) for key, (code, _) in unique.items()}
+    pending = [(key[:12], unique[key][0]) for key, cr in concepts.items() if cr is None]
+    by_short = {key[:12]: key for key in unique}
+    chunks = list(_chunk_for_gate1(pending))
+    for answers in _executor.map(lambda chunk: _gate1_chunk(chunk, deadline), chunks):
+        for short, cr in answers.items():
+            if short in by_short and concepts.get(by_short[short]) is None:
+                concepts[by_short[short]] = cr
+
+    # 4️⃣ translate every unique program in parallel
+    views = {key: deadline.child() for key in unique}      # per-item `skipped`, shared expiry
+    futures = {
+        key: _executor.submit(_translate_item, key, code, concepts.get(key), bool(speculative), views[key])
+        for key, (code, _) in unique.items()
+    }
+    for key, future in futures.items():
+        try:
+            outcome = {"ok": True, "payload": future.result()}
+        except Exception as e:
+            log.warning("❌ [BATCH] item failed → %s", e)
+            outcome = {"ok": False, "error": str(e)}
+        for pos in unique[key][1]:
+            results[pos] = {"id": items[pos][0], **outcome}
+
+    ok = sum(1 for r in results if r["ok"])
+    summary = {
+        "total": len(results),
+        "ok": ok,
+        "failed": len(results) - ok,
+        "unique_programs": len(unique),
+        "pregate_bypassed": sum(1 for cr in concepts.values() if cr and cr.get("source") == "pregate"),
+        "gate1_prompts": len(chunks),
+        "gate1_batched_items": len(pending),
+        "elapsed_seconds": round(time.time() - started, 3),
+        "deadline": {
+            **deadline.report(),
+            # stage → number of unique programs that skipped it (batch Gate-1 skips count once)
+            "skipped": dict(Counter(stage for d in [deadline, *views.values()] for stage in set(d.skipped))),
+        },
+    }
+    log.info("📦 [BATCH] %s", summary)
+    return {"results": results, "summary": summary}
@@ -0,0 +1,104 @@
+# backend/concept_gates.py
+# Gemini concept gates shared by the Flask routes (app.py), the ASGI pipeline
+# (async_pipeline.py) and /translate_batch: prompts, reply parsing and fallbacks.
+#   Gate-1 → strict: one of the canonical DSA families, else "unknown"
+#   Gate-2 → open: any concept, used when Gate-1 says unknown
+from backend.gemini_manager import DETECT_POOL
+from backend.json_repair import repair_json
+from backend.prompt_compact import for_detection
+from backend.prompt_prefix import register_prefix, PrefixedPrompt
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+GATE1_FAMILIES = ["stack", "queue", "linkedlist", "tree", "graph", "sorting", "searching"]
+
+
+GATE1_PREFIX = register_prefix("gate1", """
+    You are a **strict DSA concept detector** for the AlgoMap visualizer.
+    You must classify the student's Python code ONLY if it clearly belongs to one of these families:
+    [stack, queue, linkedlist, tree, graph, sorting, searching].
+    If the code does not belong to any of them with HIGH confidence,
+    output exactly "unknown" as concept.
+
+    Return JSON only:
+    {
+      "concept": "<family or 'unknown'>",
+      "sub_concept": "<variant or ''>",
+      "explanation": "<1-2 line reasoning>",
+      "confidence": <0.0-1.0, how certain the concept is>
+    }
+""", DETECT_POOL)
+
+
+def gate1_prompt(code: str) -> str:
+    code = for_detection(code, site="gate1")
+    return PrefixedPrompt(GATE1_PREFIX, f"""
+    CODE:
+    ```python
+    {code}
+    ```""")
+
+
+def parse_gate1(text: str) -> dict:
+    data = repair_json(text, expect="object")
+    log.debug("✅ [GATE-1 RESULT] %s", data)
+    return normalize_gate1(data)
+
+
+def normalize_gate1(data: dict) -> dict:
+    data["concept"] = data.get("concept", "").lower().strip()
+    data["sub_concept"] = data.get("sub_concept", "").lower().strip()
+    if data["concept"] not in GATE1_FAMILIES:
+        data["concept"] = "unknown"
+    return data
+
+
+def gate1_failed(e) -> dict:
+    log.warning("⚠️ [GATE-1 ERROR] %s", e)
+    return {"concept": "unknown", "sub_concept": "", "explanation": str(e)}
+
+
+GATE2_PREFIX = register_prefix("gate2", """
+    You are an **open concept identifier** for the AlgoMap system.
+    Identify what the following Python code demonstrates — even if it is not a data-structure algorithm.
+    It can be OOP, recursion, hashing, string processing, file I/O, pattern printing, etc.
+
+    Return concise JSON:
+    {
+      "concept": "<general concept>",
+      "explanation": "<short reasoning>"
+    }
+""", DETECT_POOL)
+
+
+def gate2_prompt(code: str) -> str:
+    code = for_detection(code, site="gate2")
+    return PrefixedPrompt(GATE2_PREFIX, f"""
+    CODE:
+    ```python
+    {code}
+    ```""")
+
+
+def parse_gate2(text: str) -> dict:
+    data = repair_json(text, expect="object")
+    log.debug("✅ [GATE-2 RESULT] %s", data)
+    return data
+
+
+def gate2_failed(e) -> dict:
+    log.warning("⚠️ [GATE-2 ERROR] %s", e)
+    return {"concept": "unknown_general", "explanation": str(e)}
+
+
+def merge_gate2(concept_result: dict, gate2: dict) -> dict:
+    """Fold Gate-2's open answer into the Gate-1 result."""
+    # merge reasoning for display
+    concept_result["explanation"] = (
+        concept_result.get("explanation","") + " | " +
+        gate2.get("explanation","")
+    )
+    # record secondary label for GenericAIAnimator
+    concept_result["meta_alt_concept"] = gate2.get("concept","")
+    return concept_result
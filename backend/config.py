@@ -1,6 +1,10 @@
 # backend/config.py
-import json
-from backend.gemini_manager import GeminiKeyManager
+from backend.gemini_manager import DETECT_POOL
+from backend.llm_schemas import ANY_OBJECT, MAX_TOKENS
+from backend.json_repair import repair_json
+from backend.log import get_logger, clip
+
+log = get_logger(__name__)
 
 # =========================================================
 # Gemini setup
@@ -8,30 +12,30 @@ from backend.gemini_manager import GeminiKeyManager
 GEMINI_MODEL = "gemini-1.5-flash"   # ✅ default model, can override with env if needed
 GEMINI_TIMEOUT = 45                 # not used directly now, requests handled in manager
 
-# Initialize key manager (rotates through GEMINI_KEYS)
-manager = GeminiKeyManager()
+# Key manager → the shared detection pool (GEMINI_KEYS), not a second scheduler
+manager = DETECT_POOL
 
-def gemma_chat(system: str, user: str, model: str = GEMINI_MODEL, temperature: float = 0.1) -> str:
+def gemma_chat(system: str, user: str, model: str = GEMINI_MODEL, temperature: float = 0.1,
+               schema=None, max_tokens=None) -> str:
     """
     Send a prompt to Gemini through GeminiKeyManager and return the raw response string.
+    `schema` switches the call to structured JSON output (see backend/llm_schemas.py).
     """
     prompt = f"[SYSTEM]\n{system}\n[USER]\n{user}"
-    raw_text = manager.ask(prompt)
+    raw_text = manager.ask(prompt, schema=schema, max_tokens=max_tokens)
     return raw_text
 
 def gemma_json(system: str, user: str, model: str = GEMINI_MODEL, temperature: float = 0.1) -> dict:
     """
     Same as gemma_chat but returns a parsed JSON object.
-    Defensively extracts the first {...} block if extra text appears.
+    Tolerates prose, fences, trailing commas and truncation (see backend/json_repair.py).
     """
-    txt = gemma_chat(system, user, model=model, temperature=temperature)
-    print("📩 [GEMINI RAW RESPONSE TEXT]", txt)
+    txt = gemma_chat(system, user, model=model, temperature=temperature,
+                     schema=ANY_OBJECT, max_tokens=MAX_TOKENS["chat_json"])
+    log.debug("📩 [GEMINI RAW RESPONSE TEXT] %s", clip(txt, 2000))
 
     try:
-        s, e = txt.find("{"), txt.rfind("}")
-        if s != -1 and e != -1:
-            txt = txt[s:e+1]
-        return json.loads(txt)
+        return repair_json(txt, expect="object")
     except Exception as e:
-        print("❌ [GEMINI ERROR in gemma_json]", repr(e))
+        log.warning("❌ [GEMINI ERROR in gemma_json] %s", repr(e))
         raise
@@ -0,0 +1,103 @@
+# backend/deadline.py
+# Per-request time budget for translate_one.
+# The client may send `deadline_ms`; otherwise TRANSLATE_DEADLINE applies. Every Gemini hop
+# sizes its timeout from what is left, and optional LLM stages (Gate-2, Hybrid-Refiner,
+# animation plan, model-cascade escalation) are skipped when too little budget remains —
+# the best local result wins.
+import os
+import math
+import time
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+DEFAULT_BUDGET = _env_float("TRANSLATE_DEADLINE", 60)       # seconds per /translate_one
+MAX_BUDGET = _env_float("TRANSLATE_DEADLINE_MAX", 120)      # clients can't ask for more
+MIN_BUDGET = _env_float("TRANSLATE_DEADLINE_MIN", 1)
+
+# remaining seconds an optional stage needs before it is worth starting
+STAGE_MIN_BUDGET = {
+    "gate2": _env_float("DEADLINE_MIN_GATE2", 4),
+    "refine": _env_float("DEADLINE_MIN_REFINE", 10),
+    "plan": _env_float("DEADLINE_MIN_PLAN", 6),
+    "escalate": _env_float("DEADLINE_MIN_ESCALATE", 4),   # model cascade: retry on the next tier
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's budget ran out before a required stage could start."""
+
+
+class Deadline:
+    """Absolute expiry (monotonic clock) + a record of the stages skipped for lack of time."""
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = float(budget)
+        self.started = time.monotonic()
+        self.expires_at = self.started + self.budget
+        self.skipped = []
+
+    @classmethod
+    def from_request(cls, data):
+        """Deadline from a request body's `deadline_ms` (clamped), else the server default."""
+        raw = (data or {}).get("deadline_ms")
+        try:
+            budget = float(raw) / 1000 if raw is not None else DEFAULT_BUDGET
+        except (TypeError, ValueError):
+            budget = DEFAULT_BUDGET
+        if not math.isfinite(budget):          # "nan"/"inf" parse but can't be clamped
+            budget = DEFAULT_BUDGET
+        return cls(min(max(budget, MIN_BUDGET), MAX_BUDGET))
+
+    def child(self):
+        """Same expiry, own `skipped` record — one per item when a batch shares a deadline."""
+        view = Deadline.__new__(Deadline)
+        view.budget, view.started, view.expires_at = self.budget, self.started, self.expires_at
+        view.skipped = []
+        return view
+
+    def bucket(self):
+        """Coarse budget class (next power of two, in seconds): requests in one bucket
+        skip the same optional stages, so they may share a result (backend/singleflight.py)."""
+        return 2 ** math.ceil(math.log2(max(self.budget, 1.0)))
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0.0
+
+    def timeout(self, cap=None):
+        """Seconds the next blocking call may take: what is left, bounded by `cap`."""
+        left = self.remaining()
+        return min(left, cap) if cap else left
+
+    def check(self, stage):
+        """Raise DeadlineExceeded if nothing is left for a required stage."""
+        if self.expired():
+            self.skipped.append(stage)
+            raise DeadlineExceeded(f"deadline of {self.budget:.1f}s exceeded before {stage}")
+
+    def allows(self, stage):
+        """Is there enough budget left to start the optional `stage`? Records the skip if not."""
+        if self.remaining() >= STAGE_MIN_BUDGET.get(stage, 0.0):
+            return True
+        log.info("⏳ [DEADLINE] %.1fs left → skipping optional stage '%s'", self.remaining(), stage)
+        self.skipped.append(stage)
+        return False
+
+    def report(self):
+        return {
+            "budget": round(self.budget, 2),
+            "elapsed": round(time.monotonic() - self.started, 2),
+            "remaining": round(self.remaining(), 2),
+            "skipped": list(self.skipped),
+        }
@@ -0,0 +1,164 @@
+# backend/debug_capture.py
+# The last translate payloads of this worker, kept in memory for debugging (instead of
+# rewriting debug_cache.json on every request). DEBUG_CAPTURE_SIZE bounds the ring,
+# DEBUG_CAPTURE_SAMPLE keeps only a fraction of requests; /internal/debug_captures lists,
+# fetches and dumps them. With DEBUG_CAPTURE_DIR set, captures are also written to
+# <dir>/debug_cache.<pid>.json by a background thread — one file per worker, latest wins,
+# and the request never waits for the disk.
+import os
+import json
+import time
+import random
+import tempfile
+import itertools
+import threading
+from collections import deque
+
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+DEBUG_CAPTURE_SIZE = max(0, int(_env_float("DEBUG_CAPTURE_SIZE", 20)))      # 0 → capture nothing
+DEBUG_CAPTURE_SAMPLE = min(1.0, max(0.0, _env_float("DEBUG_CAPTURE_SAMPLE", 1.0)))
+DEBUG_CAPTURE_DIR = os.getenv("DEBUG_CAPTURE_DIR", "").strip() or None
+
+
+def _summary(entry):
+    segments = entry["payload"].get("segments") or [{}]
+    return {
+        "id": entry["id"],
+        "ts": round(entry["ts"], 3),
+        "concept": segments[0].get("concept"),
+        "segments": len(segments),
+        "steps": sum(len(s.get("steps") or []) for s in segments),
+    }
+
+
+def _write_json(path, data):
+    """Atomic write (tmp file + rename) → readers never see a half-written file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class DebugCapture:
+    """Bounded, sampled ring of recent payloads (thread-safe) + optional async persistence."""
+
+    def __init__(self, size=20, sample=1.0, disk_dir=None):
+        self.size = size
+        self.sample = sample
+        self.disk_dir = disk_dir
+        self._lock = threading.Lock()
+        self._ring = deque(maxlen=max(1, size))
+        self._ids = itertools.count(1)
+        self._pending = None                # newest capture not yet on disk
+        self._wake = threading.Event()
+        self._writer = None
+        self._stats = {"seen": 0, "captured": 0, "sampled_out": 0,
+                       "persisted": 0, "persist_coalesced": 0, "persist_errors": 0}
+
+    def capture(self, payload):
+        """Keep `payload` (by reference — callers don't mutate it afterwards) → capture id or None."""
+        with self._lock:
+            self._stats["seen"] += 1
+            if not self.size or (self.sample < 1.0 and random.random() >= self.sample):
+                self._stats["sampled_out"] += 1
+                return None
+            entry = {"id": next(self._ids), "ts": time.time(), "payload": payload}
+            self._ring.append(entry)
+            self._stats["captured"] += 1
+            if self.disk_dir:
+                if self._pending is not None:
+                    self._stats["persist_coalesced"] += 1
+                self._pending = entry
+        if self.disk_dir:
+            self._ensure_writer()
+            self._wake.set()
+        return entry["id"]
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    def list(self):
+        with self._lock:
+            entries = list(self._ring)
+        return [_summary(e) for e in reversed(entries)]   # newest first
+
+    def get(self, capture_id):
+        with self._lock:
+            for e in self._ring:
+                if e["id"] == capture_id:
+                    return {**_summary(e), "payload": e["payload"]}
+        return None
+
+    def dump(self, path=None):
+        """Write the whole ring to one JSON file (on demand, off the request path) → its path."""
+        with self._lock:
+            entries = list(self._ring)
+        path = path or os.path.join(self.disk_dir or os.getcwd(), f"debug_captures.{os.getpid()}.json")
+        _write_json(path, [{**_summary(e), "payload": e["payload"]} for e in entries])
+        log.info("🧾 [DEBUG-CAPTURE] Dumped %s captures → %s", len(entries), path)
+        return path
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._stats)
+            held = len(self._ring)
+        return {
+            "size": self.size,
+            "sample": self.sample,
+            "held": held,
+            "disk_dir": self.disk_dir,
+            "pid": os.getpid(),
+            **stats,
+        }
+
+    # -------------------------------------------------
+    # Background persistence (DEBUG_CAPTURE_DIR)
+    # -------------------------------------------------
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="debug-capture-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        path = os.path.join(self.disk_dir, f"debug_cache.{os.getpid()}.json")
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                entry, self._pending = self._pending, None
+            if entry is None:
+                continue
+            try:
+                _write_json(path, entry["payload"])
+            except (OSError, TypeError, ValueError) as e:
+                with self._lock:
+                    self._stats["persist_errors"] += 1
+                log.warning("⚠️ [DEBUG-CAPTURE] Disk write failed → %s", e)
+                continue
+            with self._lock:
+                self._stats["persisted"] += 1
+
+
+DEBUG_CAPTURE = DebugCapture(DEBUG_CAPTURE_SIZE, DEBUG_CAPTURE_SAMPLE, DEBUG_CAPTURE_DIR)
@@ -1,83 +1,469 @@
 # backend/detect_mode.py
+# Deterministic local pre-gate: AST + text signals → a concept family with a confidence.
+# translate_one asks this first; a guess at or above PREGATE_THRESHOLD skips the Gemini
+# Gate-1 call entirely, anything weaker (or ambiguous) still goes to the LLM.
+import os
 import ast
-from dataclasses import dataclass
-from typing import List
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+PREGATE_ENABLED = os.getenv("PREGATE_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+try:
+    PREGATE_THRESHOLD = float(os.getenv("PREGATE_THRESHOLD", "0.85"))
+except ValueError:
+    PREGATE_THRESHOLD = 0.85
 
 @dataclass
 class Guess:
     mode: str
     confidence: float
-    reasons: List[str]
+    reasons: List[str] = field(default_factory=list)
 
 SORT_HINTS  = {"swap", "sorted", "sort", "bubble", "quicksort", "selection", "insertion"}
 
+# guessed mode → Gate-1 shaped (concept, sub_concept); normalize_concept_family() maps it back
+MODE_TO_GATE1 = {
+    "stack": ("stack", ""),
+    "queue-linearqueue": ("queue", "linear"),
+    "queue-circularqueue": ("queue", "circular"),
+    "queue-priorityqueue": ("queue", "priority"),
+    "queue-deque": ("queue", "deque"),
+    "queue-circulardeque": ("queue", "circular deque"),
+    "linkedlist-singly": ("linkedlist", "singly"),
+    "linkedlist-doubly": ("linkedlist", "doubly"),
+    "linkedlist-circularsingly": ("linkedlist", "circular"),
+    "linkedlist-circulardoubly": ("linkedlist", "circular doubly"),
+    "tree": ("tree", "bst"),
+    "tree-avl": ("tree", "avl"),
+    "tree-redblack": ("tree", "red-black"),
+    "tree-btree": ("tree", "btree"),
+    "graph": ("graph", ""),
+    "graph-bfs": ("graph", "bfs"),
+    "graph-dfs": ("graph", "dfs"),
+    "sorting": ("sorting", ""),
+    "sorting-bubble": ("sorting", "bubble"),
+    "sorting-selection": ("sorting", "selection"),
+    "sorting-insertion": ("sorting", "insertion"),
+    "sorting-merge": ("sorting", "merge"),
+    "sorting-quick": ("sorting", "quick"),
+    "search-binary": ("searching", "binary"),
+    "search-linear": ("searching", "linear"),
+}
+
+GRAPH_TERMS = {"graph", "adj", "adjacency", "adj_list", "edges", "neighbors", "neighbours", "neighbor"}
+LOW_NAMES = {"low", "lo", "left", "l", "start", "first"}
+HIGH_NAMES = {"high", "hi", "right", "r", "end", "last"}
+WRAP_NAMES = {"capacity", "size", "max_size", "maxsize", "cap", "n", "k", "length"}
+# a telling function / class name with no structure behind it (get_selection, quick_add …):
+# a hint for the LLM, never a bypass on its own — names only add a bonus to structural evidence
+NAME_ONLY = 0.6
+
+
+def _family(mode: str) -> str:
+    return mode.split("-")[0]
+
+
+# -------------------------------------------------
+# AST feature collection
+# -------------------------------------------------
+class _Features(ast.NodeVisitor):
+    """One pass over the tree; records the structural signals the scorer needs."""
+
+    def __init__(self):
+        self.func_names = set()
+        self.class_names = set()
+        self.attrs = set()              # every .attr accessed anywhere
+        self.names = set()              # every bare Name id
+        self.calls = {}                 # method/function name → count
+        self.pop0 = 0
+        self.pop_empty = 0
+        self.imports = set()
+        self.loop_depth = 0
+        self.max_loop_depth = 0
+        self.swap = False               # a[i], a[j] = a[j], a[i]
+        self.adjacent_compare = False   # a[j] > a[j + 1]
+        self.shift_assign = False       # a[j + 1] = a[j]
+        self.mid_floordiv = False       # mid = (low + high) // 2
+        self.low_high_compare = False   # while low <= high
+        self.mid_equals = False         # arr[mid] == target
+        self.slice_at_mid = False       # arr[:mid] / arr[mid:]
+        self.modulo_wrap = False        # (rear + 1) % capacity
+        self.next_to_head = False       # while cur.next != self.head (wrap-around stop condition)
+        self.index_equals = False       # if arr[i] == target
+        self.recursive = set()          # functions that call themselves
+        self._func_stack = []
+
+    # --- definitions / imports ---
+    def visit_FunctionDef(self, node):
+        self.func_names.add(node.name.lower())
+        self._func_stack.append(node.name)
+        self.generic_visit(node)
+        self._func_stack.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self.class_names.add(node.name.lower())
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.imports.add(alias.name.split(".")[0])
+
+    def visit_ImportFrom(self, node):
+        self.imports.add((node.module or "").split(".")[0])
+        for alias in node.names:
+            self.imports.add(alias.name)
+
+    # --- loops ---
+    def _loop(self, node):
+        self.loop_depth += 1
+        self.max_loop_depth = max(self.max_loop_depth, self.loop_depth)
+        self.generic_visit(node)
+        self.loop_depth -= 1
+
+    visit_For = _loop
+    visit_AsyncFor = _loop
+
+    def visit_While(self, node):
+        test = node.test
+        if isinstance(test, ast.Compare) and len(test.comparators) == 1:
+            left, right = _name_of(test.left), _name_of(test.comparators[0])
+            if left in LOW_NAMES and right in HIGH_NAMES:
+                self.low_high_compare = True
+        self._loop(node)
+
+    # --- names / attributes / calls ---
+    def visit_Name(self, node):
+        self.names.add(node.id.lower())
+
+    def visit_Attribute(self, node):
+        self.attrs.add(node.attr.lower())
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        fn = node.func
+        name = fn.attr if isinstance(fn, ast.Attribute) else fn.id if isinstance(fn, ast.Name) else ""
+        name = name.lower()
+        if name:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if name == "pop":
+            if not node.args:
+                self.pop_empty += 1
+            elif isinstance(node.args[0], ast.Constant) and node.args[0].value == 0:
+                self.pop0 += 1
+        if self._func_stack and name == self._func_stack[-1].lower():
+            self.recursive.add(name)
+        self.generic_visit(node)
+
+    # --- expressions ---
+    def visit_Assign(self, node):
+        target, value = node.targets[0], node.value
+        if (len(node.targets) == 1 and isinstance(target, (ast.Tuple, ast.List))
+                and isinstance(value, (ast.Tuple, ast.List))
+                and len(target.elts) == 2 and len(value.elts) == 2
+                and all(isinstance(e, ast.Subscript) for e in target.elts)):
+            self.swap = True
+        if (isinstance(target, ast.Subscript) and isinstance(value, ast.Subscript)
+                and _name_of(target.value) == _name_of(value.value)
+                and _is_offset(target.slice, value.slice)):
+            self.shift_assign = True
+        self.generic_visit(node)
+
+    def visit_BinOp(self, node):
+        if isinstance(node.op, ast.FloorDiv) and isinstance(node.left, ast.BinOp) and isinstance(node.left.op, ast.Add):
+            self.mid_floordiv = True
+        if isinstance(node.op, ast.Mod) and _name_of(node.right) in WRAP_NAMES:
+            self.modulo_wrap = True
+        self.generic_visit(node)
+
+    def visit_Compare(self, node):
+        sides = [node.left] + list(node.comparators)
+        subs = [s for s in sides if isinstance(s, ast.Subscript)]
+        if len(subs) == 2 and _name_of(subs[0].value) == _name_of(subs[1].value) and _is_offset(subs[0].slice, subs[1].slice):
+            self.adjacent_compare = True
+        if any(isinstance(op, (ast.Eq, ast.Is, ast.NotEq, ast.IsNot)) for op in node.ops):
+            if any(_name_of(s) == "head" for s in sides) and any(
+                isinstance(s, ast.Attribute) and s.attr == "next" for s in sides
+            ):
+                self.next_to_head = True
+            if any(isinstance(op, ast.Eq) for op in node.ops) and len(subs) == 1:
+                idx = _name_of(subs[0].slice)
+                if idx == "mid":
+                    self.mid_equals = True
+                elif idx:
+                    self.index_equals = True
+        self.generic_visit(node)
+
+    def visit_Slice(self, node):
+        if _name_of(node.lower) == "mid" or _name_of(node.upper) == "mid":
+            self.slice_at_mid = True
+        self.generic_visit(node)
+
+
+def _name_of(node) -> str:
+    """Bare identifier of a Name / Attribute (self.head → 'head'), else ''."""
+    if isinstance(node, ast.Name):
+        return node.id.lower()
+    if isinstance(node, ast.Attribute):
+        return node.attr.lower()
+    return ""
+
+
+def _is_offset(a, b) -> bool:
+    """True for index pairs like (j, j + 1) / (j + 1, j) / (j - 1, j)."""
+    def parts(n):
+        if isinstance(n, ast.Name):
+            return n.id, 0
+        if (isinstance(n, ast.BinOp) and isinstance(n.op, (ast.Add, ast.Sub))
+                and isinstance(n.left, ast.Name) and isinstance(n.right, ast.Constant)):
+            return n.left.id, n.right.value if isinstance(n.op, ast.Add) else -n.right.value
+        return None, None
+    (na, oa), (nb, ob) = parts(a), parts(b)
+    return na is not None and na == nb and oa != ob
+
+
+# -------------------------------------------------
+# Scoring
+# -------------------------------------------------
+class _Candidates:
+    """Best confidence per mode; each extra independent signal adds a small bonus."""
+
+    def __init__(self):
+        self.by_mode: Dict[str, Guess] = {}
+
+    def add(self, mode: str, confidence: float, reason: str):
+        g = self.by_mode.get(mode)
+        if g is None:
+            self.by_mode[mode] = Guess(mode, confidence, [reason])
+        else:
+            g.confidence = min(0.98, max(g.confidence, confidence) + 0.05)
+            g.reasons.append(reason)
+
+    def drop(self, *modes: str):
+        for m in modes:
+            self.by_mode.pop(m, None)
+
+    def families(self):
+        return {_family(m) for m in self.by_mode}
+
+
+def _any_in(words, haystack) -> bool:
+    return any(w in h for h in haystack for w in words)
+
+
+def _score(f: _Features, text: str) -> _Candidates:
+    c = _Candidates()
+    names = f.names | f.attrs
+    called = f.calls
+
+    # --- linked lists ---
+    if "next" in f.attrs and ("head" in names or _any_in(["node"], f.class_names)) and not {"left", "right"} <= f.attrs:
+        circular = f.next_to_head or _any_in(["circular"], f.class_names)
+        doubly = "prev" in f.attrs
+        mode = ("linkedlist-circulardoubly" if circular and doubly else
+                "linkedlist-circularsingly" if circular else
+                "linkedlist-doubly" if doubly else "linkedlist-singly")
+        c.add(mode, 0.85, "Node objects chained through .next" + (" / .prev" if doubly else ""))
+        if _any_in(["linked", "list"], f.class_names):
+            c.add(mode, 0.85, "LinkedList class")
+
+    # --- trees ---
+    if {"keys", "children"} <= f.attrs and ("leaf" in names or _any_in(["split"], f.func_names)):
+        c.add("tree-btree", 0.92, "Nodes with keys[] + children[] (B-tree)")
+    if {"left", "right"} <= f.attrs:
+        if "height" in f.attrs and _any_in(["rotate", "balance"], f.func_names):
+            c.add("tree-avl", 0.9, "Height-tracking nodes + rotations (AVL)")
+        elif "color" in f.attrs or "colour" in f.attrs or ("red" in text and "black" in text):
+            c.add("tree-redblack", 0.9, "Colored nodes (red-black)")
+        else:
+            c.add("tree", 0.85, "Nodes with .left/.right children")
+            if "root" in names or _any_in(["insert", "inorder", "preorder", "postorder"], f.func_names):
+                c.add("tree", 0.85, "Root / traversal helpers")
+
+    # --- graphs ---
+    graph_terms = bool(GRAPH_TERMS & names) or _any_in(["graph"], f.class_names)
+    if graph_terms:
+        bfs_named = _any_in(["bfs", "breadth"], f.func_names)
+        dfs_named = _any_in(["dfs", "depth"], f.func_names)
+        queue_like = f.pop0 or "popleft" in called
+        if queue_like and "visited" in names:
+            c.add("graph-bfs", 0.85, "Graph + FIFO frontier (BFS)")
+        if bfs_named:
+            c.add("graph-bfs", 0.75, "bfs function")
+        if "visited" in names and (f.recursive or f.pop_empty) and not queue_like:
+            c.add("graph-dfs", 0.85, "Graph + recursion/stack frontier (DFS)")
+        if dfs_named:
+            c.add("graph-dfs", 0.75, "dfs function")
+        if not (bfs_named or dfs_named):
+            c.add("graph", 0.7, "Adjacency / graph terms")
+
+    # --- queues ---
+    front_rear = bool({"front", "rear"} <= names)
+    deque_ops = ("appendleft" in called or _any_in(["add_front", "insert_front", "push_front", "addfront"], f.func_names)
+                 or _any_in(["deque"], f.class_names))
+    if front_rear and f.modulo_wrap:
+        mode = "queue-circulardeque" if deque_ops else "queue-circularqueue"
+        c.add(mode, 0.9, "front/rear indices wrapping with modulo")
+    elif "heappush" in called or "heapq" in f.imports:
+        c.add("queue-priorityqueue", 0.88, "heapq-backed queue")
+        if _any_in(["priority"], f.class_names | f.func_names | names):
+            c.add("queue-priorityqueue", 0.88, "priority naming")
+    elif deque_ops and ("popleft" in called or "pop" in called or _any_in(["remove_", "delete_", "pop_"], f.func_names)):
+        both_ends = "appendleft" in called and ("popleft" in called or "pop" in called)
+        c.add("queue-deque", 0.88 if both_ends else 0.75, "Insert/remove at both ends (deque)")
+    elif "append" in called and (f.pop0 or "popleft" in called):
+        # a bare FIFO list is also every grid BFS frontier: the Queue naming makes it a queue
+        c.add("queue-linearqueue", 0.8, "append + pop(0)/popleft (FIFO)")
+        if _any_in(["enqueue", "dequeue"], f.func_names) or _any_in(["queue"], f.class_names):
+            c.add("queue-linearqueue", 0.8, "Queue class / enqueue-dequeue methods")
+    elif _any_in(["enqueue", "dequeue"], f.func_names):
+        c.add("queue-linearqueue", 0.8, "enqueue/dequeue methods")
+
+    # --- stack ---
+    if ("append" in called or "push" in f.func_names) and f.pop_empty and not (f.pop0 or "popleft" in called):
+        # append + pop() alone is any undo list / DFS frontier: the Stack naming makes it a stack
+        c.add("stack", 0.8, "append/push + pop() (LIFO)")
+        if _any_in(["stack"], f.class_names) or {"push", "peek"} & f.func_names:
+            c.add("stack", 0.8, "Stack class / push-peek methods")
+    elif {"push", "pop"} <= f.func_names:
+        c.add("stack", 0.7, "push/pop methods (LIFO)")
+
+    # --- sorting ---
+    nested = f.max_loop_depth >= 2
+    sorts = (
+        ("sorting-bubble", ["bubble"], nested and f.swap and f.adjacent_compare and not f.shift_assign,
+         "Adjacent compare + swap in nested loops (bubble)"),
+        ("sorting-selection", ["selection"], nested and f.swap and _any_in(["min_idx", "min_index", "minimum", "smallest"], names),
+         "Min-index scan + swap (selection)"),
+        ("sorting-insertion", ["insertion"], f.shift_assign and "key" in names and nested,
+         "key + shifting a[j+1] = a[j] (insertion)"),
+        ("sorting-merge", ["merge_sort", "mergesort"], f.recursive and f.slice_at_mid and _any_in(["merge"], f.func_names),
+         "Recursive halves + merge (merge sort)"),
+        ("sorting-quick", ["quick"], f.recursive and "pivot" in names,
+         "Pivot partition + recursion (quick sort)"),
+    )
+    for mode, words, structural, reason in sorts:
+        if structural:
+            c.add(mode, 0.9, reason)
+        if _any_in(words, f.func_names):
+            c.add(mode, NAME_ONLY, f"{words[0]}-named function")
+    if not any(m.startswith("sorting-") for m in c.by_mode) and nested and f.swap:
+        c.add("sorting", 0.75, "Nested loops + swap-like pattern")
+
+    # --- searching ---
+    if f.mid_floordiv and f.mid_equals and (f.low_high_compare or _any_in(["binary"], f.func_names)):
+        c.add("search-binary", 0.9, "mid = (low + high) // 2 halving loop (binary search)")
+    elif _any_in(["binary_search", "binarysearch"], f.func_names):
+        c.add("search-binary", 0.8, "binary_search function")
+    if f.max_loop_depth == 1 and f.index_equals and not f.swap and not f.mid_floordiv:
+        c.add("search-linear", 0.8, "Single scan comparing a[i] == target")
+        if _any_in(["linear", "search"], f.func_names):
+            c.add("search-linear", 0.8, "search function")
+
+    # traversal helpers: queues/stacks/scans inside graph or tree code belong to that family
+    if {"graph", "tree"} & c.families():
+        c.drop("stack", "queue-linearqueue", "queue-deque", "search-linear")
+    return c
+
+
+def _text_fallback(text: str) -> _Candidates:
+    """Unparseable snippets: the original keyword probes, capped below any sane threshold."""
+    c = _Candidates()
+    if ".append(" in text and (".pop(0)" in text or "popleft(" in text):
+        c.add("queue-linearqueue", 0.6, "append + pop(0)/popleft pattern")
+    if ".append(" in text and ".pop()" in text:
+        c.add("stack", 0.55, "append + pop() pattern")
+    if any(k in text for k in ["treenode", ".left", ".right"]):
+        c.add("tree", 0.55, "Tree-like attributes .left/.right or TreeNode")
+    if any(k in text for k in ["bfs(", "def bfs", "breadth first"]):
+        c.add("graph-bfs", 0.55, "BFS keywords")
+    if any(k in text for k in ["dfs(", "def dfs", "depth first"]):
+        c.add("graph-dfs", 0.55, "DFS keywords")
+    if any(k in text for k in SORT_HINTS):
+        c.add("sorting", 0.5, "Sorting keywords")
+    return c
+
+
 def detect_mode(code: str) -> Guess:
-    """Lightweight Python detector: queue | stack | sort | tree | graph-bfs | graph-dfs | generic"""
+    """
+    Local concept guess over every family normalize_concept_family() knows
+    (stack, queue variants, linked-list variants, tree variants, graph/bfs/dfs,
+    each sort algorithm, binary/linear search) or 'generic'.
+    Two strong guesses from different families → confidence capped (let the LLM decide).
+    """
     text = code.lower()
+    try:
+        f = _Features()
+        f.visit(ast.parse(code))
+        candidates = _score(f, text)
+    except (SyntaxError, ValueError, RecursionError):
+        candidates = _text_fallback(text)
 
-    # quick text probes
-    saw_dfs = any(k in text for k in ["dfs(", "def dfs", "depth first"])
-    saw_bfs = any(k in text for k in ["bfs(", "def bfs", "breadth first"])
-    saw_graph_terms = any(k in text for k in ["graph", "adj", "edges", "neighbors"])
-    saw_tree = any(k in text for k in ["treenode", ".left", ".right"])
+    ranked = sorted(candidates.by_mode.values(), key=lambda g: g.confidence, reverse=True)
+    if not ranked:
+        return Guess("generic", 0.40, ["No strong signals"])
 
-    has_append = (".append(" in text)
-    pop0 = (".pop(0)" in text) or ("popleft(" in text)
-    pop_empty = (".pop()" in text) or (".pop( )" in text)
+    best = ranked[0]
+    rival = next((g for g in ranked[1:] if _family(g.mode) != _family(best.mode)), None)
+    if rival is not None and rival.confidence >= 0.8:
+        best = Guess(best.mode, min(best.confidence, 0.6), best.reasons + [f"ambiguous with {rival.mode}"])
+    return best
 
-    # basic AST checks for nested loops + swap pattern
-    nested_loops = 0
-    saw_swap_like = any(k in text for k in SORT_HINTS)
-    try:
-        tree = ast.parse(code)
-        class V(ast.NodeVisitor):
-            depth = 0
-            def visit_For(self, node):
-                self.depth += 1
-                nonlocal nested_loops
-                nested_loops = max(nested_loops, self.depth)
-                self.generic_visit(node)
-                self.depth -= 1
-            def visit_While(self, node):
-                self.depth += 1
-                nonlocal nested_loops
-                nested_loops = max(nested_loops, self.depth)
-                self.generic_visit(node)
-                self.depth -= 1
-            def visit_Assign(self, node):
-                # a[i], a[j] = a[j], a[i]
-                nonlocal saw_swap_like
-                if (len(node.targets)==1 and
-                    isinstance(node.targets[0], (ast.Tuple, ast.List)) and
-                    isinstance(node.value, (ast.Tuple, ast.List)) and
-                    len(node.targets[0].elts)==2 and len(node.value.elts)==2):
-                    saw_swap_like = True
-                self.generic_visit(node)
-        V().visit(tree)
-    except Exception:
-        pass
-
-    # score candidates
-    candidates: List[Guess] = []
-    reasons: List[str] = []
-
-    if has_append and pop0:
-        candidates.append(Guess("queue", 0.85, ["append + pop(0)/popleft pattern"]))
-    if has_append and pop_empty and not pop0:
-        candidates.append(Guess("stack", 0.80, ["append + pop() pattern"]))
-    if saw_tree:
-        candidates.append(Guess("tree", 0.75, ["Tree-like attributes .left/.right or TreeNode"]))
-    if saw_bfs or (saw_graph_terms and pop0):
-        candidates.append(Guess("graph-bfs", 0.72, ["Graph terms + queue-like ops"]))
-    if saw_dfs or (saw_graph_terms and not pop0):
-        candidates.append(Guess("graph-dfs", 0.70, ["DFS keywords / graph terms"]))
-    if nested_loops >= 2 and saw_swap_like:
-        candidates.append(Guess("sort", 0.80, ["Nested loops + swap-like pattern"]))
-    if not candidates:
-        if nested_loops >= 2:
-            candidates.append(Guess("sort", 0.55, ["Nested loops heuristic"]))
-        else:
-            candidates.append(Guess("generic", 0.40, ["No strong signals"]))
 
-    best = max(candidates, key=lambda g: g.confidence)
-    return best
\ No newline at end of file
+# -------------------------------------------------
+# Pre-gate (used by translate_one before Gemini Gate-1)
+# -------------------------------------------------
+class PreGateStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._c = {"checked": 0, "bypassed": 0, "deferred": 0}
+        self._by_mode: Dict[str, int] = {}
+
+    def record(self, guess: Guess, bypassed: bool):
+        with self._lock:
+            self._c["checked"] += 1
+            self._c["bypassed" if bypassed else "deferred"] += 1
+            if bypassed:
+                self._by_mode[guess.mode] = self._by_mode.get(guess.mode, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self._c)
+            out["bypassed_by_mode"] = dict(self._by_mode)
+        out["bypass_rate"] = round(out["bypassed"] / out["checked"], 4) if out["checked"] else 0.0
+        out["threshold"] = PREGATE_THRESHOLD
+        out["enabled"] = PREGATE_ENABLED
+        return out
+
+
+PREGATE_STATS = PreGateStats()
+
+
+def local_pregate(code: str, threshold: float = PREGATE_THRESHOLD) -> Optional[dict]:
+    """
+    Gate-1 shaped result ({concept, sub_concept, explanation}) when the local guess is
+    confident enough to skip the LLM, else None.
+    """
+    if not PREGATE_ENABLED:
+        return None
+    guess = detect_mode(code)
+    bypass = guess.mode in MODE_TO_GATE1 and guess.confidence >= threshold
+    PREGATE_STATS.record(guess, bypass)
+    if not bypass:
+        log.debug("🔬 [PRE-GATE] %s @ %.2f < %.2f → asking Gemini", guess.mode, guess.confidence, threshold)
+        return None
+
+    concept, sub_concept = MODE_TO_GATE1[guess.mode]
+    log.debug("⚡ [PRE-GATE] %s @ %.2f → skipping Gemini Gate-1", guess.mode, guess.confidence)
+    return {
+        "concept": concept,
+        "sub_concept": sub_concept,
+        "explanation": "Local detector: " + "; ".join(guess.reasons),
+        "confidence": round(guess.confidence, 2),
+        "source": "pregate",
+    }
@@ -0,0 +1,448 @@
+# backend/fake_gemini.py
+# Local stand-in for the Gemini REST API, for load / latency testing without real quota:
+#     python -m backend.fake_gemini --port 8089 --latency lognormal:0.8:0.5 --error-429 0.05
+#     GEMINI_BASE_URL=http://127.0.0.1:8089 python -m backend.app
+# Answers generateContent / streamGenerateContent (SSE) with canned or templated replies for
+# each AlgoMap prompt kind, with configurable latency, injected 429 / 5xx errors and
+# malformed-JSON modes. GET /_fake/stats, POST /_fake/config and POST /_fake/reset
+# inspect and retune a running server.
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from string import Template
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.detect_mode import detect_mode, MODE_TO_GATE1
+
+KINDS = ("gate1", "gate1_batch", "gate2", "ir", "adaptive", "animate", "split", "chat")
+MALFORMED_MODES = ("fence", "prose", "trailing_comma", "truncate", "garbage")
+
+_CODE_FENCE_RE = re.compile(r"```python\n(.*?)```", re.S)
+_PROGRAM_RE = re.compile(r"PROGRAM id=(\S+?):\n```python\n(.*?)```", re.S)
+
+
+# -------------------------------------------------
+# Behaviour config
+# -------------------------------------------------
+def parse_latency(spec):
+    """
+    "fixed:S" | "uniform:LO:HI" | "normal:MEAN:STD" | "lognormal:MEDIAN:SIGMA" → sampler (seconds).
+    A bare number means fixed.
+    """
+    name, _, rest = str(spec).partition(":")
+    try:
+        if not rest:
+            value = float(name)
+            return lambda rng: value
+        args = [float(a) for a in rest.split(":")]
+    except ValueError:
+        raise ValueError(f"Bad latency spec: {spec!r}")
+    if name == "fixed":
+        return lambda rng: args[0]
+    if name == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1])
+    if name == "normal":
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+    if name == "lognormal":
+        import math
+        mu = math.log(max(args[0], 1e-6))
+        return lambda rng: rng.lognormvariate(mu, args[1])
+    raise ValueError(f"Unknown latency distribution: {name!r}")
+
+
+class FakeConfig:
+    """Mutable server behaviour (thread-safe); updated from the CLI or POST /_fake/config."""
+
+    def __init__(self, seed=None):
+        self._lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.latency = {"default": "fixed:0.05"}   # kind → spec
+        self.error_429 = 0.0
+        self.error_5xx = 0.0
+        self.retry_after = 2.0
+        self.malformed = []                        # modes picked at random when malformed
+        self.malformed_rate = 0.0
+        self.stream_chunks = 8
+        self.responses = {}                        # kind → canned text / JSON (Template with $code …)
+        self._samplers = {}
+
+    def update(self, data):
+        with self._lock:
+            latency = data.get("latency")
+            if isinstance(latency, str):
+                latency = {"default": latency}
+            if latency:
+                for kind, spec in latency.items():
+                    parse_latency(spec)
+                    self.latency[kind] = spec
+                self._samplers = {}
+            for name in ("error_429", "error_5xx", "retry_after", "malformed_rate"):
+                if name in data:
+                    setattr(self, name, float(data[name]))
+            if "malformed" in data:
+                modes = data["malformed"]
+                modes = modes.split(",") if isinstance(modes, str) else list(modes or [])
+                unknown = [m for m in modes if m not in MALFORMED_MODES]
+                if unknown:
+                    raise ValueError(f"Unknown malformed mode(s): {unknown}")
+                self.malformed = modes
+                if modes and "malformed_rate" not in data and not self.malformed_rate:
+                    self.malformed_rate = 1.0
+            if "stream_chunks" in data:
+                self.stream_chunks = max(1, int(data["stream_chunks"]))
+            if "responses" in data:
+                self.responses.update(data["responses"])
+            if "seed" in data:
+                self.rng.seed(data["seed"])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "latency": dict(self.latency),
+                "error_429": self.error_429,
+                "error_5xx": self.error_5xx,
+                "retry_after": self.retry_after,
+                "malformed": list(self.malformed),
+                "malformed_rate": self.malformed_rate,
+                "stream_chunks": self.stream_chunks,
+                "canned_kinds": sorted(self.responses),
+            }
+
+    def sample_latency(self, kind):
+        with self._lock:
+            spec = self.latency.get(kind, self.latency["default"])
+            sampler = self._samplers.get(spec)
+            if sampler is None:
+                sampler = self._samplers[spec] = parse_latency(spec)
+            return sampler(self.rng)
+
+    def roll(self):
+        """→ None | 429 | 5xx status | "malformed:<mode>" for one request."""
+        with self._lock:
+            r = self.rng.random()
+            if r < self.error_429:
+                return 429
+            if r < self.error_429 + self.error_5xx:
+                return self.rng.choice((500, 503))
+            if self.malformed and self.rng.random() < self.malformed_rate:
+                return "malformed:" + self.rng.choice(self.malformed)
+            return None
+
+    def uniform(self, lo, hi):
+        with self._lock:
+            return self.rng.uniform(lo, hi)
+
+
+class FakeStats:
+    """Per-kind request / error / malformed counters (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._c = {"requests": 0, "streams": 0, "errors_429": 0, "errors_5xx": 0,
+                       "malformed": 0, "latency_seconds": 0.0}
+            self._kinds = {}
+
+    def add(self, kind=None, **deltas):
+        with self._lock:
+            for k, v in deltas.items():
+                self._c[k] += v
+            if kind:
+                self._kinds[kind] = self._kinds.get(kind, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self._c)
+            out["by_kind"] = dict(self._kinds)
+        n = out["requests"]
+        out["avg_latency"] = round(out["latency_seconds"] / n, 4) if n else 0.0
+        out["latency_seconds"] = round(out["latency_seconds"], 3)
+        return out
+
+
+CONFIG = FakeConfig()
+STATS = FakeStats()
+
+
+# -------------------------------------------------
+# Prompt → templated reply
+# -------------------------------------------------
+def classify(prompt):
+    if "PROGRAM id=" in prompt:
+        return "gate1_batch"
+    if "strict DSA concept detector" in prompt:
+        return "gate1"
+    if "open concept identifier" in prompt:
+        return "gate2"
+    if "IR Refiner" in prompt:
+        return "ir"
+    if "IR Generator" in prompt:
+        return "adaptive"
+    if "animation_plan" in prompt:
+        return "animate"
+    if '"segments"' in prompt:
+        return "split"
+    return "chat"
+
+
+def extract_code(prompt):
+    m = _CODE_FENCE_RE.search(prompt)
+    if m:
+        return m.group(1).strip()
+    _, sep, tail = prompt.rpartition("Code:")
+    return tail.strip() if sep else ""
+
+
+def _gate1_row(code):
+    guess = detect_mode(code)
+    concept, sub_concept = MODE_TO_GATE1.get(guess.mode, ("unknown", ""))
+    return {"concept": concept, "sub_concept": sub_concept,
+            "explanation": f"fake-gemini: {guess.mode} @ {guess.confidence:.2f}",
+            "confidence": round(guess.confidence, 2)}
+
+
+def _line_steps(code, limit=40):
+    lines = [ln.strip() for ln in code.splitlines() if ln.strip() and not ln.strip().startswith("#")]
+    return [
+        {"action": "EXECUTE_LINE", "description": f"Line {i}: {ln}", "vars": {"line": i}}
+        for i, ln in enumerate(lines[:limit], start=1)
+    ] or [{"action": "note", "description": "Empty program", "vars": {}}]
+
+
+def templated_reply(kind, prompt):
+    code = extract_code(prompt)
+    if kind == "gate1":
+        return _gate1_row(code)
+    if kind == "gate1_batch":
+        return [dict(_gate1_row(c), id=pid) for pid, c in _PROGRAM_RE.findall(prompt)]
+    if kind == "gate2":
+        return {"concept": "general programming", "explanation": "fake-gemini: templated Gate-2 reply"}
+    if kind == "ir":
+        m = re.search(r'Parent Animator: (\S+)|"parent_animator":"([^"<]+)"', prompt)
+        parent = (m.group(1) or m.group(2)) if m else "GenericAIAnimator"
+        return {"steps": _line_steps(code),
+                "meta": {"layout": "linear", "theme": "softblue", "parent_animator": parent}}
+    if kind == "adaptive":
+        return _line_steps(code)
+    if kind == "animate":
+        return {"animation_plan": {
+            "layout": "linear", "theme": "softblue",
+            "objects": [{"id": f"cell_{i}", "type": "cell", "label": str(i), "x": 100 + 60 * i, "y": 100}
+                        for i in range(4)],
+            "operations": [{"type": "highlight", "target": f"cell_{i}", "step": i} for i in range(4)],
+        }}
+    if kind == "split":
+        n = max(1, len(code.splitlines()))
+        return {"segments": [{"concept": "generic", "line_range": [1, n], "code": code}]}
+    return "This is a reply from the local fake Gemini server."
+
+
+def reply_text(kind, prompt):
+    canned = CONFIG.responses.get(kind)
+    if canned is None:
+        value = templated_reply(kind, prompt)
+        return value if isinstance(value, str) else json.dumps(value)
+    text = canned if isinstance(canned, str) else json.dumps(canned)
+    code = extract_code(prompt)
+    return Template(text).safe_substitute(code=json.dumps(code)[1:-1], kind=kind,
+                                          lines=len(code.splitlines()))
+
+
+def malform(text, mode):
+    """Corrupt a reply the way real LLM output goes wrong. → (text, finishReason)"""
+    if mode == "fence":
+        return f"```json\n{text}\n```", "STOP"
+    if mode == "prose":
+        return f"Sure! Here's the JSON you asked for:\n{text}\nLet me know if you need more.", "STOP"
+    if mode == "trailing_comma":
+        i = max(text.rfind("}"), text.rfind("]"))
+        return (text[:i] + "," + text[i:] if i > 0 else text), "STOP"
+    if mode == "truncate":
+        return text[:max(1, int(len(text) * CONFIG.uniform(0.5, 0.9)))], "MAX_TOKENS"
+    return "I'm sorry, I can't produce JSON for that.", "STOP"
+
+
+def _envelope(text, prompt, finish="STOP"):
+    prompt_tokens = max(1, len(prompt) // 4)
+    out_tokens = max(1, len(text) // 4)
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": finish}],
+        "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": out_tokens,
+                          "totalTokenCount": prompt_tokens + out_tokens},
+    }
+
+
+def _error_body(status, retry_after):
+    if status == 429:
+        return {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED",
+                          "message": "fake-gemini: quota exceeded",
+                          "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo",
+                                       "retryDelay": f"{retry_after:g}s"}]}}
+    return {"error": {"code": status, "status": "UNAVAILABLE" if status == 503 else "INTERNAL",
+                      "message": f"fake-gemini: injected {status}"}}
+
+
+# -------------------------------------------------
+# HTTP handler
+# -------------------------------------------------
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real endpoint
+    quiet = True
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        return json.loads(raw or b"{}")
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/_fake/stats":
+            return self._send_json(200, {"stats": STATS.snapshot(), "config": CONFIG.snapshot()})
+        if path.rstrip("/").endswith("/models"):
+            return self._send_json(200, {"models": [{"name": "models/gemini-2.5-flash"},
+                                                    {"name": "models/gemini-2.0-flash"}]})
+        self._send_json(404, {"error": {"code": 404, "message": f"fake-gemini: no route {path}"}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            data = self._read_json()
+        except ValueError:
+            return self._send_json(400, {"error": {"code": 400, "message": "fake-gemini: body is not JSON"}})
+        if url.path == "/_fake/config":
+            try:
+                CONFIG.update(data)
+            except (ValueError, TypeError) as e:
+                return self._send_json(400, {"error": str(e)})
+            return self._send_json(200, CONFIG.snapshot())
+        if url.path == "/_fake/reset":
+            STATS.reset()
+            return self._send_json(200, {"ok": True})
+        if url.path.endswith(":generateContent"):
+            return self._generate(data, stream=False)
+        if url.path.endswith(":streamGenerateContent"):
+            return self._generate(data, stream="sse" in parse_qs(url.query).get("alt", []))
+        self._send_json(404, {"error": {"code": 404, "message": f"fake-gemini: no route {url.path}"}})
+
+    def _generate(self, data, stream):
+        try:
+            prompt = "".join(p.get("text", "") for c in data.get("contents", []) for p in c.get("parts", []))
+        except (AttributeError, TypeError):
+            return self._send_json(400, {"error": {"code": 400, "message": "fake-gemini: bad contents"}})
+        kind = classify(prompt)
+        latency = CONFIG.sample_latency(kind)
+        outcome = CONFIG.roll()
+        STATS.add(kind, requests=1, streams=int(bool(stream)), latency_seconds=latency)
+
+        if isinstance(outcome, int):
+            time.sleep(latency * 0.2)       # errors come back faster than full generations
+            STATS.add(**{"errors_429" if outcome == 429 else "errors_5xx": 1})
+            retry = CONFIG.retry_after
+            headers = {"Retry-After": f"{retry:g}"} if outcome == 429 else None
+            return self._send_json(outcome, _error_body(outcome, retry), headers)
+
+        text, finish = reply_text(kind, prompt), "STOP"
+        if outcome:
+            STATS.add(malformed=1)
+            text, finish = malform(text, outcome.split(":", 1)[1])
+
+        if not stream:
+            time.sleep(latency)
+            return self._send_json(200, _envelope(text, prompt, finish))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        n = max(1, min(CONFIG.stream_chunks, len(text)))
+        size = -(-len(text) // n)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        for i, piece in enumerate(pieces):
+            time.sleep(latency / len(pieces))
+            last = i == len(pieces) - 1
+            chunk = _envelope(piece, prompt if last else "", finish if last else None)
+            if not last:
+                chunk.pop("usageMetadata")
+                chunk["candidates"][0].pop("finishReason")
+            self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+            self.wfile.flush()
+        self.close_connection = True
+
+
+def make_server(host="127.0.0.1", port=8089):
+    server = ThreadingHTTPServer((host, port), FakeGeminiHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local fake Gemini server for AlgoMap load tests.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency", default="fixed:0.05",
+                    help="fixed:S | uniform:LO:HI | normal:MEAN:STD | lognormal:MEDIAN:SIGMA")
+    ap.add_argument("--latency-kind", action="append", default=[], metavar="KIND=SPEC",
+                    help=f"per-prompt-kind latency ({', '.join(KINDS)})")
+    ap.add_argument("--error-429", type=float, default=0.0, help="fraction of calls answered 429")
+    ap.add_argument("--error-5xx", type=float, default=0.0, help="fraction of calls answered 500/503")
+    ap.add_argument("--retry-after", type=float, default=2.0)
+    ap.add_argument("--malformed", default="", help=f"comma list of {', '.join(MALFORMED_MODES)}")
+    ap.add_argument("--malformed-rate", type=float, default=None)
+    ap.add_argument("--responses", help="JSON file {kind: canned reply}; $code / $lines / $kind are substituted")
+    ap.add_argument("--stream-chunks", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args(argv)
+
+    latency = {"default": args.latency}
+    for item in args.latency_kind:
+        kind, _, spec = item.partition("=")
+        latency[kind] = spec
+    update = {"latency": latency, "error_429": args.error_429, "error_5xx": args.error_5xx,
+              "retry_after": args.retry_after, "stream_chunks": args.stream_chunks}
+    if args.malformed:
+        update["malformed"] = args.malformed
+    if args.malformed_rate is not None:
+        update["malformed_rate"] = args.malformed_rate
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            update["responses"] = json.load(f)
+    if args.seed is not None:
+        update["seed"] = args.seed
+    CONFIG.update(update)
+    FakeGeminiHandler.quiet = not args.verbose
+
+    server = make_server(args.host, args.port)
+    print(f"🧪 [FAKE-GEMINI] Listening on http://{args.host}:{args.port} → set GEMINI_BASE_URL to use it")
+    print(f"🧪 [FAKE-GEMINI] {json.dumps(CONFIG.snapshot())}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,44 +3,31 @@ import json
 from backend.gemini_manager import IR_POOL
 from backend.instrument_master import resolve_parent_animator
 from backend.animate_manager import build_animation_plan  # ✅ unified animation planner
+from backend.stream_json import IncrementalStepParser
+from backend.json_repair import repair_json
+from backend.model_cascade import cascade_ask, acascade_ask, final_model
+from backend.llm_schemas import IR_SCHEMA, MAX_TOKENS
+from backend.prompt_compact import for_ir
+from backend.prompt_prefix import register_prefix, PrefixedPrompt
+from backend.log import get_logger, clip
+
+log = get_logger(__name__)
 
 # -------------------------------------------------
 # 🧹 Safe JSON Parser
 # -------------------------------------------------
-# -------------------------------------------------
-# 🧹 Safe JSON Parser (Updated – Debug-Proof)
-# -------------------------------------------------
 def safe_json_parse(text: str):
-    """Cleans Gemini responses and safely parses valid JSON only."""
+    """Parses a Gemini IR reply via repair_json (fences, prose, truncation); never raises."""
     try:
-        # 💥 Step 1: remove all code block markers & debug text
-        clean = re.sub(r"```(?:json|python)?", "", text)
-        clean = re.sub(r"---\s*END\s*DEBUG\s*---", "", clean, flags=re.IGNORECASE)
-        clean = re.sub(r"(?i)(here'?s|below|sure|animation plan|schema|debug)[:\s-]*", "", clean)
-        clean = clean.strip()
-
-        # 💥 Step 2: extract only JSON portion
-        start = clean.find("{")
-        end = clean.rfind("}") + 1
-        if start == -1 or end <= 0:
-            raise ValueError("No valid JSON braces found in response.")
-        core = clean[start:end]
-
-        # 💥 Step 3: ensure braces balanced
-        open_braces = core.count("{")
-        close_braces = core.count("}")
-        if open_braces != close_braces:
-            print(f"[SAFE-PARSE] ⚠️ Unbalanced braces detected ({open_braces} vs {close_braces}) → truncating")
-            # truncate after last closing brace
-            last_brace = core.rfind("}")
-            core = core[:last_brace + 1]
-
-        # 💥 Step 4: final cleanup of escaped quotes
-        core = core.rstrip('"\\ ')
-        return json.loads(core)
-
+        # first JSON value of either kind: a bare top-level array is the step list itself
+        data = repair_json(text)
+        if isinstance(data, list):
+            return {"steps": data}
+        if not isinstance(data, dict):
+            raise ValueError(f"expected an object or a step list, got {type(data).__name__}")
+        return data
     except Exception as e:
-        print(f"[SAFE-PARSE] ❌ JSON parse failed: {e}")
+        log.warning("[SAFE-PARSE] ❌ JSON parse failed: %s", e)
         # Fallback default (non-crashing)
         return {"steps": [], "meta": {"layout": "linear", "theme": "softblue"}}
 
@@ -82,7 +69,7 @@ def compress_ir_minimal(steps, concept="generic"):
         import os
         os.makedirs(os.path.dirname(AUTO_LEARN_PATH), exist_ok=True)
         json.dump(cache, open(AUTO_LEARN_PATH, "w"), indent=2)
-        print(f"🧠 [LEARN] Added new actions for '{concept}': {sorted(new_actions)}")
+        log.info("🧠 [LEARN] Added new actions for '%s': %s", concept, sorted(new_actions))
 
     return compressed
 
@@ -143,110 +130,202 @@ def humanize_btree_narration(steps):
 # -------------------------------------------------
 # 🔧 IR Reconstruction with Gemini
 # -------------------------------------------------
-def reconstruct_with_gemini(code: str, concept: str = "generic", local_ir=None):
-    
-    print("\n[RECONSTRUCT] 🚀 Triggered Gemini IR Reconstruction...")
-    parent = resolve_parent_animator(concept)
-    if local_ir:
-        print("🧠 [REFINER] Local IR already exists → sending it to Gemini for optimization.")
-    else:
-        print("🧠 [REFINER] No local IR found → requesting fresh plan from Gemini.")
-
-    base_prompt = f"""
+RECONSTRUCT_PREFIX = register_prefix("reconstruct", """
 You are AlgoMap's Intelligent IR Refiner.
+Return RAW JSON only:
+{"steps":[{"action":"...","description":"...","vars":{}}],"meta":{"layout":"linear","theme":"softblue","parent_animator":"<Parent Animator>"}}
+""", IR_POOL)
+
+
+def _reconstruct_prompt(code: str, concept: str, parent: str) -> str:
+    code = for_ir(code, site="reconstruct")
+    return PrefixedPrompt(RECONSTRUCT_PREFIX, f"""
 Concept: {concept}
 Parent Animator: {parent}
-
-Return RAW JSON only:
-{{"steps":[{{"action":"...","description":"...","vars":{{}}}}]],"meta":{{"layout":"linear","theme":"softblue","parent_animator":"{parent}"}}}}
 Code:
 {code}
-"""
-    try:
-        print("[RECONSTRUCT] 🔑 Sending IR request to Gemini (IR_POOL)...")
-        response = IR_POOL.ask(base_prompt, hint="animation-plan").strip()
-        print("\n[RECONSTRUCT] 🧩 Raw Gemini response (first 600 chars):")
-        print(response[:600], "\n--- END DEBUG ---")
-
-        data = safe_json_parse(response)
-        steps = data.get("steps", [])
-        meta = data.get("meta", {"layout": "linear", "theme": "softblue", "parent_animator": parent})
-
-        # 🩹 FINAL UNIVERSAL META-FIX
-        if isinstance(meta.get("animation_plan"), dict):
-            inner = meta["animation_plan"]
-            if "objects" in inner and "operations" in inner:
-                print(f"🩹 [FINAL-META-FIX] Flattened animation_plan → meta (objs={len(inner['objects'])}, ops={len(inner['operations'])})")
-                meta["objects"] = inner.get("objects", [])
-                meta["operations"] = inner.get("operations", [])
-                meta.pop("animation_plan", None)
-
-        # 🧠 Enhance + Patch visuals
-        steps = inject_queue_visuals(steps, concept)
-        steps = enhance_narration(steps, concept)
-
-        # Preserve array context
-        if steps and "arr" in steps[0].get("vars", {}):
-            arr = steps[0]["vars"]["arr"]
-            for s in steps:
-                s.setdefault("vars", {})["arr"] = arr
-
-        if local_ir and isinstance(local_ir, dict):
-            for k, v in local_ir.get("meta", {}).items():
-                meta.setdefault(k, v)
-
-        before = len(steps)
-        # 🚫 disable compression temporarily for testing matrix / unknown concepts
-        if concept.lower() in ["matrix", "matrices", "2d arrays", "2d array", "matrix operations", "unknown"]:
-            print(f"[REFINER] DEBUG: keeping all {before} steps (no compression for {concept}).")
+""")
+
+
+def _reconstruct_failed(e, parent):
+    log.warning("[RECONSTRUCT] ❌ Gemini reconstruction failed: %s", e)
+    return (
+        [{"action": "note", "description": f"Reconstruction failed: {e}", "vars": {}}],
+        {"layout": "linear", "theme": "error", "parent_animator": parent}
+    )
+
+
+def _finalize_reconstruction(response: str, concept: str, parent: str, local_ir=None):
+    """Parse + patch a raw IR_POOL reply into (steps, meta)."""
+    response = response.strip()
+    log.debug("[RECONSTRUCT] 🧩 Raw Gemini response (first 600 chars):\n%s", clip(response, 600))
+
+    data = safe_json_parse(response)
+    steps = data.get("steps", [])
+    meta = data.get("meta", {"layout": "linear", "theme": "softblue", "parent_animator": parent})
+
+    # 🩹 FINAL UNIVERSAL META-FIX
+    if isinstance(meta.get("animation_plan"), dict):
+        inner = meta["animation_plan"]
+        if "objects" in inner and "operations" in inner:
+            log.debug("🩹 [FINAL-META-FIX] Flattened animation_plan → meta (objs=%s, ops=%s)", len(inner['objects']), len(inner['operations']))
+            meta["objects"] = inner.get("objects", [])
+            meta["operations"] = inner.get("operations", [])
+            meta.pop("animation_plan", None)
+
+    # 🧠 Enhance + Patch visuals
+    steps = inject_queue_visuals(steps, concept)
+    steps = enhance_narration(steps, concept)
+
+    # Preserve array context
+    if steps and "arr" in steps[0].get("vars", {}):
+        arr = steps[0]["vars"]["arr"]
+        for s in steps:
+            s.setdefault("vars", {})["arr"] = arr
+
+    if local_ir and isinstance(local_ir, dict):
+        for k, v in local_ir.get("meta", {}).items():
+            meta.setdefault(k, v)
+
+    before = len(steps)
+    # 🚫 disable compression temporarily for testing matrix / unknown concepts
+    if concept.lower() in ["matrix", "matrices", "2d arrays", "2d array", "matrix operations", "unknown"]:
+        log.debug("[REFINER] keeping all %s steps (no compression for %s).", before, concept)
+    else:
+        if not local_ir and before > 15:
+            steps = compress_ir_minimal(steps, concept)
         else:
-            if not local_ir and before > 15:
-                steps = compress_ir_minimal(steps, concept)
-            else:
-                print(f"[REFINER] Skipping compression ({before} steps).")
+            log.debug("[REFINER] Skipping compression (%s steps).", before)
+
+    after = len(steps)
+    log.debug("[REFINER] Reduced %s → %s visible steps.", before, after)
 
-        after = len(steps)
-        print(f"[REFINER] Reduced {before} → {after} visible steps.")
+    log.info("[RECONSTRUCT] ✅ Finalized %s steps | Layout: %s | Theme: %s", len(steps), meta.get('layout'), meta.get('theme'))
 
-        print(f"[RECONSTRUCT] ✅ Finalized {len(steps)} steps | Layout: {meta.get('layout')} | Theme: {meta.get('theme')}")
+    # 🧩 Ensure meta consistency
+    if "kind" not in meta:
+        meta["kind"] = concept.lower() if concept else "generic"
+    meta["parent_animator"] = meta.get("parent_animator", "GenericAIAnimator")
 
-        # 🧩 Ensure meta consistency
-        if "kind" not in meta:
-            meta["kind"] = concept.lower() if concept else "generic"
-        meta["parent_animator"] = meta.get("parent_animator", "GenericAIAnimator")
+    return steps, meta
 
-        return steps, meta
 
+def reconstruct_with_gemini(code: str, concept: str = "generic", local_ir=None, deadline=None):
+    
+    log.info("[RECONSTRUCT] 🚀 Triggered Gemini IR Reconstruction...")
+    parent = resolve_parent_animator(concept)
+    if local_ir:
+        log.debug("🧠 [REFINER] Local IR already exists → sending it to Gemini for optimization.")
+    else:
+        log.debug("🧠 [REFINER] No local IR found → requesting fresh plan from Gemini.")
+
+    base_prompt = _reconstruct_prompt(code, concept, parent)
+    try:
+        log.debug("[RECONSTRUCT] 🔑 Sending IR request to Gemini (IR_POOL)...")
+        response = cascade_ask(IR_POOL, "ir", base_prompt, hint="animation-plan", schema=IR_SCHEMA,
+                               max_tokens=MAX_TOKENS["ir"], deadline=deadline)
+        return _finalize_reconstruction(response, concept, parent, local_ir)
     except Exception as e:
-        print(f"[RECONSTRUCT] ❌ Gemini reconstruction failed: {e}")
-        return (
-            [{"action": "note", "description": f"Reconstruction failed: {e}", "vars": {}}], 
-            {"layout": "linear", "theme": "error", "parent_animator": parent}
+        return _reconstruct_failed(e, parent)
+
+
+def iter_reconstruct_with_gemini(code: str, concept: str = "generic", local_ir=None, deadline=None):
+    """
+    Streaming reconstruct_with_gemini: yields {"event": "step", ...} for each element of
+    steps[] as soon as Gemini finishes generating it, then one {"event": "ir", steps, meta}
+    with the fully finalized IR (authoritative — compression may drop streamed steps).
+    """
+    log.info("[RECONSTRUCT] 🚀 Triggered streaming Gemini IR Reconstruction...")
+    parent = resolve_parent_animator(concept)
+    parser = IncrementalStepParser()
+    try:
+        stream = IR_POOL.ask_stream(
+            _reconstruct_prompt(code, concept, parent), hint="animation-plan",
+            schema=IR_SCHEMA, max_tokens=MAX_TOKENS["ir"], deadline=deadline,
+            model=final_model("ir"),   # streamed steps can't be taken back → no cascade
         )
+        for chunk in stream:
+            base = len(parser.steps)
+            for n, step in enumerate(parser.feed(chunk)):
+                step.setdefault("vars", {})
+                step = enhance_narration(inject_queue_visuals([step], concept), concept)[0]
+                yield {"event": "step", "index": base + n, "step": step}
+    except Exception as e:
+        steps, meta = _reconstruct_failed(e, parent)
+        yield {"event": "ir", "steps": parser.steps + steps, "meta": meta}
+        return
+
+    log.info("[RECONSTRUCT] 📡 Streamed %s steps (skipped %s)", len(parser.steps), parser.skipped)
+    steps, meta = _finalize_reconstruction(parser.text, concept, parent, local_ir)
+    yield {"event": "ir", "steps": steps, "meta": meta}
+
+
+async def reconstruct_with_gemini_async(code: str, concept: str = "generic", local_ir=None, deadline=None):
+    """Async twin of reconstruct_with_gemini (ASGI mode)."""
+    from backend.gemini_async import ASYNC_IR_POOL
+
+    log.info("[RECONSTRUCT] 🚀 Triggered async Gemini IR Reconstruction...")
+    parent = resolve_parent_animator(concept)
+    base_prompt = _reconstruct_prompt(code, concept, parent)
+    try:
+        response = await acascade_ask(ASYNC_IR_POOL, "ir", base_prompt, hint="animation-plan", schema=IR_SCHEMA,
+                                      max_tokens=MAX_TOKENS["ir"], deadline=deadline)
+        return _finalize_reconstruction(response, concept, parent, local_ir)
+    except Exception as e:
+        return _reconstruct_failed(e, parent)
 
 # -------------------------------------------------
 # 🎬 Declarative Animation Plan Integration
 # -------------------------------------------------
-def generate_animation_plan(steps, concept="generic"):
-    print("\n🎬 [PLAN] Generating declarative animation plan...")
+def _finalize_plan(plan):
+    if isinstance(plan, dict):
+        if "script" in plan:
+            plan.pop("script", None)
+        if "animation_plan" in plan and isinstance(plan["animation_plan"], dict):
+            inner = plan["animation_plan"]
+            if "objects" in inner and "operations" in inner:
+                log.debug("🩹 [PATCH] Using nested animation_plan (objs=%s, ops=%s)", len(inner['objects']), len(inner['operations']))
+                plan = inner
+        if not plan.get("objects") and not plan.get("elements"):
+            plan.update({"layout": "none", "theme": "transparent", "elements": []})
+            log.debug("🪶 [NOTE] Empty plan detected → skipping placeholder rendering.")
+    log.info("[PLAN] ✅ Built plan → Elements: %s", len(plan.get('objects', [])))
+    return plan
+
+
+def _plan_failed(e, concept):
+    log.warning("[PLAN] ❌ Failed to build plan: %s", e)
+    return {"layout": "none", "elements": [], "relations": [], "intent": [], "meta": {"family": concept, "autoPlay": False}}
+
+
+def _plan_skipped(concept):
+    """Empty plan when the request deadline leaves no room for the (optional) plan call."""
+    plan = _plan_failed("skipped → request deadline nearly spent", concept)
+    plan["meta"]["skipped"] = "deadline"
+    return plan
+
+
+def generate_animation_plan(steps, concept="generic", deadline=None):
+    if deadline is not None and not deadline.allows("plan"):
+        return _plan_skipped(concept)
+    log.info("🎬 [PLAN] Generating declarative animation plan...")
+    try:
+        return _finalize_plan(build_animation_plan(steps, concept, deadline=deadline))
+    except Exception as e:
+        return _plan_failed(e, concept)
+
+
+async def generate_animation_plan_async(steps, concept="generic", deadline=None):
+    """Async twin of generate_animation_plan (ASGI mode)."""
+    from backend.animate_manager import build_animation_plan_async
+
+    if deadline is not None and not deadline.allows("plan"):
+        return _plan_skipped(concept)
+    log.info("🎬 [PLAN] Generating declarative animation plan (async)...")
     try:
-        plan = build_animation_plan(steps, concept)
-        if isinstance(plan, dict):
-            if "script" in plan:
-                plan.pop("script", None)
-            if "animation_plan" in plan and isinstance(plan["animation_plan"], dict):
-                inner = plan["animation_plan"]
-                if "objects" in inner and "operations" in inner:
-                    print(f"🩹 [PATCH] Using nested animation_plan (objs={len(inner['objects'])}, ops={len(inner['operations'])})")
-                    plan = inner
-            if not plan.get("objects") and not plan.get("elements"):
-                plan.update({"layout": "none", "theme": "transparent", "elements": []})
-                print("🪶 [NOTE] Empty plan detected → skipping placeholder rendering.")
-        print(f"[PLAN] ✅ Built plan → Elements: {len(plan.get('objects', []))}")
-        return plan
+        return _finalize_plan(await build_animation_plan_async(steps, concept, deadline=deadline))
     except Exception as e:
-        print("[PLAN] ❌ Failed to build plan:", e)
-        return {"layout": "none", "elements": [], "relations": [], "intent": [], "meta": {"family": concept, "autoPlay": False}}
+        return _plan_failed(e, concept)
 
 # -------------------------------------------------
 # 🧩 Visual Patcher for Queues
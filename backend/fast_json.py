@@ -0,0 +1,213 @@
+# backend/fast_json.py
+# Encoding + compression for the translate endpoints' payloads, which can carry thousands
+# of steps with a full array snapshot each (instrument_sort's `vars.arr`, set_array steps).
+# - FAST_JSON=1 → orjson when installed (optional dependency); otherwise, and for values
+#   orjson refuses (ints over 64 bits …), compact stdlib json (no indent / spaces)
+# - RESPONSE_COMPRESSION (on by default): br when the `brotli` package is installed, else
+#   gzip, negotiated from Accept-Encoding, for bodies of RESPONSE_COMPRESS_MIN_BYTES or more
+# Benchmark (encode time + wire size per step count, on real instrument_sort payloads,
+# full and keyframe + delta steps):
+#     python -m backend.fast_json --sizes 10,30,60,100
+import os
+import gzip
+import json
+import time
+import threading
+
+try:
+    import orjson
+except ImportError:  # optional: FAST_JSON falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+FAST_JSON = os.getenv("FAST_JSON", "0").strip().lower() in ("1", "true", "yes", "on")
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "1").strip().lower() not in ("0", "false", "no", "off")
+COMPRESS_MIN_BYTES = _env_int("RESPONSE_COMPRESS_MIN_BYTES", 1400)   # ~one packet: smaller isn't worth it
+GZIP_LEVEL = _env_int("RESPONSE_GZIP_LEVEL", 5)
+BROTLI_QUALITY = _env_int("RESPONSE_BROTLI_QUALITY", 4)              # 11 is far too slow per request
+
+_ORJSON_OPTS = orjson.OPT_NON_STR_KEYS if orjson else 0   # graph IRs use int node ids as keys
+
+
+def encoder_name():
+    return "orjson" if FAST_JSON and orjson else "json"
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def dumps(obj, fast=None):
+    """obj → UTF-8 JSON bytes (orjson when `fast` / FAST_JSON and it is installed)."""
+    if (FAST_JSON if fast is None else fast) and orjson:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTS, default=str)
+        except TypeError:
+            pass   # e.g. an int beyond 64 bits from a factorial trace
+    return _stdlib_dumps(obj)
+
+
+# -------------------------------------------------
+# Content negotiation + compression
+# -------------------------------------------------
+def supported_encodings():
+    return ("br", "gzip") if brotli else ("gzip",)
+
+
+def negotiate(accept_encoding):
+    """Best codec the client accepts (q > 0), preferring br over gzip on ties → name or None."""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip()] = q
+    best, best_q = None, 0.0
+    for codec in supported_encodings():
+        q = accepted.get(codec, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = codec, q
+    return best
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+class WireStats:
+    """Bytes before / after compression and time spent encoding, per codec."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codecs = {}
+
+    def record(self, codec, raw, wire, encode_seconds, compress_seconds):
+        with self._lock:
+            c = self._codecs.setdefault(codec, {"responses": 0, "raw_bytes": 0, "wire_bytes": 0,
+                                                "encode_seconds": 0.0, "compress_seconds": 0.0})
+            c["responses"] += 1
+            c["raw_bytes"] += raw
+            c["wire_bytes"] += wire
+            c["encode_seconds"] += encode_seconds
+            c["compress_seconds"] += compress_seconds
+
+    def snapshot(self):
+        with self._lock:
+            codecs = {k: dict(v) for k, v in self._codecs.items()}
+        for c in codecs.values():
+            c["ratio"] = round(c["wire_bytes"] / c["raw_bytes"], 4) if c["raw_bytes"] else 1.0
+            c["encode_seconds"] = round(c["encode_seconds"], 4)
+            c["compress_seconds"] = round(c["compress_seconds"], 4)
+        return {
+            "encoder": encoder_name(),
+            "compression": RESPONSE_COMPRESSION,
+            "available": list(supported_encodings()),
+            "min_bytes": COMPRESS_MIN_BYTES,
+            "codecs": codecs,
+        }
+
+
+WIRE_STATS = WireStats()
+
+
+def encode_payload(payload, accept_encoding=""):
+    """payload → (body bytes, Content-Encoding or None) for a JSON response."""
+    started = time.perf_counter()
+    body = dumps(payload)
+    encoded = time.perf_counter()
+    encoding = negotiate(accept_encoding) if RESPONSE_COMPRESSION and len(body) >= COMPRESS_MIN_BYTES else None
+    wire = compress(body, encoding) if encoding else body
+    WIRE_STATS.record(encoding or "identity", len(body), len(wire),
+                      encoded - started, time.perf_counter() - encoded)
+    return wire, encoding
+
+
+# -------------------------------------------------
+# CLI: encode time + wire size per step count
+# -------------------------------------------------
+def _bubble_sort_code(size):
+    import random
+    arr = random.Random(size).sample(range(10 * size), size)
+    return (f"arr = {arr}\n"
+            "for i in range(len(arr)):\n"
+            "    for j in range(len(arr) - i - 1):\n"
+            "        if arr[j] > arr[j + 1]:\n"
+            "            arr[j], arr[j + 1] = arr[j + 1], arr[j]\n")
+
+
+def _best_ms(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 2), out
+
+
+def bench(sizes=(10, 30, 60, 100), repeat=5):
+    """Per array size: steps, encode ms + bytes per encoder, compress ms + bytes per codec,
+    and the same for keyframe + delta steps."""
+    from backend.instrument_sort import translate_sort_from_code
+    from backend.step_delta import encode_payload_steps
+
+    rows = []
+    for size in sizes:
+        res = translate_sort_from_code(_bubble_sort_code(size))
+        payload = {"segments": [{"idx": 1, "concept": "sorting", "steps": res["steps"],
+                                 "meta": res.get("meta", {}), "step_count": len(res["steps"])}]}
+        row = {"array": size, "steps": len(res["steps"]), "encode": {}, "compress": {}}
+        # what Flask's jsonify did: sorted keys, ASCII-escaped
+        ms, body = _best_ms(lambda: json.dumps(payload, sort_keys=True, separators=(",", ":")).encode(), repeat)
+        row["encode"]["jsonify"] = {"ms": ms, "bytes": len(body)}
+        ms, body = _best_ms(lambda: dumps(payload, fast=False), repeat)
+        row["encode"]["json"] = {"ms": ms, "bytes": len(body)}
+        if orjson:
+            ms, body = _best_ms(lambda: dumps(payload, fast=True), repeat)
+            row["encode"]["orjson"] = {"ms": ms, "bytes": len(body)}
+        for codec in supported_encodings():
+            ms, wire = _best_ms(lambda: compress(body, codec), repeat)
+            row["compress"][codec] = {"ms": ms, "bytes": len(wire), "ratio": round(len(wire) / len(body), 4)}
+        # "step_encoding": "delta" (backend/step_delta.py), then the same codecs
+        ms, encoded = _best_ms(lambda: encode_payload_steps(payload), repeat)
+        body = dumps(encoded)
+        row["delta"] = {"ms": ms, "bytes": len(body),
+                        **{codec: len(compress(body, codec)) for codec in supported_encodings()}}
+        rows.append(row)
+    return {"orjson": bool(orjson), "brotli": bool(brotli), "rows": rows}
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Encode time + wire size of translate payloads per step count.")
+    ap.add_argument("--sizes", default="10,30,60,100", help="bubble-sort array lengths (steps grow ~n²)")
+    ap.add_argument("--repeat", type=int, default=5, help="best of N runs")
+    args = ap.parse_args(argv)
+    sizes = tuple(int(s) for s in args.sizes.split(",") if s.strip())
+    print(json.dumps(bench(sizes, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
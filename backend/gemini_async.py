@@ -0,0 +1,225 @@
+# backend/gemini_async.py
+# Asyncio-native twins of DETECT_POOL / IR_POOL / ANIMATE_POOL.
+# They share keys, the key scheduler and the response cache with the sync pools,
+# but run on the event loop → one worker can keep hundreds of Gemini calls in flight.
+# With GEMINI_KEY_STATE_DB set every scheduler decision is a SQLite transaction (busy
+# timeout included), so those calls run in a worker thread instead of on the loop.
+import os
+import time
+import asyncio
+import weakref
+
+try:
+    import httpx
+except ImportError:  # optional: only needed for the ASGI mode (backend/asgi.py)
+    httpx = None
+
+from backend.gemini_manager import (
+    DETECT_POOL, IR_POOL, ANIMATE_POOL, GeminiAPIError, GeminiResponseError, check_gemini_response,
+    endpoint_url, generation_config, cache_key_for, schema_rejected, request_fault,
+    key_wait, check_deadline, request_body,
+)
+from backend.prompt_prefix import with_hint
+from backend.key_scheduler import estimate_tokens
+from backend.deadline import DeadlineExceeded
+from backend.gemini_cache import RESPONSE_CACHE
+from backend.gemini_cassette import CASSETTE
+from backend.gemini_http import CONNECT_TIMEOUT, READ_TIMEOUT, POOL_MAXSIZE
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+ASYNC_MAX_CONNECTIONS = int(os.getenv("GEMINI_ASYNC_MAX_CONNECTIONS", "200"))
+
+# one AsyncClient per running event loop (uvicorn runs one loop per worker)
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Return the keep-alive AsyncClient bound to the current event loop."""
+    if httpx is None:
+        raise RuntimeError("httpx is not installed → `pip install httpx` to use the async Gemini pools.")
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=POOL_MAXSIZE,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose_client():
+    """Close the client of the current loop (ASGI lifespan shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+# -------------------------------------------------
+# Async Key Manager (wraps a sync pool)
+# -------------------------------------------------
+class AsyncGeminiPool:
+    """Async `ask()` over the keys + scheduler of an existing sync key manager."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.tag = f"ASYNC-{pool.TAG}"
+
+    async def _call(self, prompt, key, hint=None, gen_config=None, model=None):
+        if self.pool.SENDS_HINT:
+            prompt = with_hint(prompt, hint)
+
+        started = time.perf_counter()
+        client = get_async_client()
+        resp = await client.post(endpoint_url(gen_config, model=model),
+                                 params={"key": key}, json=request_body(prompt, gen_config))
+        log.debug("[%s] ⏱️ total=%.1fms", self.tag, (time.perf_counter() - started) * 1000)
+
+        label = self.pool.API_LABEL
+        data = check_gemini_response(resp, label)
+        try:
+            text = data["candidates"][0]["content"]["parts"][0]["text"]
+        except Exception as e:
+            raise GeminiResponseError(f"Unexpected {label} response: {data}") from e
+        return text, data.get("usageMetadata") or {}
+
+    async def _scheduler(self, method, *args, **kwargs):
+        """Call a scheduler method; off the loop when it may block on the shared SQLite store."""
+        fn = getattr(self.pool.scheduler, method)
+        if self.pool.scheduler.store is None:
+            return fn(*args, **kwargs)   # in-memory: a short lock, no I/O
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    def _release_cancelled(self, idx):
+        """release() from a cancelled task: must not await (a second cancel would skip it)."""
+        scheduler = self.pool.scheduler
+        if scheduler.store is None:
+            scheduler.release(idx)
+        else:
+            asyncio.get_running_loop().run_in_executor(None, scheduler.release, idx)
+
+    async def _acquire(self, est, exclude, timeout):
+        """Scheduler pick without blocking the loop: poll try_acquire() with asyncio.sleep."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            idx, wait = await self._scheduler("try_acquire", est, exclude)
+            if idx is not None:
+                return idx
+            if wait is None or loop.time() + wait > deadline:
+                return None
+            await asyncio.sleep(wait)
+
+    async def ask(self, prompt, hint=None, schema=None, max_tokens=None, deadline=None, model=None):
+        """Same contract as the sync ask(): cache first, then the key scheduler."""
+        gen_config = generation_config(schema, max_tokens)
+        cache_key = cache_key_for(hint, prompt, gen_config, model)
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            log.debug("[%s] ⚡ Cache hit (%s)", self.tag, cache_key[:10])
+            return cached
+        if CASSETTE.replaying:
+            replayed = await CASSETTE.areplay(self.pool.TAG, cache_key)
+            if replayed is not None:
+                RESPONSE_CACHE.set(cache_key, replayed)
+                return replayed
+
+        pool = self.pool
+        est = estimate_tokens(prompt)
+        tried = set()
+        while len(tried) < len(pool.keys):
+            check_deadline(deadline, pool.API_LABEL)
+            idx = await self._acquire(est, tried, key_wait(deadline))
+            if idx is None:
+                break
+            tried.add(idx)
+            log.debug("[%s] Using key %s", self.tag, idx + 1)
+            try:
+                result, latency = await pool.hedger.arun(
+                    lambda i, cfg=gen_config: self._attempt(prompt, i, hint, cfg, est, deadline, model),
+                    idx, lambda: self._spare_key(est, tried),
+                )
+            except GeminiAPIError as e:
+                if schema_rejected(e, gen_config):
+                    log.warning("[%s] ⚠️ Structured output rejected → retrying as plain text", self.tag)
+                    tried.discard(idx)
+                    gen_config = None
+                    cache_key = cache_key_for(hint, prompt, None, model)   # a plain reply is another request
+                    continue
+                if request_fault(e):
+                    raise   # another key won't help (a 404 model → the cascade moves on to its next tier)
+                log.info("[%s] Key %s failed → %s", self.tag, idx + 1, e)
+                continue
+            except Exception as e:
+                if request_fault(e):
+                    raise
+                log.info("[%s] Key %s failed → %s", self.tag, idx + 1, e)
+                continue
+
+            RESPONSE_CACHE.set(cache_key, result, latency=latency)
+            if CASSETTE.recording:
+                CASSETTE.record(pool.TAG, hint, cache_key, result, latency)
+            return result
+
+        raise RuntimeError(f"❌ All {pool.API_LABEL} keys exhausted. Please refresh keys.")
+
+    async def _spare_key(self, est, tried):
+        """Async twin of the sync pool's _spare_key() (marks the hedge key as tried)."""
+        idx, _ = await self._scheduler("try_acquire", est, tried)
+        if idx is not None:
+            tried.add(idx)
+        return idx
+
+    async def _attempt(self, prompt, idx, hint, gen_config, est, deadline=None, model=None):
+        """One call on key `idx`; reports the outcome to the scheduler. → (text, latency)"""
+        telemetry = self.pool.telemetry
+        started = time.time()
+        try:
+            call = self._call(prompt, self.pool.keys[idx], hint=hint, gen_config=gen_config, model=model)
+            if deadline is None:
+                result, usage = await call
+            else:
+                result, usage = await asyncio.wait_for(call, timeout=max(deadline.remaining(), 0.1))
+        except GeminiAPIError as e:
+            cool = 0.0
+            if request_fault(e):
+                await self._scheduler("release", idx)   # not the key's fault → no verdict
+            else:
+                cool = await self._scheduler("release", idx, ok=False, est_tokens=est,
+                                             status=e.status, retry_after=e.retry_after)
+            telemetry.record(idx, time.time() - started, est, error=e, cooldown=cool)
+            raise
+        except asyncio.CancelledError as e:
+            self._release_cancelled(idx)   # lost a hedge race / request cancelled → no verdict
+            telemetry.record(idx, time.time() - started, est, error=e)
+            raise
+        except asyncio.TimeoutError:
+            await self._scheduler("release", idx)   # our budget ran out, not the key's fault
+            err = DeadlineExceeded(f"{self.pool.API_LABEL}: request deadline reached during the Gemini call")
+            telemetry.record(idx, time.time() - started, est, error=err)
+            raise err
+        except Exception as e:
+            if request_fault(e):
+                await self._scheduler("release", idx)
+            else:
+                await self._scheduler("release", idx, ok=False, est_tokens=est)
+            telemetry.record(idx, time.time() - started, est, error=e)
+            raise
+        await self._scheduler("release", idx, ok=True, est_tokens=est, tokens_used=usage.get("totalTokenCount"))
+        latency = time.time() - started
+        self.pool.hedger.observe(latency)
+        telemetry.record(idx, latency, est, reply=result, usage=usage, structured=bool(gen_config))
+        return result, latency
+
+
+# -------------------------------------------------
+# Global Async Pool Instances
+# -------------------------------------------------
+ASYNC_DETECT_POOL = AsyncGeminiPool(DETECT_POOL)
+ASYNC_IR_POOL = AsyncGeminiPool(IR_POOL)
+ASYNC_ANIMATE_POOL = AsyncGeminiPool(ANIMATE_POOL)
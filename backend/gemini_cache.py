@@ -0,0 +1,226 @@
+# backend/gemini_cache.py
+# Content-addressed response cache shared by DETECT_POOL / IR_POOL / ANIMATE_POOL.
+# Tier 1 → in-memory LRU (per worker), Tier 2 → optional on-disk store (shared by workers).
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+load_dotenv()
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class GeminiResponseCache:
+    """
+    LRU + TTL cache for raw Gemini reply text.
+    Keys are sha256 hashes of (model, hint, prompt), so identical textbook programs
+    submitted by a whole classroom are answered once and then served locally.
+    """
+
+    def __init__(self, max_entries=512, ttl=3600, disk_dir=None, max_disk_entries=5000, enabled=True):
+        self.enabled = enabled
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.disk_dir = disk_dir or None
+        self.max_disk_entries = max(1, max_disk_entries)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (created_at, latency, value)
+        self._disk_writes = 0
+        self._stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "saved_seconds": 0.0,
+        }
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    # -------------------------------------------------
+    # Keys
+    # -------------------------------------------------
+    @staticmethod
+    def make_key(model, hint, prompt, *extra):
+        """Stable content hash for one upstream request."""
+        h = hashlib.sha256()
+        for part in (model, hint, prompt, *extra):
+            h.update(str(part or "").encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    # -------------------------------------------------
+    # Lookup / store
+    # -------------------------------------------------
+    def get(self, key):
+        """Return cached text or None. Memory first, then disk."""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, latency, value = entry
+                if self.ttl and now - created > self.ttl:
+                    del self._entries[key]
+                    self._stats["expired"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["saved_seconds"] += latency
+                    return value
+
+        entry = self._disk_get(key, now)
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            created, latency, value = entry
+            self._stats["disk_hits"] += 1
+            self._stats["saved_seconds"] += latency
+            self._put_memory(key, entry)
+        return value
+
+    def set(self, key, value, latency=0.0):
+        """Store a successful reply along with the latency it cost upstream."""
+        if not self.enabled or value is None:
+            return
+        entry = (time.time(), float(latency or 0.0), value)
+        with self._lock:
+            self._put_memory(key, entry)
+            self._stats["stores"] += 1
+        self._disk_set(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out["entries"] = len(self._entries)
+        lookups = out["hits"] + out["disk_hits"] + out["misses"]
+        out["hit_rate"] = round((out["hits"] + out["disk_hits"]) / lookups, 4) if lookups else 0.0
+        out["saved_seconds"] = round(out["saved_seconds"], 3)
+        out["max_entries"] = self.max_entries
+        out["ttl"] = self.ttl
+        out["disk_dir"] = self.disk_dir
+        out["enabled"] = self.enabled
+        return out
+
+    # -------------------------------------------------
+    # Internals
+    # -------------------------------------------------
+    def _put_memory(self, key, entry):
+        """Caller must hold the lock."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                rec = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl and now - rec.get("created", 0) > self.ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self._stats["expired"] += 1
+            return None
+        return rec.get("created", now), rec.get("latency", 0.0), rec.get("value")
+
+    def _disk_set(self, key, entry):
+        if not self.disk_dir:
+            return
+        created, latency, value = entry
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # atomic write → safe when several gunicorn workers share the directory
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created": created, "latency": latency, "value": value}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning("⚠️ [GEMINI-CACHE] Disk write failed → %s", e)
+            return
+
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % 64 == 0
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Drop expired files, then the oldest ones until under max_disk_entries."""
+        files = []
+        now = time.time()
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                if self.ttl and now - mtime > self.ttl:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                files.append((mtime, path))
+
+        overflow = len(files) - self.max_disk_entries
+        if overflow <= 0:
+            return
+        files.sort()
+        for _, path in files[:overflow]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._stats["evictions"] += overflow
+
+
+# -------------------------------------------------
+# Global cache (shared by all key managers)
+# -------------------------------------------------
+RESPONSE_CACHE = GeminiResponseCache(
+    max_entries=_env_int("GEMINI_CACHE_SIZE", 512),
+    ttl=_env_int("GEMINI_CACHE_TTL", 3600),
+    disk_dir=os.getenv("GEMINI_CACHE_DIR", "").strip() or None,
+    max_disk_entries=_env_int("GEMINI_CACHE_DISK_MAX", 5000),
+    enabled=os.getenv("GEMINI_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off"),
+)
@@ -0,0 +1,272 @@
+# backend/gemini_cassette.py
+# Record / replay of Gemini traffic for reproducible benchmarks.
+#   GEMINI_CASSETTE=record  → every successful (pool, hint, prompt) → reply is appended, with
+#                             its latency (and per-chunk offsets for streams), to a cassette.
+#   GEMINI_CASSETTE=replay  → the pools answer from the cassette instead of the network,
+#                             sleeping the recorded latency × GEMINI_CASSETTE_TIME_SCALE.
+# Cassettes are JSON lines (gzip when the path ends in .gz); prompts are stored as hashes only.
+# Each recorded call is appended and closed at once (one gzip member per line), so a worker
+# that is killed mid-benchmark loses at most the line it was writing.
+#     python -m backend.gemini_cassette info backend/cassettes/gemini.jsonl.gz
+#     python -m backend.gemini_cassette bench backend/cassettes/gemini.jsonl.gz --corpus progs/
+import os
+import glob
+import gzip
+import json
+import time
+import asyncio
+import threading
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+MODES = ("off", "record", "replay")
+MISS_MODES = ("error", "live")     # replay miss → raise CassetteMiss / fall through to Gemini
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recording for a request (GEMINI_CASSETTE_MISS=error)."""
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class GeminiCassette:
+    """
+    One cassette per process. Lookups match on (pool tag, response-cache key), i.e. model,
+    hint, prompt and generationConfig. A request recorded N times replays its N replies
+    in order, then starts over — the same call sequence always gets the same answers.
+    """
+
+    def __init__(self, mode="off", path=None, time_scale=1.0, miss="error"):
+        self._lock = threading.Lock()
+        self._tapes = {}        # (pool, key) → [entry, ...]
+        self._cursor = {}       # (pool, key) → next index
+        self._stats = {"recorded": 0, "replayed": 0, "misses": 0, "replayed_seconds": 0.0}
+        self.mode = "off"
+        self.configure(mode=mode, path=path, time_scale=time_scale, miss=miss)
+
+    def configure(self, mode=None, path=None, time_scale=None, miss=None):
+        """Switch mode / file at runtime (benchmarks, tests); reloads the tape on replay."""
+        with self._lock:
+            if mode is not None:
+                if mode not in MODES:
+                    raise ValueError(f"GEMINI_CASSETTE must be one of {MODES}, got {mode!r}")
+                self.mode = mode
+            if path is not None:
+                self.path = path
+            if time_scale is not None:
+                self.time_scale = max(0.0, float(time_scale))
+            if miss is not None:
+                if miss not in MISS_MODES:
+                    raise ValueError(f"GEMINI_CASSETTE_MISS must be one of {MISS_MODES}, got {miss!r}")
+                self.miss = miss
+            self._tapes, self._cursor = {}, {}
+            if self.mode == "replay":
+                self._load()
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    # -------------------------------------------------
+    # Record
+    # -------------------------------------------------
+    def record(self, pool, hint, key, text, latency, chunks=None):
+        """Append one successful call. `chunks` = [(seconds_since_start, text), ...] for streams."""
+        entry = {"pool": pool, "hint": hint, "key": key, "ms": round(latency * 1000, 1)}
+        if chunks:
+            entry["chunks"] = [[round(t * 1000, 1), piece] for t, piece in chunks]
+        else:
+            entry["text"] = text
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        path = self.path.format(pid=os.getpid())
+        with self._lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with _open(path, "a") as f:     # closed per call → the file is always complete
+                f.write(line)
+            self._stats["recorded"] += 1
+
+    # -------------------------------------------------
+    # Replay
+    # -------------------------------------------------
+    def _load(self):
+        paths = sorted(glob.glob(self.path.format(pid="*"))) or [self.path]
+        for path in paths:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"❌ Gemini cassette not found: {path}")
+            try:
+                with _open(path, "r") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._tapes.setdefault((entry["pool"], entry["key"]), []).append(entry)
+            except (EOFError, ValueError) as e:
+                # a recorder killed mid-write leaves one partial line at the end; keep the rest
+                log.warning("[CASSETTE] ⚠️ %s ends with a partial record (%s) → ignored", path, e)
+        log.info("[CASSETTE] 📼 Loaded %s recordings from %s file(s)", sum(map(len, self._tapes.values())), len(paths))
+
+    def _next(self, pool, key):
+        with self._lock:
+            tape = self._tapes.get((pool, key))
+            if not tape:
+                self._stats["misses"] += 1
+            else:
+                i = self._cursor.get((pool, key), 0)
+                self._cursor[(pool, key)] = i + 1
+                entry = tape[i % len(tape)]
+                self._stats["replayed"] += 1
+                self._stats["replayed_seconds"] += entry["ms"] / 1000
+                return entry
+        if self.miss == "error":
+            raise CassetteMiss(f"No cassette recording for {pool} request {key[:10]}")
+        log.warning("[CASSETTE] ⚠️ Miss for %s %s → live call", pool, key[:10])
+        return None
+
+    @staticmethod
+    def _text(entry):
+        return entry["text"] if "text" in entry else "".join(piece for _, piece in entry["chunks"])
+
+    def replay(self, pool, key):
+        """Recorded reply text after the (scaled) recorded latency, or None on a live-fallback miss."""
+        entry = self._next(pool, key)
+        if entry is None:
+            return None
+        if self.time_scale:
+            time.sleep(entry["ms"] / 1000 * self.time_scale)
+        return self._text(entry)
+
+    def replay_stream(self, pool, key):
+        """Chunk generator with the recorded inter-chunk timing, or None on a live-fallback miss."""
+        entry = self._next(pool, key)
+        if entry is None:
+            return None
+
+        def chunks():
+            pieces = entry.get("chunks") or [[entry["ms"], entry["text"]]]
+            elapsed = 0.0
+            for offset_ms, piece in pieces:
+                if self.time_scale:
+                    time.sleep(max(0.0, offset_ms - elapsed) / 1000 * self.time_scale)
+                elapsed = offset_ms
+                yield piece
+
+        return chunks()
+
+    async def areplay(self, pool, key):
+        """Async replay() for the ASGI pools."""
+        entry = self._next(pool, key)
+        if entry is None:
+            return None
+        if self.time_scale:
+            await asyncio.sleep(entry["ms"] / 1000 * self.time_scale)
+        return self._text(entry)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out["recordings_loaded"] = sum(map(len, self._tapes.values()))
+        out["replayed_seconds"] = round(out["replayed_seconds"], 3)
+        out.update(mode=self.mode, path=self.path, time_scale=self.time_scale, miss=self.miss)
+        return out
+
+
+CASSETTE = GeminiCassette(
+    mode=os.getenv("GEMINI_CASSETTE", "off").strip().lower() or "off",
+    path=os.getenv("GEMINI_CASSETTE_PATH", "backend/cassettes/gemini.jsonl.gz"),
+    time_scale=_env_float("GEMINI_CASSETTE_TIME_SCALE", 1.0),
+    miss=os.getenv("GEMINI_CASSETTE_MISS", "error").strip().lower(),
+)
+
+
+# -------------------------------------------------
+# CLI: cassette summary + replay benchmark
+# -------------------------------------------------
+def _percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {"n": 0}
+    pick = lambda q: values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+    return {"n": len(values), "mean": round(sum(values) / len(values), 1),
+            "p50": pick(0.5), "p95": pick(0.95), "max": values[-1]}
+
+
+def info(path):
+    tape = GeminiCassette(mode="replay", path=path)
+    by_pool = {}
+    for (pool, _), entries in tape._tapes.items():
+        for e in entries:
+            by_pool.setdefault(f"{pool} / {e.get('hint')}", []).append(e["ms"])
+    return {name: _percentiles(ms) for name, ms in sorted(by_pool.items())}
+
+
+def bench(path, programs, time_scale=1.0, targets=("translate_one", "reconstruct", "plan"), use_cache=False):
+    """Replay `programs` through the pipeline entry points; per-target wall time in ms."""
+    CASSETTE.configure(mode="replay", path=path, time_scale=time_scale)
+    from backend.gemini_cache import RESPONSE_CACHE
+    RESPONSE_CACHE.enabled = use_cache
+
+    from backend.app import run_translate_one, llm_detect_concept_strict
+    from backend.fallback_reconstruct import reconstruct_with_gemini
+    from backend.animate_manager import build_animation_plan
+
+    timings = {t: [] for t in targets}
+    for code in programs:
+        if "translate_one" in targets:
+            started = time.perf_counter()
+            run_translate_one(code, speculative=False)
+            timings["translate_one"].append(round((time.perf_counter() - started) * 1000, 1))
+        if "reconstruct" in targets or "plan" in targets:
+            concept = llm_detect_concept_strict(code).get("concept") or "generic"
+            started = time.perf_counter()
+            steps, _ = reconstruct_with_gemini(code, concept)
+            if "reconstruct" in targets:
+                timings["reconstruct"].append(round((time.perf_counter() - started) * 1000, 1))
+            if "plan" in targets:
+                started = time.perf_counter()
+                build_animation_plan(steps, concept)
+                timings["plan"].append(round((time.perf_counter() - started) * 1000, 1))
+    out = {t: _percentiles(v) for t, v in timings.items()}
+    out["cassette"] = CASSETTE.stats()
+    return out
+
+
+def main(argv=None):
+    import argparse
+    from backend.loadtest import load_corpus
+
+    ap = argparse.ArgumentParser(description="Inspect or benchmark against a Gemini cassette.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_info = sub.add_parser("info", help="recordings + latency per pool / hint")
+    p_info.add_argument("path")
+    p_bench = sub.add_parser("bench", help="replay a corpus through translate_one / reconstruct / plan")
+    p_bench.add_argument("path")
+    p_bench.add_argument("--corpus", help=".py file, directory of .py files, or JSON list of programs")
+    p_bench.add_argument("--time-scale", type=float, default=1.0, help="0 → no simulated latency")
+    p_bench.add_argument("--targets", default="translate_one,reconstruct,plan")
+    p_bench.add_argument("--with-cache", action="store_true", help="keep the response cache enabled")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "info":
+        print(json.dumps(info(args.path), indent=2))
+    else:
+        targets = tuple(t.strip() for t in args.targets.split(",") if t.strip())
+        print(json.dumps(bench(args.path, load_corpus(args.corpus), args.time_scale, targets, args.with_cache), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# backend/gemini_http.py
+# Shared keep-alive HTTP pool for every outbound Gemini call.
+# One requests.Session per process → TLS handshakes are paid once per connection,
+# not once per request, and every call gets a (connect, read) timeout.
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+CONNECT_TIMEOUT = _env_float("GEMINI_CONNECT_TIMEOUT", 5.0)
+READ_TIMEOUT = _env_float("GEMINI_READ_TIMEOUT", 60.0)
+POOL_CONNECTIONS = int(_env_float("GEMINI_POOL_CONNECTIONS", 4))
+POOL_MAXSIZE = int(_env_float("GEMINI_POOL_MAXSIZE", 32))
+
+# per-thread scratch space for the connect() timer
+_timing = threading.local()
+
+
+# -------------------------------------------------
+# Timed connections (measure TCP + TLS setup)
+# -------------------------------------------------
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _timing.connect = getattr(_timing, "connect", 0.0) + time.perf_counter() - started
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _timing.connect = getattr(_timing, "connect", 0.0) + time.perf_counter() - started
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools hand out connections that time their own connect()."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+# -------------------------------------------------
+# Shared session (lazy, thread-safe singleton)
+# -------------------------------------------------
+_session = None
+_session_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    # pooled_post: timing sums cover the successful calls only
+    "calls": 0,
+    "calls_ok": 0,
+    "new_connections": 0,
+    "connect_ms": 0.0,
+    "ttfb_ms": 0.0,
+    "total_ms": 0.0,
+    # pooled_stream: connect / ttfb only (total depends on the consumer)
+    "streams": 0,
+    "streams_ok": 0,
+    "stream_new_connections": 0,
+    "stream_connect_ms": 0.0,
+    "stream_ttfb_ms": 0.0,
+}
+
+
+def get_session():
+    """Return the process-wide pooled session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = _TimedAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    max_retries=0,      # key rotation in gemini_manager handles retries
+                    pool_block=False,
+                )
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update({"Connection": "keep-alive"})
+                _session = s
+    return _session
+
+
+def pooled_post(url, *, params=None, json=None, data=None, headers=None, timeout=None):
+    """
+    POST through the shared pool and attach a latency breakdown to the response:
+    resp.timing = {"connect_ms", "ttfb_ms", "total_ms", "reused"}.
+    `connect_ms` is 0 when a keep-alive connection was reused.
+    """
+    _timing.connect = 0.0
+    started = time.perf_counter()
+    try:
+        resp = get_session().post(
+            url,
+            params=params,
+            json=json,
+            data=data,
+            headers=headers,
+            timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT),
+            stream=True,   # returns once headers arrive → time-to-first-byte
+        )
+        ttfb = time.perf_counter() - started
+        resp.content     # drain body; releases the connection back to the pool
+    except Exception:
+        with _stats_lock:
+            _stats["calls"] += 1
+        raise
+
+    total = time.perf_counter() - started
+    connect = getattr(_timing, "connect", 0.0)
+    resp.timing = {
+        "connect_ms": round(connect * 1000, 1),
+        "ttfb_ms": round(ttfb * 1000, 1),
+        "total_ms": round(total * 1000, 1),
+        "reused": connect == 0.0,
+    }
+
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["calls_ok"] += 1
+        _stats["new_connections"] += 0 if connect == 0.0 else 1
+        _stats["connect_ms"] += connect * 1000
+        _stats["ttfb_ms"] += ttfb * 1000
+        _stats["total_ms"] += total * 1000
+    return resp
+
+
+def pooled_stream(url, *, params=None, json=None, headers=None, timeout=None):
+    """
+    POST through the shared pool without reading the body (streamGenerateContent).
+    The caller iterates the response and must close() it to return the connection.
+    resp.timing has connect/ttfb only; total depends on how long the stream runs.
+    """
+    _timing.connect = 0.0
+    started = time.perf_counter()
+    try:
+        resp = get_session().post(
+            url,
+            params=params,
+            json=json,
+            headers=headers,
+            timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT),   # read timeout applies per chunk
+            stream=True,
+        )
+    except Exception:
+        with _stats_lock:
+            _stats["streams"] += 1
+        raise
+
+    ttfb = time.perf_counter() - started
+    connect = getattr(_timing, "connect", 0.0)
+    resp.timing = {
+        "connect_ms": round(connect * 1000, 1),
+        "ttfb_ms": round(ttfb * 1000, 1),
+        "reused": connect == 0.0,
+    }
+    with _stats_lock:
+        _stats["streams"] += 1
+        _stats["streams_ok"] += 1
+        _stats["stream_new_connections"] += 0 if connect == 0.0 else 1
+        _stats["stream_connect_ms"] += connect * 1000
+        _stats["stream_ttfb_ms"] += ttfb * 1000
+    return resp
+
+
+def format_timing(timing):
+    if not timing:
+        return ""
+    reuse = "reused" if timing.get("reused") else "new conn"
+    total = f" total={timing['total_ms']}ms" if "total_ms" in timing else ""
+    return f"connect={timing['connect_ms']}ms ttfb={timing['ttfb_ms']}ms{total} ({reuse})"
+
+
+def http_stats():
+    """Aggregate pool stats + mean latency breakdown."""
+    with _stats_lock:
+        out = dict(_stats)
+    ok, streams_ok = out["calls_ok"], out["streams_ok"]
+    out["errors"] = (out["calls"] - ok) + (out["streams"] - streams_ok)
+    for k in ("connect_ms", "ttfb_ms", "total_ms"):
+        out[f"avg_{k}"] = round(out[k] / ok, 1) if ok else 0.0
+        out[k] = round(out[k], 1)
+    for k in ("stream_connect_ms", "stream_ttfb_ms"):
+        out[f"avg_{k}"] = round(out[k] / streams_ok, 1) if streams_ok else 0.0
+        out[k] = round(out[k], 1)
+    opened = out["new_connections"] + out["stream_new_connections"]
+    out["connection_reuse_rate"] = round(1 - opened / (ok + streams_ok), 4) if ok + streams_ok else 0.0
+    out["config"] = {
+        "connect_timeout": CONNECT_TIMEOUT,
+        "read_timeout": READ_TIMEOUT,
+        "pool_connections": POOL_CONNECTIONS,
+        "pool_maxsize": POOL_MAXSIZE,
+    }
+    return out
@@ -1,212 +1,587 @@
 # backend/gemini_manager.py
 import os
-import itertools
-import requests
+import json
+import time
+import threading
 from dotenv import load_dotenv
+from backend.gemini_cache import RESPONSE_CACHE
+from backend.gemini_cassette import CASSETTE
+from backend.gemini_http import pooled_post, pooled_stream, format_timing, CONNECT_TIMEOUT, READ_TIMEOUT
+from backend.key_scheduler import KeyScheduler, estimate_tokens, KEY_WAIT
+from backend.key_state_store import SHARED_KEY_STORE, key_id
+from backend.hedging import HedgePolicy
+from backend.key_telemetry import KeyTelemetry
+from backend.deadline import DeadlineExceeded
+from backend.prompt_prefix import with_hint
+from backend.log import get_logger
+
+log = get_logger(__name__)
 
 # -------------------------------------------------
 # Load environment variables
 # -------------------------------------------------
 load_dotenv()
 
+GEMINI_MODEL = "gemini-2.5-flash"
+# override to point every pool (and /api/chat) at another server, e.g. backend/fake_gemini.py
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com").rstrip("/")
+GEMINI_URL = f"{GEMINI_BASE_URL}/v1/models/{GEMINI_MODEL}:generateContent"
+
+# structured output (JSON mime type + response schema + output cap); 0 → plain text replies
+STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "1").strip().lower() not in ("0", "false", "no", "off")
+# 2.5 models count thinking tokens against maxOutputTokens: with dynamic thinking a 1024-token
+# Gate-1 cap can be spent before any JSON is written. Structured calls send this thinkingBudget
+# (0 = off, these are extraction / classification calls) and a positive budget is added on top
+# of the call site's cap; -1 = dynamic thinking (the cap then covers both).
+try:
+    THINKING_BUDGET = int(os.getenv("GEMINI_THINKING_BUDGET", "0"))
+except ValueError:
+    THINKING_BUDGET = 0
+
+
+def endpoint_url(gen_config=None, stream=False, model=None):
+    """
+    GEMINI_URL for one call: another model when the call site's cascade picked one
+    (backend/model_cascade.py), v1beta when a generationConfig is sent (a v1beta field),
+    streamGenerateContent (SSE framing via ?alt=sse) when streaming.
+    """
+    url = GEMINI_URL
+    if model and model != GEMINI_MODEL:
+        url = f"{GEMINI_BASE_URL}/v1/models/{model}:generateContent"
+    if gen_config:
+        url = url.replace("/v1/", "/v1beta/")
+    if stream:
+        url = url.replace(":generateContent", ":streamGenerateContent")
+    return url
+
+
+def generation_config(schema=None, max_tokens=None):
+    """generationConfig for a structured call, or None for a plain text call."""
+    if not STRUCTURED_OUTPUT or (schema is None and max_tokens is None):
+        return None
+    config = {}
+    if schema is not None:
+        config["responseMimeType"] = "application/json"
+        config["responseJsonSchema"] = schema
+    if max_tokens:
+        config["maxOutputTokens"] = int(max_tokens) + max(THINKING_BUDGET, 0)
+    config["thinkingConfig"] = {"thinkingBudget": THINKING_BUDGET}
+    return config
+
+
+def cache_key_for(hint, prompt, gen_config=None, model=None):
+    """Response-cache key; model, schema + output cap are part of the request identity."""
+    model = model or GEMINI_MODEL
+    if gen_config:
+        return RESPONSE_CACHE.make_key(model, hint, prompt, json.dumps(gen_config, sort_keys=True))
+    return RESPONSE_CACHE.make_key(model, hint, prompt)
+
+
+def request_body(prompt, gen_config=None):
+    """generateContent body for `prompt` (a PrefixedPrompt goes as its full text, prefix first)."""
+    body = {"contents": [{"parts": [{"text": str(prompt)}]}]}
+    if gen_config:
+        body["generationConfig"] = gen_config
+    return body
+
+
+def post_prompt(prompt, key, gen_config=None, timeout=None, stream=False, model=None):
+    """One generateContent POST (streamGenerateContent over SSE with stream=True)."""
+    send = pooled_stream if stream else pooled_post
+    params = {"key": key, "alt": "sse"} if stream else {"key": key}
+    headers = {"Content-Type": "application/json"}
+    return send(endpoint_url(gen_config, stream, model=model), headers=headers,
+                params=params, json=request_body(prompt, gen_config), timeout=timeout)
+
+
+def request_timeout(deadline=None):
+    """(connect, read) timeout for one HTTP call, shrunk to the request's remaining budget."""
+    if deadline is None:
+        return None
+    left = max(deadline.remaining(), 0.1)
+    return (min(CONNECT_TIMEOUT, left), min(READ_TIMEOUT, left))
+
+
+def key_wait(deadline=None):
+    """How long ask() may block waiting for a key."""
+    return KEY_WAIT if deadline is None else min(KEY_WAIT, deadline.remaining())
+
+
+def check_deadline(deadline, label):
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded(f"{label}: request deadline reached before the Gemini call")
+
+
+# what a 400 names when the model / endpoint refuses our generationConfig (schema, mime type,
+# thinking config) rather than the prompt
+_CONFIG_ERROR_MARKERS = ("schema", "generation_config", "generationconfig", "response_mime_type",
+                         "responsemimetype", "thinking")
+
+
+def schema_rejected(e, gen_config):
+    """400 naming the generationConfig on a structured call → retry as plain text."""
+    if not gen_config or getattr(e, "status", None) != 400:
+        return False
+    message = str(e).lower()
+    return any(marker in message for marker in _CONFIG_ERROR_MARKERS)
+
+
+# 4xx statuses that do say something about the key: bad / unauthorised key, quota, timeout
+KEY_FAULT_STATUSES = (401, 403, 408, 429)
+
+
+def request_fault(e):
+    """The request itself is at fault (400 INVALID_ARGUMENT, 404 …, or a reply we can't read):
+    every key would fail the same way → no verdict on the key and no rotation."""
+    if isinstance(e, GeminiAPIError):
+        return e.status is not None and e.status < 500 and e.status not in KEY_FAULT_STATUSES
+    return isinstance(e, GeminiResponseError)
+
+
+# usage metadata of the last call made on this thread (read by ask() for TPM accounting)
+_call_info = threading.local()
+
+
+class GeminiAPIError(RuntimeError):
+    """Non-200 reply from Gemini; carries status + retry delay so the scheduler can react."""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class GeminiResponseError(RuntimeError):
+    """200 reply without a text candidate (blocked, truncated, empty)."""
+
+
+def _retry_after(resp):
+    """Seconds to back off, from the Retry-After header or Gemini's RetryInfo detail."""
+    header = resp.headers.get("Retry-After")
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    try:
+        for detail in resp.json().get("error", {}).get("details", []):
+            delay = detail.get("retryDelay")
+            if delay:
+                return float(str(delay).rstrip("s"))
+    except Exception:
+        pass
+    return None
+
+
+def check_gemini_response(resp, label):
+    """Raise GeminiAPIError on a non-200 reply, else return the decoded JSON body."""
+    if resp.status_code != 200:
+        status = resp.status_code
+        if "RESOURCE_EXHAUSTED" in resp.text:
+            status = 429    # quota errors → cooldown, not breaker
+        raise GeminiAPIError(
+            f"{label} API error {resp.status_code}: {resp.text}",
+            status=status,
+            retry_after=_retry_after(resp),
+        )
+    data = resp.json()
+    _call_info.usage = data.get("usageMetadata") or {}
+    return data
+
+
+def iter_sse_text(resp):
+    """Yield the text parts of a streamGenerateContent?alt=sse reply as they arrive."""
+    for line in resp.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        chunk = json.loads(line[5:].strip())
+        if chunk.get("usageMetadata"):
+            _call_info.usage = chunk["usageMetadata"]
+        for cand in (chunk.get("candidates") or [])[:1]:
+            for part in (cand.get("content") or {}).get("parts", []):
+                if part.get("text"):
+                    yield part["text"]
+
+
 # -------------------------------------------------
-# Primary Key Manager — for Detection / Concept Analysis
+# Shared pool logic (cache → scheduler → call → report)
 # -------------------------------------------------
-class GeminiKeyManager:
-    
+class _GeminiPool:
+    ENV_VAR = ""
+    MISSING_KEYS_MSG = ""
+    TAG = "KEY-MANAGER"
+    API_LABEL = "Gemini"
+    KEY_LABEL = "key"
+    SENDS_HINT = True
 
     def __init__(self):
-        # Get detection keys from .env
-        keys_raw = os.getenv("GEMINI_KEYS", "")
+        keys_raw = os.getenv(self.ENV_VAR, "")
         self.keys = [k.strip() for k in keys_raw.split(",") if k.strip()]
         if not self.keys:
-            raise ValueError("❌ No Gemini API keys found in .env (GEMINI_KEYS)")
+            raise ValueError(self.MISSING_KEYS_MSG)
+        self.scheduler = KeyScheduler(
+            self.TAG, len(self.keys),
+            key_ids=[key_id(k) for k in self.keys],
+            store=SHARED_KEY_STORE,
+        )
+        self.hedger = HedgePolicy(self.TAG)
+        self.telemetry = KeyTelemetry(self.TAG, [key_id(k) for k in self.keys])
 
-        self.key_cycle = itertools.cycle(range(len(self.keys)))
-        self.current_index = next(self.key_cycle)
-    
-    def next_key(self):
-        """Return the next Gemini API key (round-robin rotation)."""
-        if not self.keys:
-            raise RuntimeError("No Gemini API keys loaded.")
-        key = self.keys[self.current_index]
-        # move pointer for next call
-        self.current_index = next(self.key_cycle)
-        return key
+    def _call(self, prompt, key, hint=None, gen_config=None, timeout=None, model=None):
+        raise NotImplementedError
 
+    _call_stream = None   # pools that support streamGenerateContent set this
 
-    def _call_gemini(self, prompt, key, hint=None):
+    def ask(self, prompt, hint=None, schema=None, max_tokens=None, deadline=None, model=None):
         """
-        Low-level API call to Gemini for detection tasks.
-        Uses Gemini 2.5 Flash endpoint.
+        Serve from cache, else call on the least-loaded healthy key.
+        Quota errors (429) cool that key down; repeated failures open its breaker;
+        each key is tried at most once per ask(). A call slower than the pool's recent
+        latency percentile may be hedged on a second key (backend/hedging.py).
+        With a `schema` (backend/llm_schemas.py) the reply is constrained JSON.
+        A `deadline` (backend/deadline.py) bounds the key wait and every HTTP timeout.
+        `model` overrides GEMINI_MODEL for this call (model cascades, backend/model_cascade.py).
         """
-        url = "https://generativelanguage.googleapis.com/v1/models/gemini-2.5-flash:generateContent"
-        headers = {"Content-Type": "application/json"}
-        params = {"key": key}
-
-        # Optional hint handling
-        if hint:
-            full_prompt = f"Hint: {hint}\n\n{prompt}"
-        else:
-            full_prompt = prompt
-
-        body = {
-            "contents": [
-                {"parts": [{"text": full_prompt}]}
-            ]
-        }
-
-        resp = requests.post(url, headers=headers, params=params, json=body)
-        if resp.status_code != 200:
-            raise RuntimeError(f"Gemini API error {resp.status_code}: {resp.text}")
-
-        data = resp.json()
+        gen_config = generation_config(schema, max_tokens)
+        cache_key = cache_key_for(hint, prompt, gen_config, model)
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            log.debug("[%s] ⚡ Cache hit (%s)", self.TAG, cache_key[:10])
+            return cached
+        if CASSETTE.replaying:
+            replayed = CASSETTE.replay(self.TAG, cache_key)
+            if replayed is not None:
+                RESPONSE_CACHE.set(cache_key, replayed)
+                return replayed
+
+        est = estimate_tokens(prompt)
+        tried = set()
+        while len(tried) < len(self.keys):
+            check_deadline(deadline, self.API_LABEL)
+            idx = self.scheduler.acquire(est, exclude=tried, timeout=key_wait(deadline))
+            if idx is None:
+                break
+            tried.add(idx)
+            log.debug("[%s] Using %s %s", self.TAG, self.KEY_LABEL, idx + 1)
+            try:
+                result, latency = self.hedger.run(
+                    lambda i, cfg=gen_config: self._attempt(prompt, i, hint, cfg, est, deadline, model),
+                    idx, lambda: self._spare_key(est, tried), self.scheduler.release,
+                )
+            except GeminiAPIError as e:
+                if schema_rejected(e, gen_config):
+                    log.warning("[%s] ⚠️ Structured output rejected → retrying as plain text", self.TAG)
+                    tried.discard(idx)
+                    gen_config = None
+                    cache_key = cache_key_for(hint, prompt, None, model)   # a plain reply is another request
+                    continue
+                if request_fault(e):
+                    raise   # another key won't help (a 404 model → the cascade moves on to its next tier)
+                log.info("[%s] %s %s failed → %s", self.TAG, self.KEY_LABEL, idx + 1, e)
+                continue
+            except Exception as e:
+                if request_fault(e):
+                    raise
+                log.info("[%s] %s %s failed → %s", self.TAG, self.KEY_LABEL, idx + 1, e)
+                continue
+
+            RESPONSE_CACHE.set(cache_key, result, latency=latency)
+            if CASSETTE.recording:
+                CASSETTE.record(self.TAG, hint, cache_key, result, latency)
+            return result
+
+        raise RuntimeError(f"❌ All {self.API_LABEL} keys exhausted. Please refresh keys.")
+
+    def _attempt(self, prompt, idx, hint, gen_config, est, deadline=None, model=None):
+        """One call on key `idx`; reports the outcome to the scheduler. → (text, latency)"""
+        started = time.time()
+        _call_info.usage = {}
         try:
-            return data["candidates"][0]["content"]["parts"][0]["text"]
+            result = self._call(prompt, self.keys[idx], hint=hint, gen_config=gen_config,
+                                timeout=request_timeout(deadline), model=model)
+        except GeminiAPIError as e:
+            cool = 0.0
+            if request_fault(e):
+                self.scheduler.release(idx)   # not the key's fault → no verdict
+            else:
+                cool = self.scheduler.release(idx, ok=False, est_tokens=est, status=e.status,
+                                              retry_after=e.retry_after)
+            self.telemetry.record(idx, time.time() - started, est, error=e, cooldown=cool)
+            raise
         except Exception as e:
-            raise RuntimeError(f"Unexpected Gemini response: {data}") from e
-
-    def ask(self, prompt, hint=None):
+            if deadline is not None and deadline.expired():
+                self.scheduler.release(idx)   # our budget ran out, not the key's fault
+                err = DeadlineExceeded(f"{self.API_LABEL}: request deadline reached during the Gemini call")
+                self.telemetry.record(idx, time.time() - started, est, error=err)
+                raise err from e
+            if request_fault(e):
+                self.scheduler.release(idx)
+            else:
+                self.scheduler.release(idx, ok=False, est_tokens=est)
+            self.telemetry.record(idx, time.time() - started, est, error=e)
+            raise
+        usage = getattr(_call_info, "usage", None) or {}
+        self.scheduler.release(idx, ok=True, est_tokens=est, tokens_used=usage.get("totalTokenCount"))
+        latency = time.time() - started
+        self.hedger.observe(latency)
+        self.telemetry.record(idx, latency, est, reply=result, usage=usage, structured=bool(gen_config))
+        return result, latency
+
+    def _spare_key(self, est, tried):
+        """Non-blocking pick of another healthy key for a hedge (marked as tried)."""
+        idx, _ = self.scheduler.try_acquire(est, exclude=tried)
+        if idx is not None:
+            tried.add(idx)
+        return idx
+
+    def ask_stream(self, prompt, hint=None, schema=None, max_tokens=None, deadline=None, model=None):
         """
-        Try current detection key. If it fails, rotate to the next one.
+        Generator of reply text chunks; same cache + scheduler as ask().
+        Keys are only swapped before the first chunk — once text has been yielded,
+        a failure is raised to the consumer instead of restarting on another key.
         """
-        for _ in range(len(self.keys)):
-            key = self.keys[self.current_index]
+        if self._call_stream is None:
+            yield self.ask(prompt, hint=hint, schema=schema, max_tokens=max_tokens, deadline=deadline, model=model)
+            return
+
+        gen_config = generation_config(schema, max_tokens)
+        cache_key = cache_key_for(hint, prompt, gen_config, model)
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            log.debug("[%s] ⚡ Cache hit (%s)", self.TAG, cache_key[:10])
+            yield cached
+            return
+        if CASSETTE.replaying:
+            replayed = CASSETTE.replay_stream(self.TAG, cache_key)
+            if replayed is not None:
+                chunks = []
+                for piece in replayed:
+                    chunks.append(piece)
+                    yield piece
+                RESPONSE_CACHE.set(cache_key, "".join(chunks))
+                return
+
+        est = estimate_tokens(prompt)
+        tried = set()
+        while len(tried) < len(self.keys):
+            check_deadline(deadline, self.API_LABEL)
+            idx = self.scheduler.acquire(est, exclude=tried, timeout=key_wait(deadline))
+            if idx is None:
+                break
+            tried.add(idx)
+            chunks, offsets = [], []
             try:
-                print(f"[KEY-MANAGER] Using Gemini key {self.current_index + 1}")
-                result = self._call_gemini(prompt, key, hint=hint)
-                return result
+                log.debug("[%s] Streaming with %s %s", self.TAG, self.KEY_LABEL, idx + 1)
+                started = time.time()
+                _call_info.usage = {}
+                for piece in self._call_stream(prompt, self.keys[idx], hint=hint, gen_config=gen_config,
+                                               timeout=request_timeout(deadline), model=model):
+                    chunks.append(piece)
+                    offsets.append(time.time() - started)
+                    yield piece
+            except GeminiAPIError as e:
+                if not chunks and schema_rejected(e, gen_config):
+                    log.warning("[%s] ⚠️ Structured output rejected → retrying as plain text", self.TAG)
+                    self.scheduler.release(idx)
+                    self.telemetry.record(idx, time.time() - started, est, error=e)
+                    tried.discard(idx)
+                    gen_config = None
+                    cache_key = cache_key_for(hint, prompt, None, model)   # a plain reply is another request
+                    continue
+                if request_fault(e):
+                    self.scheduler.release(idx)
+                    self.telemetry.record(idx, time.time() - started, est, error=e)
+                    raise
+                cool = self.scheduler.release(idx, ok=False, est_tokens=est, status=e.status,
+                                              retry_after=e.retry_after)
+                self.telemetry.record(idx, time.time() - started, est, error=e, cooldown=cool)
+                log.info("[%s] %s %s failed → %s", self.TAG, self.KEY_LABEL, idx + 1, e)
+                if chunks:
+                    raise
+                continue
+            except GeneratorExit:
+                self.scheduler.release(idx)   # consumer stopped reading → no verdict on the key
+                raise
             except Exception as e:
-                print(f"[KEY-MANAGER] Key {self.current_index + 1} failed → {e}")
-                self.current_index = next(self.key_cycle)
-
-        raise RuntimeError("❌ All Gemini keys exhausted. Please refresh keys.")
+                if request_fault(e):
+                    self.scheduler.release(idx)
+                    self.telemetry.record(idx, time.time() - started, est, error=e)
+                    raise
+                self.scheduler.release(idx, ok=False, est_tokens=est)
+                self.telemetry.record(idx, time.time() - started, est, error=e)
+                log.info("[%s] %s %s failed → %s", self.TAG, self.KEY_LABEL, idx + 1, e)
+                if chunks:
+                    raise
+                continue
+
+            usage = getattr(_call_info, "usage", None) or {}
+            self.scheduler.release(idx, ok=True, est_tokens=est, tokens_used=usage.get("totalTokenCount"))
+            latency = time.time() - started
+            self.telemetry.record(idx, latency, est, reply="".join(chunks), usage=usage,
+                                  structured=bool(gen_config))
+            RESPONSE_CACHE.set(cache_key, "".join(chunks), latency=latency)
+            if CASSETTE.recording:
+                CASSETTE.record(self.TAG, hint, cache_key, None, latency, chunks=list(zip(offsets, chunks)))
+            return
+
+        raise RuntimeError(f"❌ All {self.API_LABEL} keys exhausted. Please refresh keys.")
 
 
 # -------------------------------------------------
-# Secondary Key Manager — for IR Refinement / Reconstruction
+# Primary Key Manager — for Detection / Concept Analysis
 # -------------------------------------------------
-class GeminiIRKeyManager:
-    def __init__(self):
-        # Get IR refinement keys from .env
-        keys_raw = os.getenv("GEMINI_IR_KEYS", "")
-        self.keys = [k.strip() for k in keys_raw.split(",") if k.strip()]
-        if not self.keys:
-            raise ValueError("❌ No Gemini IR API keys found in .env (GEMINI_IR_KEYS)")
+class GeminiKeyManager(_GeminiPool):
+    ENV_VAR = "GEMINI_KEYS"
+    MISSING_KEYS_MSG = "❌ No Gemini API keys found in .env (GEMINI_KEYS)"
+    TAG = "KEY-MANAGER"
+    API_LABEL = "Gemini"
+    KEY_LABEL = "Gemini key"
+    SENDS_HINT = True
+
+    def next_key(self):
+        """Return the least-loaded healthy key (for SDK callers that bypass ask())."""
+        idx = self.scheduler.acquire()
+        if idx is None:
+            raise RuntimeError("❌ All Gemini keys are cooling down or failing.")
+        self.scheduler.release(idx)   # neutral: the SDK call's outcome isn't reported back
+        return self.keys[idx]
 
-        self.key_cycle = itertools.cycle(range(len(self.keys)))
-        self.current_index = next(self.key_cycle)
 
-    def _call_gemini_ir(self, prompt, key, hint=None):
+    def _call_gemini(self, prompt, key, hint=None, gen_config=None, timeout=None, model=None):
         """
-        Low-level call for IR refinement / reconstruction.
+        Low-level API call to Gemini for detection tasks.
         Uses Gemini 2.5 Flash endpoint.
         """
-        url = "https://generativelanguage.googleapis.com/v1/models/gemini-2.5-flash:generateContent"
-        headers = {"Content-Type": "application/json"}
-        params = {"key": key}
+        # Optional hint handling (keeps a cached prompt prefix intact)
+        full_prompt = with_hint(prompt, hint)
 
-        body = {
-            "contents": [
-                {"parts": [{"text": prompt}]}
-            ]
-        }
+        resp = post_prompt(full_prompt, key, gen_config, timeout=timeout, model=model)
+        log.debug("[KEY-MANAGER] ⏱️ %s", format_timing(resp.timing))
+        data = check_gemini_response(resp, "Gemini")
+        try:
+            return data["candidates"][0]["content"]["parts"][0]["text"]
+        except Exception as e:
+            raise GeminiResponseError(f"Unexpected Gemini response: {data}") from e
 
-        resp = requests.post(url, headers=headers, params=params, json=body)
-        if resp.status_code != 200:
-            raise RuntimeError(f"Gemini IR API error {resp.status_code}: {resp.text}")
+    _call = _call_gemini
 
-        data = resp.json()
+
+# -------------------------------------------------
+# Secondary Key Manager — for IR Refinement / Reconstruction
+# -------------------------------------------------
+class GeminiIRKeyManager(_GeminiPool):
+    ENV_VAR = "GEMINI_IR_KEYS"
+    MISSING_KEYS_MSG = "❌ No Gemini IR API keys found in .env (GEMINI_IR_KEYS)"
+    TAG = "IR-KEY-MANAGER"
+    API_LABEL = "Gemini IR"
+    KEY_LABEL = "IR key"
+    SENDS_HINT = False   # IR prompts are self-contained; hint only feeds the cache key
+
+    def _call_gemini_ir(self, prompt, key, hint=None, gen_config=None, timeout=None, model=None):
+        """
+        Low-level call for IR refinement / reconstruction.
+        Uses Gemini 2.5 Flash endpoint.
+        """
+        resp = post_prompt(prompt, key, gen_config, timeout=timeout, model=model)
+        log.debug("[IR-KEY-MANAGER] ⏱️ %s", format_timing(resp.timing))
+        data = check_gemini_response(resp, "Gemini IR")
         try:
             return data["candidates"][0]["content"]["parts"][0]["text"]
-        except Exception:
-            raise RuntimeError(f"Unexpected Gemini IR response: {data}")
+        except Exception as e:
+            raise GeminiResponseError(f"Unexpected Gemini IR response: {data}") from e
 
-    def ask(self, prompt, hint=None):
+    def _call_gemini_ir_stream(self, prompt, key, hint=None, gen_config=None, timeout=None, model=None):
         """
-        Try current IR key. If it fails, rotate to next one.
+        Streaming twin of _call_gemini_ir (streamGenerateContent, SSE).
+        Yields text chunks as Gemini generates them.
         """
-        for _ in range(len(self.keys)):
-            key = self.keys[self.current_index]
-            try:
-                print(f"[IR-KEY-MANAGER] Using IR key {self.current_index + 1}")
-                result = self._call_gemini_ir(prompt, key, hint=hint)
-                return result
-            except Exception as e:
-                print(f"[IR-KEY-MANAGER] IR key {self.current_index + 1} failed → {e}")
-                self.current_index = next(self.key_cycle)
+        resp = post_prompt(prompt, key, gen_config, timeout=timeout, stream=True, model=model)
+        try:
+            log.debug("[IR-KEY-MANAGER] ⏱️ stream %s", format_timing(resp.timing))
+            if resp.status_code != 200:
+                check_gemini_response(resp, "Gemini IR")
+            yield from iter_sse_text(resp)
+        finally:
+            resp.close()
 
-        raise RuntimeError("❌ All Gemini IR keys exhausted. Please refresh keys.")
+    _call = _call_gemini_ir
+    _call_stream = _call_gemini_ir_stream
 
 # -------------------------------------------------
 # Animation Key Manager — for Framer Motion Layout Generation
 # -------------------------------------------------
-class GeminiAnimateKeyManager:
-    def __init__(self):
-        # Get animation keys from .env
-        keys_raw = os.getenv("GEMINI_ANIMATE_KEYS", "")
-        self.keys = [k.strip() for k in keys_raw.split(",") if k.strip()]
-        if not self.keys:
-            raise ValueError("❌ No Gemini animation keys found in .env (GEMINI_ANIMATE_KEYS)")
-
-        self.key_cycle = itertools.cycle(range(len(self.keys)))
-        self.current_index = next(self.key_cycle)
-
-    def _call_gemini_animate(self, prompt, key, hint=None):
+class GeminiAnimateKeyManager(_GeminiPool):
+    ENV_VAR = "GEMINI_ANIMATE_KEYS"
+    MISSING_KEYS_MSG = "❌ No Gemini animation keys found in .env (GEMINI_ANIMATE_KEYS)"
+    TAG = "ANIMATE-KEY-MANAGER"
+    API_LABEL = "Gemini ANIMATE"
+    KEY_LABEL = "Animation key"
+    SENDS_HINT = True
+
+    def _call_gemini_animate(self, prompt, key, hint=None, gen_config=None, timeout=None, model=None):
         """
         Low-level call for Framer Motion animation schema generation.
         Uses Gemini 2.5 Flash endpoint.
         """
-        url = "https://generativelanguage.googleapis.com/v1/models/gemini-2.5-flash:generateContent"
-        headers = {"Content-Type": "application/json"}
-        params = {"key": key}
-
         # optional hint like "Framer Motion layout plan"
-        if hint:
-            prompt = f"Hint: {hint}\n\n{prompt}"
-
-        body = {
-            "contents": [
-                {"parts": [{"text": prompt}]}
-            ]
-        }
-
-        resp = requests.post(url, headers=headers, params=params, json=body)
-        if resp.status_code != 200:
-            raise RuntimeError(f"Gemini ANIMATE API error {resp.status_code}: {resp.text}")
+        prompt = with_hint(prompt, hint)
 
-        data = resp.json()
+        resp = post_prompt(prompt, key, gen_config, timeout=timeout, model=model)
+        log.debug("[ANIMATE-KEY-MANAGER] ⏱️ %s", format_timing(resp.timing))
+        data = check_gemini_response(resp, "Gemini ANIMATE")
         try:
             return data["candidates"][0]["content"]["parts"][0]["text"]
         except Exception as e:
-            raise RuntimeError(f"Unexpected Gemini ANIMATE response: {data}") from e
-
-    def ask(self, prompt, hint=None):
-        """
-        Try current animation key. If it fails, rotate to the next one.
-        """
-        for _ in range(len(self.keys)):
-            key = self.keys[self.current_index]
-            try:
-                print(f"[ANIMATE-KEY-MANAGER] Using Animation key {self.current_index + 1}")
-                result = self._call_gemini_animate(prompt, key, hint=hint)
-                return result
-            except Exception as e:
-                print(f"[ANIMATE-KEY-MANAGER] Animation key {self.current_index + 1} failed → {e}")
-                self.current_index = next(self.key_cycle)
+            raise GeminiResponseError(f"Unexpected Gemini ANIMATE response: {data}") from e
+
+    _call = _call_gemini_animate
+
+class LazyPool:
+    """
+    Process-wide handle for one key pool. The key manager (keys, scheduler + shared-state
+    store, hedger, telemetry) is built on first use, once, and shared by every importer;
+    class-level facts like TAG are answered without building it.
+    """
+
+    _CLASS_ATTRS = ("TAG", "API_LABEL", "KEY_LABEL", "SENDS_HINT", "ENV_VAR")
+
+    def __init__(self, cls):
+        self._cls = cls
+        self._pool = None
+        self._lock = threading.Lock()
+        if not os.getenv(cls.ENV_VAR, "").strip():
+            log.warning("[%s] ⚠️ %s is empty → calls on this pool will fail", cls.TAG, cls.ENV_VAR)
+
+    @property
+    def built(self):
+        return self._pool is not None
+
+    def get(self):
+        pool = self._pool
+        if pool is None:
+            with self._lock:
+                if self._pool is None:
+                    started = time.perf_counter()
+                    self._pool = self._cls()
+                    log.info("[%s] 🔑 Pool ready on first use: %s keys in %.1fms",
+                             self._cls.TAG, len(self._pool.keys), (time.perf_counter() - started) * 1000)
+                pool = self._pool
+        return pool
+
+    def __getattr__(self, name):
+        if name in LazyPool._CLASS_ATTRS:
+            return getattr(self._cls, name)
+        return getattr(self.get(), name)
 
-        raise RuntimeError("❌ All Gemini ANIMATE keys exhausted. Please refresh keys.")
 
 # -------------------------------------------------
-# Global Pool Instances
+# Global Pool Instances (built lazily, see LazyPool)
 # -------------------------------------------------
 # Primary pool → used for concept detection / open analysis
-DETECT_POOL = GeminiKeyManager()
+DETECT_POOL = LazyPool(GeminiKeyManager)
 
 # Secondary pool → used for IR reconstruction / animation refinement
-IR_POOL = GeminiIRKeyManager()
-
-
+IR_POOL = LazyPool(GeminiIRKeyManager)
 
 # Animation pool → used for generating visual layout and motion schema
-ANIMATE_POOL = GeminiAnimateKeyManager()
+ANIMATE_POOL = LazyPool(GeminiAnimateKeyManager)
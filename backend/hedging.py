@@ -0,0 +1,225 @@
+# backend/hedging.py
+# Hedged Gemini calls: when a call is still running past the pool's recent latency
+# percentile, a duplicate is fired on a different healthy key and whichever reply lands
+# first wins. Hedges are paid from a token budget (GEMINI_HEDGE_MAX_RATE per call), so the
+# extra quota stays bounded even when the whole upstream is slow.
+# The hedge threads are not a concurrency cap: a call only goes to one when a thread is free
+# right now (nothing waits in the executor's queue, so queue time never looks like a slow
+# call); otherwise it runs unhedged on the caller's own thread.
+import os
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+HEDGING_ENABLED = os.getenv("GEMINI_HEDGING", "0").strip().lower() in ("1", "true", "yes", "on")
+HEDGE_PERCENTILE = _env_float("GEMINI_HEDGE_PERCENTILE", 0.95)
+HEDGE_MIN_DELAY = _env_float("GEMINI_HEDGE_MIN_DELAY", 0.5)      # never hedge sooner than this
+HEDGE_MIN_SAMPLES = int(_env_float("GEMINI_HEDGE_MIN_SAMPLES", 20))
+HEDGE_WINDOW = int(_env_float("GEMINI_HEDGE_WINDOW", 200))         # latencies kept per pool
+HEDGE_MAX_RATE = _env_float("GEMINI_HEDGE_MAX_RATE", 0.1)          # hedges per primary call
+HEDGE_BURST = _env_float("GEMINI_HEDGE_BURST", 3)
+
+HEDGE_WORKERS = max(2, int(_env_float("GEMINI_HEDGE_WORKERS", 64)))
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="gemini-hedge")
+_slots = threading.BoundedSemaphore(HEDGE_WORKERS)   # one per submitted task → it starts at once
+
+
+def _submit(fn, *args):
+    """fn(*args) on a free hedge thread → future, or None when every thread is busy."""
+    if not _slots.acquire(blocking=False):
+        return None
+    try:
+        fut = _executor.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    fut.add_done_callback(lambda _: _slots.release())
+    return fut
+
+
+class HedgePolicy:
+    """
+    Per-pool hedging state (thread-safe): recent successful latencies → hedge delay,
+    plus the hedge budget and counters.
+    """
+
+    def __init__(self, name, enabled=HEDGING_ENABLED, percentile=HEDGE_PERCENTILE,
+                 min_delay=HEDGE_MIN_DELAY, min_samples=HEDGE_MIN_SAMPLES,
+                 window=HEDGE_WINDOW, max_rate=HEDGE_MAX_RATE, burst=HEDGE_BURST):
+        self.name = name
+        self.enabled = enabled
+        self.percentile = min(max(percentile, 0.5), 0.999)
+        self.min_delay = min_delay
+        self.min_samples = max(1, min_samples)
+        self.max_rate = max(0.0, max_rate)
+        self.burst = max(1.0, burst)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=max(self.min_samples, window))
+        self._delay = None          # cached percentile, recomputed after new samples
+        self._budget = self.burst
+        self._c = {
+            "calls": 0,
+            "hedges_fired": 0,
+            "hedges_won": 0,
+            "budget_denied": 0,     # slow call, but the hedge budget was empty
+            "no_spare_key": 0,      # slow call, but no other healthy key was free
+            "no_worker": 0,         # every hedge thread busy → ran unhedged on the caller's thread
+            "losers_cancelled": 0,  # loser never started (queued) or was cancelled mid-call
+        }
+
+    # -------------------------------------------------
+    # Latency model + budget
+    # -------------------------------------------------
+    def observe(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+            self._delay = None
+
+    def delay(self):
+        """Seconds to wait before hedging, or None (disabled / not enough samples yet)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            if self._delay is None:
+                ordered = sorted(self._latencies)
+                cut = ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+                self._delay = max(self.min_delay, cut)
+            return self._delay
+
+    def _start_call(self):
+        with self._lock:
+            self._c["calls"] += 1
+            self._budget = min(self.burst, self._budget + self.max_rate)
+
+    def _take_budget(self):
+        with self._lock:
+            if self._budget >= 1.0:
+                self._budget -= 1.0
+                return True
+            self._c["budget_denied"] += 1
+            return False
+
+    def _add(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items():
+                self._c[k] += v
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self._c)
+            samples = len(self._latencies)
+            out["hedge_budget"] = round(self._budget, 2)
+        out["hedge_delay"] = round(self.delay(), 3) if self.delay() is not None else None
+        out["latency_samples"] = samples
+        n = out["calls"]
+        out["hedge_rate"] = round(out["hedges_fired"] / n, 4) if n else 0.0
+        out["win_rate"] = round(out["hedges_won"] / out["hedges_fired"], 4) if out["hedges_fired"] else 0.0
+        out["enabled"] = self.enabled
+        out["percentile"] = self.percentile
+        out["max_rate"] = self.max_rate
+        return out
+
+    # -------------------------------------------------
+    # Hedged execution
+    # -------------------------------------------------
+    def run(self, attempt, idx, spare_key, release):
+        """
+        attempt(idx) → result (reports its own outcome to the scheduler);
+        spare_key() → another acquired key index or None;
+        release(idx) → hands back the key of an attempt cancelled before it started.
+        Returns the first successful result; raises the primary's error if every attempt fails.
+        """
+        self._start_call()
+        delay = self.delay()
+        if delay is None:
+            return attempt(idx)
+
+        primary = _submit(attempt, idx)
+        if primary is None:
+            self._add(no_worker=1)
+            return attempt(idx)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_budget():
+            return primary.result()
+        alt = spare_key()
+        if alt is None:
+            self._add(no_spare_key=1)
+            return primary.result()
+
+        hedge = _submit(attempt, alt)
+        if hedge is None:
+            release(alt)
+            self._add(no_worker=1)
+            return primary.result()
+        log.info("[HEDGE] 🏁 %s: key %s slower than %.2fs → hedging on key %s", self.name, idx + 1, delay, alt + 1)
+        self._add(hedges_fired=1)
+        keys = {primary: idx, hedge: alt}
+        pending, first_error = {primary, hedge}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    for loser in pending:
+                        # queued → never runs; running → reply discarded, key released when it ends
+                        if loser.cancel():
+                            release(keys[loser])
+                            self._add(losers_cancelled=1)
+                    if fut is hedge:
+                        self._add(hedges_won=1)
+                    return fut.result()
+                if fut is primary or first_error is None:
+                    first_error = fut.exception()
+        raise first_error
+
+    async def arun(self, attempt, idx, spare_key):
+        """Async run(): attempt(idx) and spare_key() are coroutine functions; the loser task is cancelled."""
+        self._start_call()
+        delay = self.delay()
+        if delay is None:
+            return await attempt(idx)
+
+        primary = asyncio.ensure_future(attempt(idx))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._take_budget():
+                return await primary
+            alt = await spare_key()
+            if alt is None:
+                self._add(no_spare_key=1)
+                return await primary
+
+            log.info("[HEDGE] 🏁 %s: key %s slower than %.2fs → hedging on key %s", self.name, idx + 1, delay, alt + 1)
+            self._add(hedges_fired=1)
+            hedge = asyncio.ensure_future(attempt(alt))
+            pending, first_error = {primary, hedge}, None
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is hedge:
+                                self._add(hedges_won=1)
+                            self._add(losers_cancelled=len(pending))
+                            return task.result()
+                        if task is primary or first_error is None:
+                            first_error = task.exception()
+                raise first_error
+            finally:
+                hedge.cancel()
+        finally:
+            primary.cancel()   # no-op once finished; cancels the loser / an abandoned call
@@ -13,11 +13,9 @@ from typing import Dict, Any, List
 # ---------------------------
 # Safe trace import
 # ---------------------------
-try:
-    from backend.app import trace
-except ImportError:
-    def trace(msg: str):
-        print(msg)
+from backend.log import make_trace
+
+trace = make_trace(__name__)
 
 BAD_PLACEHOLDERS = {"", "node", "key", "temp.key", "null"}
 
@@ -61,7 +59,7 @@ def translate_btree_insert(code: str | List[int]) -> Dict[str, Any]:
             unique_keys.append(k)
             seen.add(k)
         else:
-            trace(f"[Skip] Duplicate key {k} ignored.")
+            trace("[Skip] Duplicate key %s ignored.", k)
     keys = unique_keys
 
     if not keys:
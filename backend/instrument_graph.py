@@ -9,6 +9,10 @@
 import re, ast
 from typing import Any, Dict, List, Tuple
 
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
 # -----------------------------
 # Helper utilities
 # -----------------------------
@@ -128,7 +132,7 @@ def _translate_bfs(code: str) -> Dict[str, Any]:
                     queue.append(neigh)
                     steps.append(_make_step("enqueue", f"Enqueue node {neigh}", queue=list(queue)))
 
-    print(f"[GRAPH-BFS] ✅ {len(steps)} steps generated.")
+    log.debug("[GRAPH-BFS] ✅ %d steps generated.", len(steps))
     return {
         "steps": steps,
         "meta": {
@@ -186,7 +190,7 @@ def _translate_dfs(code: str) -> Dict[str, Any]:
                     stack.append(neigh)
                     steps.append(_make_step("push", f"Push node {neigh}", stack_snapshot=list(stack)))
 
-    print(f"[GRAPH-DFS] ✅ {len(steps)} steps generated.")
+    log.debug("[GRAPH-DFS] ✅ %d steps generated.", len(steps))
     return {
         "steps": steps,
         "meta": {
@@ -207,7 +211,7 @@ def _translate_dfs(code: str) -> Dict[str, Any]:
 # -----------------------------
 def translate_graph_ir(code: str, variant: str = None) -> Dict[str, Any]:
     v = (variant or "").lower()
-    print(f"[GRAPH-TRANSLATE] Variant → {v}")
+    log.debug("[GRAPH-TRANSLATE] Variant → %s", v)
 
     if "bfs" in v:
         return _translate_bfs(code)
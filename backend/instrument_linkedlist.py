@@ -6,11 +6,10 @@
 import re
 from typing import Any, Dict, List
 
-try:
-    from backend.app import trace
-except ImportError:
-    def trace(msg: str):  # fallback if run standalone
-        print(f"🧭 [TRACE-local] {msg}")
+from backend.log import get_logger, make_trace, lazy_json
+
+log = get_logger(__name__)
+trace = make_trace(__name__)   # per-step breadcrumbs: TRACE level, sampled
 
 
 # -------------------------------------------------------
@@ -76,7 +75,7 @@ def translate_linkedlist_ir(code: str, kind: str = "singly") -> Dict[str, Any]:
     else:
         kind = "singly"
 
-    trace(f"instrument_linkedlist.py → detected list kind: {kind}")
+    trace("instrument_linkedlist.py → detected list kind: %s", kind)
 
     # --- regex matchers ---
     lines = (code or "").splitlines()
@@ -129,7 +128,7 @@ def translate_linkedlist_ir(code: str, kind: str = "singly") -> Dict[str, Any]:
                 list_state=[str(x) for x in nodes],
             )
             steps.append(_with_vars(step, nodes))
-            trace(f"  ↳ insert node {val} → {nodes}")
+            trace("  ↳ insert node %s → %s", val, nodes)
             continue
 
         # DELETE -------------------------------------------------
@@ -150,7 +149,7 @@ def translate_linkedlist_ir(code: str, kind: str = "singly") -> Dict[str, Any]:
                 list_state=[str(x) for x in nodes],
             )
             steps.append(_with_vars(step, nodes))
-            trace(f"  ↳ delete node {val} → {nodes}")
+            trace("  ↳ delete node %s → %s", val, nodes)
             continue
 
         # DISPLAY -------------------------------------------------
@@ -171,7 +170,7 @@ def translate_linkedlist_ir(code: str, kind: str = "singly") -> Dict[str, Any]:
                 list_state=[str(x) for x in nodes],
             )
             steps.append(_with_vars(step, nodes))
-            trace(f"  ↳ display ({direction}) list {nodes}")
+            trace("  ↳ display (%s) list %s", direction, nodes)
             continue
 
         # TRAVERSE -----------------------------------------------
@@ -193,15 +192,13 @@ def translate_linkedlist_ir(code: str, kind: str = "singly") -> Dict[str, Any]:
                     list_state=[str(x) for x in nodes],
                 )
                 steps.append(_with_vars(visit_step, nodes))
-            trace(f"  ↳ traverse through nodes {nodes}")
+            trace("  ↳ traverse through nodes %s", nodes)
             continue
 
     # --- Summary Log ---
-    print("[LL-TRANSLATE] ✅ Steps Generated:")
-    for s in steps:
-        print("  ", s)
+    log.debug("[LL-TRANSLATE] ✅ Steps Generated: %s", lazy_json(steps, indent=2))
 
-    trace(f"instrument_linkedlist.py → translation complete, {len(steps)} steps generated for {kind}")
+    trace("instrument_linkedlist.py → translation complete, %d steps generated for %s", len(steps), kind)
 
     # --- Meta for Frontend ---
     meta = {
@@ -210,5 +207,5 @@ def translate_linkedlist_ir(code: str, kind: str = "singly") -> Dict[str, Any]:
         "layout": kind.replace("_", "-"),
     }
 
-    trace(f"instrument_linkedlist.py → emitting meta.kind={meta['kind']} parent={meta['parent_animator']}")
+    trace("instrument_linkedlist.py → emitting meta.kind=%s parent=%s", meta["kind"], meta["parent_animator"])
     return {"steps": steps, "meta": meta}
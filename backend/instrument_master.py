@@ -4,20 +4,12 @@
 import re
 from typing import Dict, Any
 
-# Import all translators
-from backend.instrument_stack import translate_stack_ir
-from backend.instrument_queue import translate_queue_ir
-from backend.instrument_linkedlist import translate_linkedlist_ir
-from backend.instrument_tree import translate_tree_ir
-from backend.instrument_graph import translate_graph_ir
-from backend.instrument_universal import translate_universal_ir
-
-# 🧭 Optional trace import
-try:
-    from backend.app import trace
-except ImportError:
-    def trace(msg: str):
-        print(f"🧭 [TRACE-local] {msg}")
+# Translators are imported inside their route (first use), not at worker start
+
+from backend.log import get_logger, make_trace
+
+log = get_logger(__name__)
+trace = make_trace(__name__)   # routing breadcrumbs: TRACE level, sampled
 
 
 # -------------------------------------------------
@@ -144,8 +136,8 @@ def resolve_parent_animator(concept: str, meta: dict | None = None) -> str:
 # -------------------------------------------------
 from backend.fallback_reconstruct import reconstruct_with_gemini
 
-def _refine_with_gemini_if_needed(code: str, concept: str, res: dict) -> dict:
-    """Hybrid-Refiner: send local IR to Gemini when it's weak or loop-heavy."""
+def _should_refine(code: str, concept: str, res: dict) -> bool:
+    """Hybrid-Refiner rule: is the local IR weak or loop-heavy enough to send to Gemini?"""
     steps = res.get("steps", [])
     meta = res.get("meta", {})
     loop_signals = any(kw in code for kw in ["for ", "while ", "if ", "elif "])
@@ -158,30 +150,52 @@ def _refine_with_gemini_if_needed(code: str, concept: str, res: dict) -> dict:
 
     # ✅ Graph families (BFS/DFS) will now go through Gemini refinement too.
     if any(f in concept for f in static_families):
-        print(f"⚡ [SKIP] Gemini refiner disabled for static concept='{concept}'")
-        res["steps"] = _normalize_vars(res.get("steps", []))
-        return res
+        log.debug("⚡ [SKIP] Gemini refiner disabled for static concept='%s'", concept)
+        return False
 
     # 🌟 Allow Gemini for trees, sorts, and graph traversals (BFS/DFS)
-    if weak_ir or loop_signals or any(k in concept for k in ["tree", "sort", "bfs", "dfs"]):
-        print(f"[MASTER] ✨ Refining {concept} IR via Gemini (hybrid mode)…")
-        refined_steps, refined_meta = reconstruct_with_gemini(
-            code,
-            concept,
-            local_ir={"steps": steps, "meta": meta}
-        )
-        if refined_steps:
-            refined_steps = _normalize_vars(refined_steps)
-            refined_meta.setdefault("kind", meta.get("kind", concept))
-            refined_meta.setdefault("family", meta.get("family", concept.split('-')[0]))
-            return {"steps": refined_steps, "meta": refined_meta}
+    return bool(weak_ir or loop_signals or any(k in concept for k in ["tree", "sort", "bfs", "dfs"]))
+
+
+def _merge_refined(res: dict, concept: str, refined_steps, refined_meta) -> dict:
+    """Adopt Gemini's refined IR, or keep the normalized local one if it came back empty or failed."""
+    if refined_steps and refined_meta.get("theme") != "error":
+        meta = res.get("meta", {})
+        refined_steps = _normalize_vars(refined_steps)
+        refined_meta.setdefault("kind", meta.get("kind", concept))
+        refined_meta.setdefault("family", meta.get("family", concept.split('-')[0]))
+        return {"steps": refined_steps, "meta": refined_meta}
 
     # 🧩 Fallback normalization
     res["steps"] = _normalize_vars(res.get("steps", []))
     return res
 
 
-    # 🌟 Allow Gemini for trees, sorts
+def _refine_with_gemini_if_needed(code: str, concept: str, res: dict, skip_refine: bool = False,
+                                  deadline=None) -> dict:
+    """Hybrid-Refiner: send local IR to Gemini when it's weak or loop-heavy.
+
+    With skip_refine=True the Gemini call is left to the caller (async pipeline):
+    the result is returned unrefined and tagged with `refine_pending=<concept>`.
+    When the request `deadline` is nearly spent the local IR is returned as is.
+    """
+    if not _should_refine(code, concept, res) or (deadline is not None and not deadline.allows("refine")):
+        res["steps"] = _normalize_vars(res.get("steps", []))
+        return res
+
+    if skip_refine:
+        res["steps"] = _normalize_vars(res.get("steps", []))
+        res["refine_pending"] = concept
+        return res
+
+    log.info("[MASTER] ✨ Refining %s IR via Gemini (hybrid mode)…", concept)
+    refined_steps, refined_meta = reconstruct_with_gemini(
+        code,
+        concept,
+        local_ir={"steps": res.get("steps", []), "meta": res.get("meta", {})},
+        deadline=deadline,
+    )
+    return _merge_refined(res, concept, refined_steps, refined_meta)
 
 
 # -------------------------------------------------
@@ -218,10 +232,13 @@ def normalize_meta_kind(concept: str, kind: str, family: str = "") -> str:
 # -------------------------------------------------
 # Main Translator Router
 # -------------------------------------------------
-def translate_ir(concept: str, code: str, skip_refine: bool = False) -> Dict[str, Any]:
-    from flask import request
-    body = request.get_json(force=True, silent=True) or {}
-    sub_concept = body.get("sub_concept") or body.get("meta", {}).get("sub_concept")
+def translate_ir(concept: str, code: str, skip_refine: bool = False, sub_concept: str | None = None,
+                 deadline=None) -> Dict[str, Any]:
+    from flask import request, has_request_context
+    if sub_concept is None and has_request_context():
+        # legacy: let the client pin the sub_concept in the request body
+        body = request.get_json(force=True, silent=True) or {}
+        sub_concept = body.get("sub_concept") or body.get("meta", {}).get("sub_concept")
 
     # 🧠 Normalize concept strings early
     concept_raw = (concept or "").lower().strip()
@@ -289,16 +306,17 @@ def translate_ir(concept: str, code: str, skip_refine: bool = False) -> Dict[str
         concept = f"{concept}-{sub_concept_raw}"
 
     concept = concept.strip().lower()
-    print("💡 incoming concept:", repr(concept))
-    trace(f"instrument_master.py → normalized concept '{concept_raw}' → '{concept}'")
+    log.debug("💡 incoming concept: %r", concept)
+    trace("instrument_master.py → normalized concept '%s' → '%s'", concept_raw, concept)
 
     # ---------- ROUTES ----------
 
     # Stack
     if concept == "stack":
+        from backend.instrument_stack import translate_stack_ir
         res = _ensure_dict(translate_stack_ir(code), "stack")
         res["steps"] = _normalize_vars(res.get("steps", []))
-        return _refine_with_gemini_if_needed(code, concept, res)
+        return _refine_with_gemini_if_needed(code, concept, res, skip_refine, deadline)
 
     # Queue / Deque
     if concept.startswith("queue") or "deque" in concept:
@@ -314,14 +332,15 @@ def translate_ir(concept: str, code: str, skip_refine: bool = False) -> Dict[str
         else:
             kind = "linear"
 
-        trace(f"Master → Queue route detected → kind={kind}")
+        trace("Master → Queue route detected → kind=%s", kind)
+        from backend.instrument_queue import translate_queue_ir
         res = _ensure_dict(translate_queue_ir(code, kind=kind), f"queue-{kind}")
         res["steps"] = _normalize_vars(res.get("steps", []))
         res["meta"]["kind"] = f"queue-{kind}"
         res["meta"].setdefault("family", "queue")
 
         # ✅ Keep Gemini off for simple static queue logic
-        return _refine_with_gemini_if_needed(code, concept, res)
+        return _refine_with_gemini_if_needed(code, concept, res, skip_refine, deadline)
 
 
     # -------------------------------------------------
@@ -333,7 +352,7 @@ def translate_ir(concept: str, code: str, skip_refine: bool = False) -> Dict[str
         "linkedlist-circular", "linkedlist-circular-singly",
         "linkedlist-circular-doubly"
     ]):
-        trace(f"Master → LinkedList route for '{concept}'")
+        trace("Master → LinkedList route for '%s'", concept)
 
         # 🔍 detect exact subtype
         if "circular" in concept and "doubly" in concept:
@@ -346,12 +365,13 @@ def translate_ir(concept: str, code: str, skip_refine: bool = False) -> Dict[str
             kind = "singly"
 
         # 🧠 local translator
+        from backend.instrument_linkedlist import translate_linkedlist_ir
         res = _ensure_dict(translate_linkedlist_ir(code, kind=kind), f"linkedlist-{kind}")
         res["steps"] = _normalize_vars(res.get("steps", []))
         res["meta"]["kind"] = f"linkedlist-{kind}"
         res["meta"]["family"] = "linkedlist"
         res["meta"]["parent"] = "linkedlist"
-        trace(f"✅ [MASTER] Final LL meta.kind = {res['meta']['kind']}")
+        trace("✅ [MASTER] Final LL meta.kind = %s", res["meta"]["kind"])
 
 
         # 🚫 skip Gemini refiner for lists
@@ -363,27 +383,29 @@ def translate_ir(concept: str, code: str, skip_refine: bool = False) -> Dict[str
         if "red" in concept: variant = "redblack"
         elif "avl" in concept: variant = "avl"
         elif "btree" in concept: variant = "btree"
+        from backend.instrument_tree import translate_tree_ir
         res = _ensure_dict(translate_tree_ir(code, variant=variant), variant)
         res["steps"] = _normalize_vars(res.get("steps", []))
-        return _refine_with_gemini_if_needed(code, concept, res)
+        return _refine_with_gemini_if_needed(code, concept, res, skip_refine, deadline)
 
     # Graph
     if any(x in concept for x in ["graph", "bfs", "dfs", "weighted"]):
         variant = "bfs" if concept == "graph" else concept
+        from backend.instrument_graph import translate_graph_ir
         res = _ensure_dict(translate_graph_ir(code, variant=variant), variant)
         res["steps"] = _normalize_vars(res.get("steps", []))
-        return _refine_with_gemini_if_needed(code, concept, res)
+        return _refine_with_gemini_if_needed(code, concept, res, skip_refine, deadline)
 
     # Sorting
     if "sort" in concept:
         from backend.instrument_sort import translate_sort_from_code
         res = _ensure_dict(translate_sort_from_code(code), "sort")
         res["steps"] = _normalize_vars(res.get("steps", []))
-        return _refine_with_gemini_if_needed(code, concept, res)
+        return _refine_with_gemini_if_needed(code, concept, res, skip_refine, deadline)
 
     # 🌌 UNIVERSAL ZERO-STEP FALLBACK (applies to all translators)
-    if not res or not res.get("steps"):
-        trace(f"⚠️ [MASTER] No steps detected for concept='{concept}' → invoking Gemini IR fallback")
+    if (not res or not res.get("steps")) and (deadline is None or not deadline.expired()):
+        log.warning("⚠️ [MASTER] No steps detected for concept='%s' → invoking Gemini IR fallback", concept)
         try:
             from backend.fallback_reconstruct import reconstruct_ir
             # 🚀 send existing meta + concept to Gemini for step reconstruction
@@ -405,21 +427,22 @@ def translate_ir(concept: str, code: str, skip_refine: bool = False) -> Dict[str
                 parent = res.get("meta", {}).get("parent", resolve_parent_animator(concept))
                 res["meta"]["kind"] = old_kind
                 res["meta"]["parent"] = parent
-                trace(f"🪄 [MASTER] Preserved animator context → kind={old_kind}, parent={parent}")
+                trace("🪄 [MASTER] Preserved animator context → kind=%s, parent=%s", old_kind, parent)
 
             if res.get("steps"):
-                trace(f"✅ [MASTER] Fallback IR produced {len(res['steps'])} steps")
+                log.info("✅ [MASTER] Fallback IR produced %d steps", len(res["steps"]))
                 return res
             else:
-                trace("⚠️ [MASTER] Gemini IR fallback returned empty or invalid result")
+                log.warning("⚠️ [MASTER] Gemini IR fallback returned empty or invalid result")
 
         except Exception as e:
-            trace(f"❌ [MASTER] Universal fallback failed: {e}")
+            log.warning("❌ [MASTER] Universal fallback failed: %s", e)
 
     # 🌌 FINAL UNIVERSAL PARSER (failsafe)
+    from backend.instrument_universal import translate_universal_ir
     res = _ensure_dict(translate_universal_ir(code), "universal")
     res["steps"] = _normalize_vars(res.get("steps", []))
-    return _refine_with_gemini_if_needed(code, concept, res)
+    return _refine_with_gemini_if_needed(code, concept, res, skip_refine, deadline)
 
 
 
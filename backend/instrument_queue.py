@@ -9,11 +9,9 @@ import heapq
 import re
 
 
-try:
-    from backend.app import trace
-except ImportError:
-    def trace(msg: str):
-        print(f"🧭 [TRACE-local] {msg}")
+from backend.log import make_trace
+
+trace = make_trace(__name__)
 
 # -------------------------------------------------------
 # 🌟 Variable Tracker Helper
@@ -423,7 +421,7 @@ def translate_queue_ir(code: str, kind: str = None) -> Dict[str, Any]:
             kind = "kqueues"
         else:
             kind = "linear"
-    trace(f"🧭 Auto-detected queue kind: {kind}")
+    trace("🧭 Auto-detected queue kind: %s", kind)
 
     enqueue_pattern = re.compile(r"(enqueue|append|push|insert(_rear|_end)?)\s*\(([^)]*)\)", re.IGNORECASE)
     dequeue_pattern = re.compile(r"(dequeue|pop|remove|delete(_front|_rear)?)\s*\(?([^)]*)?\)?", re.IGNORECASE)
@@ -575,7 +573,7 @@ def translate_queue_ir(code: str, kind: str = None) -> Dict[str, Any]:
         "ir_complete": True,
     }
 
-    trace(f"instrument_queue.py → translation complete ({kind}), {len(steps)} steps generated.")
+    trace("instrument_queue.py → translation complete (%s), %d steps generated.", kind, len(steps))
     return {"steps": steps, "meta": meta}
 
 
@@ -6,6 +6,9 @@ import re
 import ast
 from typing import Any, Dict, List
 from backend.instrument_btree import translate_btree_insert   # ✅ delegate B-Tree
+from backend.log import get_logger
+
+log = get_logger(__name__)
 
 BAD_PLACEHOLDERS = {"", "node", "key", "temp.key", "null"}
 
@@ -66,7 +69,7 @@ def _expand_traversal(code: str, variant: str, order: str) -> List[Dict[str, Any
                 )
             )
     except Exception as e:
-        print("[DEBUG] traversal expand fail:", e)
+        log.debug("[DEBUG] traversal expand fail: %s", e)
     return steps
 
 
@@ -0,0 +1,29 @@
+# backend/internal_access.py
+# Access control for the /internal/* routes (stats, key state, debug captures holding
+# student code, the capture dump that writes files). They are not meant for browsers:
+# - INTERNAL_TOKEN set → every request must carry it in the X-Internal-Token header
+# - unset             → only loopback clients (127.0.0.1 / ::1) get through
+# app.py also keeps these routes out of the CORS config.
+import os
+import hmac
+import ipaddress
+
+INTERNAL_PREFIX = "/internal/"
+INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN", "").strip() or None
+TOKEN_HEADER = "X-Internal-Token"
+
+
+def _loopback(remote_addr):
+    try:
+        return ipaddress.ip_address((remote_addr or "").split("%")[0]).is_loopback
+    except ValueError:
+        return False
+
+
+def internal_allowed(path, headers, remote_addr):
+    """May this request reach `path`? Anything outside /internal/ always may."""
+    if not path.startswith(INTERNAL_PREFIX):
+        return True
+    if INTERNAL_TOKEN:
+        return hmac.compare_digest(headers.get(TOKEN_HEADER, "").encode(), INTERNAL_TOKEN.encode())
+    return _loopback(remote_addr)
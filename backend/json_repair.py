@@ -0,0 +1,196 @@
+# backend/json_repair.py
+# Tolerant JSON parser shared by every consumer of Gemini replies.
+# One forward pass over the reply: skips fences / prose around the value, drops trailing
+# commas, closes unclosed arrays / objects and, when the reply was cut off mid-value,
+# rolls back to the last complete element so every finished step is kept.
+import json
+import threading
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+_CLOSER = {"{": "}", "[": "]"}
+_OPENER = {"}": "{", "]": "["}
+
+
+class RepairStats:
+    """Counters for repair_json (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._c = {
+            "calls": 0,
+            "clean": 0,             # reply parsed as-is
+            "repaired": 0,          # needed the repair pass
+            "trailing_commas": 0,   # commas dropped before a closer
+            "truncated": 0,         # reply ended inside a value → rolled back + closed
+            "salvaged_steps": 0,    # complete steps kept from truncated replies
+            "failed": 0,            # nothing parseable even after repair
+        }
+
+    def add(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items():
+                self._c[k] += v
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self._c)
+        n = out["calls"]
+        out["repair_rate"] = round(out["repaired"] / n, 4) if n else 0.0
+        out["failure_rate"] = round(out["failed"] / n, 4) if n else 0.0
+        return out
+
+
+REPAIR_STATS = RepairStats()
+
+
+def _find_start(text, expect):
+    if expect == "object":
+        return text.find("{")
+    if expect == "array":
+        return text.find("[")
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    return min(starts) if starts else -1
+
+
+def _matches(value, expect):
+    if expect == "object":
+        return isinstance(value, dict)
+    if expect == "array":
+        return isinstance(value, list)
+    return True
+
+
+def _repair(text, start):
+    """
+    Rebuild the JSON value starting at text[start].
+    Returns (json_text, trailing_commas_dropped, truncated).
+
+    A checkpoint is recorded whenever the output is a complete prefix and no array
+    element object is still open. A truncated reply is cut back to the last checkpoint
+    and closed, so a half-written step is dropped instead of being returned with missing
+    fields, while partial meta / plan objects keep the keys they completed.
+    """
+    out = []
+    stack = []
+    elements = []           # per stack entry: is it an object inside an array?
+    open_elements = 0
+    checkpoint = None       # (len(out), closers)
+    last_sig = -1           # index in out of the last non-whitespace token
+    commas = 0
+    in_string = escape = False
+
+    def close(opener):
+        nonlocal last_sig, commas, open_elements
+        if last_sig >= 0 and out[last_sig] == ",":
+            out[last_sig] = ""
+            commas += 1
+        stack.pop()
+        open_elements -= elements.pop()
+        out.append(_CLOSER[opener])
+        last_sig = len(out) - 1
+
+    def mark(pos):
+        nonlocal checkpoint
+        if open_elements == 0:
+            checkpoint = (pos, "".join(_CLOSER[c] for c in reversed(stack)))
+
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                last_sig = len(out) - 1
+            continue
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in "{[":
+            element = ch == "{" and bool(stack) and stack[-1] == "["
+            open_elements += element
+            elements.append(element)
+            stack.append(ch)
+            out.append(ch)
+            last_sig = len(out) - 1
+            mark(len(out))
+        elif ch in "}]":
+            opener = _OPENER[ch]
+            if opener not in stack:
+                continue                    # stray closer
+            while stack[-1] != opener:      # close whatever the model forgot to close
+                close(stack[-1])
+            close(opener)
+            if not stack:
+                return "".join(out), commas, False
+            mark(len(out))
+        elif ch == ",":
+            mark(len(out))
+            out.append(ch)
+            last_sig = len(out) - 1
+        else:
+            out.append(ch)
+            if not ch.isspace():
+                last_sig = len(out) - 1
+
+    if checkpoint is None:
+        raise ValueError("Truncated JSON with no complete value to salvage.")
+    pos, closers = checkpoint
+    head = "".join(out[:pos]).rstrip().rstrip(",")
+    return head + closers, commas, True
+
+
+def _count_steps(value, key):
+    if isinstance(value, list):
+        return len(value)
+    if isinstance(value, dict):
+        if isinstance(value.get(key), list):
+            return len(value[key])
+        for inner in value.values():      # e.g. {"animation_plan": {"operations": [...]}}
+            if isinstance(inner, dict) and isinstance(inner.get(key), list):
+                return len(inner[key])
+    return 0
+
+
+def repair_json(text, expect=None, key="steps"):
+    """
+    Parse an LLM reply into JSON, repairing it if needed.
+
+    expect: "object" / "array" / None — which kind of value to look for in the reply.
+    key:    list field counted as salvaged steps when a truncated reply is repaired.
+    Raises ValueError if nothing parseable is found.
+    """
+    REPAIR_STATS.add(calls=1)
+    if not isinstance(text, str):
+        REPAIR_STATS.add(failed=1)
+        raise ValueError(f"Expected reply text, got {type(text).__name__}.")
+
+    clean = text.strip()
+    try:
+        value = json.loads(clean)
+        if _matches(value, expect):
+            REPAIR_STATS.add(clean=1)
+            return value
+    except ValueError:
+        pass
+
+    start = _find_start(clean, expect)
+    try:
+        if start == -1:
+            raise ValueError("No JSON value found in response.")
+        repaired, commas, truncated = _repair(clean, start)
+        value = json.loads(repaired, strict=False)
+    except ValueError:
+        REPAIR_STATS.add(failed=1)
+        raise
+
+    salvaged = _count_steps(value, key) if truncated else 0
+    REPAIR_STATS.add(repaired=1, trailing_commas=commas, truncated=int(truncated), salvaged_steps=salvaged)
+    if truncated:
+        log.debug("[JSON-REPAIR] 🩹 Truncated reply closed → salvaged %s complete %s", salvaged, key)
+    return value
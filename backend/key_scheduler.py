@@ -0,0 +1,260 @@
+# backend/key_scheduler.py
+# Rate-aware key scheduler for the Gemini key pools.
+# - per-key token buckets (requests/min + tokens/min), opt-in via GEMINI_KEY_RPM / GEMINI_KEY_TPM
+# - cooldowns from Retry-After / quota (429) errors
+# - circuit breaker on keys that keep failing (5xx, timeouts, bad keys)
+# - least-loaded healthy key picked under a lock
+# - optional cross-process state (GEMINI_KEY_STATE_DB → backend/key_state_store.py)
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+load_dotenv()
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# per-key rate limits are opt-in (0 = unlimited): paid-tier quotas are far above the free tier's,
+# so e.g. GEMINI_KEY_RPM=10 GEMINI_KEY_TPM=250000 only for free-tier keys
+KEY_RPM = _env_float("GEMINI_KEY_RPM", 0)
+KEY_TPM = _env_float("GEMINI_KEY_TPM", 0)
+KEY_WAIT = _env_float("GEMINI_KEY_WAIT", 10)           # max seconds ask() waits for a usable key
+DEFAULT_COOLDOWN = _env_float("GEMINI_COOLDOWN_DEFAULT", 30)
+BREAKER_FAILURES = int(_env_float("GEMINI_BREAKER_FAILURES", 3))
+BREAKER_RESET = _env_float("GEMINI_BREAKER_RESET", 60)
+SHARED_POLL = _env_float("GEMINI_KEY_STATE_POLL", 0.25)   # other workers can't notify us → poll
+STALE_IN_FLIGHT = _env_float("GEMINI_KEY_STALE_AFTER", 300)  # forget calls of crashed workers
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 chars/token) used to pre-charge the TPM bucket."""
+    return max(1, len(text or "") // 4)
+
+
+class KeyState:
+    """Mutable scheduling state for one API key (guarded by the scheduler lock)."""
+
+    def __init__(self, index, rpm, tpm, now):
+        self.index = index
+        self.rpm_tokens = rpm
+        self.tpm_tokens = tpm
+        self.refilled_at = now
+        self.in_flight = 0
+        self.last_used = 0.0
+        self.cooldown_until = 0.0
+        self.failures = 0
+        self.breaker = "closed"         # closed → open → half_open → closed
+        self.breaker_until = 0.0
+        self.probe_in_flight = False
+
+    def as_dict(self, now):
+        return {
+            "key": self.index + 1,
+            "in_flight": self.in_flight,
+            "rpm_tokens": round(self.rpm_tokens, 2),
+            "tpm_tokens": int(self.tpm_tokens),
+            "cooldown_remaining": round(max(0.0, self.cooldown_until - now), 1),
+            "breaker": self.breaker,
+            "breaker_remaining": round(max(0.0, self.breaker_until - now), 1),
+            "failures": self.failures,
+        }
+
+
+class KeyScheduler:
+    """
+    Picks which key a pool should use next; thread-safe.
+    With a `store` (SharedKeyStore) and `key_ids`, state is loaded/saved inside one
+    SQLite transaction per decision, so every worker process sees the same quota.
+    """
+
+    def __init__(self, name, n_keys, rpm=KEY_RPM, tpm=KEY_TPM,
+                 failure_threshold=BREAKER_FAILURES, breaker_reset=BREAKER_RESET,
+                 default_cooldown=DEFAULT_COOLDOWN, key_ids=None, store=None):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.failure_threshold = max(1, failure_threshold)
+        self.breaker_reset = breaker_reset
+        self.default_cooldown = default_cooldown
+        self.store = store if key_ids else None
+        self.key_ids = list(key_ids or [])
+        # wall clock when shared: monotonic clocks aren't comparable across processes
+        self._clock = time.time if self.store else time.monotonic
+        self._cond = threading.Condition()
+        now = self._clock()
+        self._keys = [KeyState(i, rpm, tpm, now) for i in range(n_keys)]
+
+    # -------------------------------------------------
+    # Acquire / release
+    # -------------------------------------------------
+    def try_acquire(self, est_tokens=1, exclude=()):
+        """Non-blocking pick → (index, 0.0) or (None, seconds until a key may free up)."""
+        with self._cond, self._shared_state():
+            return self._try_acquire_locked(est_tokens, exclude)
+
+    def acquire(self, est_tokens=1, exclude=(), timeout=KEY_WAIT):
+        """
+        Block until a healthy key has budget. Returns the key index, or None when
+        no key can become usable within `timeout` seconds (fail fast instead of stalling).
+        """
+        deadline = time.monotonic() + (timeout or 0)
+        with self._cond:
+            while True:
+                with self._shared_state():
+                    idx, wait = self._try_acquire_locked(est_tokens, exclude)
+                if idx is not None:
+                    return idx
+                remaining = deadline - time.monotonic()
+                if wait is None or wait > remaining:
+                    return None
+                self._cond.wait(min(wait, SHARED_POLL) if self.store else wait)
+
+    def release(self, idx, ok=None, est_tokens=0, tokens_used=None, status=None, retry_after=None):
+        """
+        Report the outcome of a call made with key `idx`.
+        ok=True → success, ok=False → failure, ok=None → neutral (key handed out, no verdict).
+        Returns the cooldown (seconds) a quota error put on the key, else 0.0.
+        """
+        cool = 0.0
+        with self._cond, self._shared_state():
+            now = self._clock()
+            k = self._keys[idx]
+            k.in_flight = max(0, k.in_flight - 1)
+            probe = k.probe_in_flight
+            k.probe_in_flight = False
+
+            # settle the TPM pre-charge against real usage
+            if tokens_used is not None and self.tpm:
+                k.tpm_tokens = min(self.tpm, k.tpm_tokens + est_tokens - tokens_used)
+
+            if ok is True:
+                k.failures = 0
+                if k.breaker != "closed":
+                    log.info("[SCHEDULER:%s] 🔌 Key %s breaker closed", self.name, idx + 1)
+                k.breaker = "closed"
+            elif ok is False:
+                if status == 429:
+                    # quota / rate limit → cool the key down, don't count it as broken
+                    cool = retry_after if retry_after else self.default_cooldown
+                    k.cooldown_until = max(k.cooldown_until, now + cool)
+                    k.rpm_tokens = 0.0
+                    log.info("[SCHEDULER:%s] 🧊 Key %s cooling down %.0fs", self.name, idx + 1, cool)
+                else:
+                    k.failures += 1
+                    if probe or k.failures >= self.failure_threshold:
+                        k.breaker = "open"
+                        k.breaker_until = now + self.breaker_reset
+                        log.info("[SCHEDULER:%s] ⛔ Key %s breaker open for %.0fs", self.name, idx + 1, self.breaker_reset)
+            self._cond.notify_all()
+        return cool
+
+    # -------------------------------------------------
+    # Internals (caller holds the lock)
+    # -------------------------------------------------
+    @contextmanager
+    def _shared_state(self):
+        """Load → mutate → save the shared rows atomically; no-op without a store."""
+        if self.store is None:
+            yield
+            return
+        try:
+            self.store.begin()
+            self.store.load(self.key_ids, self._keys)
+        except sqlite3.Error as e:
+            self.store.rollback()
+            log.warning("[SCHEDULER:%s] ⚠️ Shared state read failed (%s) → using local view", self.name, e)
+            yield
+            return
+        try:
+            yield
+            self.store.save(self.key_ids, self._keys)
+            self.store.commit()
+        except sqlite3.Error as e:
+            self.store.rollback()
+            log.warning("[SCHEDULER:%s] ⚠️ Shared state write failed (%s)", self.name, e)
+        except BaseException:
+            self.store.rollback()
+            raise
+
+    def _refill(self, k, now):
+        elapsed = now - k.refilled_at
+        if elapsed > 0:
+            if self.rpm:
+                k.rpm_tokens = min(self.rpm, k.rpm_tokens + elapsed * self.rpm / 60.0)
+            if self.tpm:
+                k.tpm_tokens = min(self.tpm, k.tpm_tokens + elapsed * self.tpm / 60.0)
+            k.refilled_at = now
+        if k.breaker == "open" and now >= k.breaker_until:
+            k.breaker = "half_open"
+        if k.in_flight and now - k.last_used > STALE_IN_FLIGHT:
+            # a worker died mid-call and never released → don't let it pin the key
+            k.in_flight = 0
+            k.probe_in_flight = False
+
+    def _ready_in(self, k, est, now):
+        """Seconds until key k could serve a request of `est` tokens (0 = now)."""
+        waits = [0.0]
+        if k.cooldown_until > now:
+            waits.append(k.cooldown_until - now)
+        if k.breaker == "open":
+            waits.append(k.breaker_until - now)
+        if k.breaker == "half_open" and k.probe_in_flight:
+            return 0.5      # poll until the half-open probe reports back
+        if self.rpm and k.rpm_tokens < 1:
+            waits.append((1 - k.rpm_tokens) * 60.0 / self.rpm)
+        if self.tpm and k.tpm_tokens < est:
+            waits.append((est - k.tpm_tokens) * 60.0 / self.tpm)
+        return max(waits)
+
+    def _try_acquire_locked(self, est_tokens, exclude):
+        now = self._clock()
+        est = min(est_tokens, self.tpm) if self.tpm else est_tokens
+        best, soonest = None, None
+        for k in self._keys:
+            if k.index in exclude:
+                continue
+            self._refill(k, now)
+            ready_in = self._ready_in(k, est, now)
+            if ready_in > 0:
+                soonest = ready_in if soonest is None else min(soonest, ready_in)
+                continue
+            # least loaded first, then most remaining rate budget, then least recently used
+            rank = (k.in_flight, -k.rpm_tokens / self.rpm if self.rpm else 0.0, k.last_used)
+            if best is None or rank < best[0]:
+                best = (rank, k)
+
+        if best is None:
+            return None, soonest
+
+        k = best[1]
+        if self.rpm:
+            k.rpm_tokens -= 1
+        if self.tpm:
+            k.tpm_tokens -= est
+        k.in_flight += 1
+        k.last_used = now
+        if k.breaker == "half_open":
+            k.probe_in_flight = True
+        return k.index, 0.0
+
+    # -------------------------------------------------
+    # Introspection
+    # -------------------------------------------------
+    def snapshot(self):
+        with self._cond, self._shared_state():
+            now = self._clock()
+            for k in self._keys:
+                self._refill(k, now)
+            keys = [k.as_dict(now) for k in self._keys]
+        return {"pool": self.name, "rpm": self.rpm, "tpm": self.tpm, "shared": self.store is not None, "keys": keys}
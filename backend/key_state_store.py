@@ -0,0 +1,117 @@
+# backend/key_state_store.py
+# Cross-process key state for the Gemini key schedulers.
+# Under gunicorn every worker builds its own pools; with GEMINI_KEY_STATE_DB set, all of
+# them read/write quota, cooldown and breaker state in one SQLite file → one view per node.
+# Rows are keyed by a hash of the API key, so pools that share a key also share its quota.
+import os
+import sqlite3
+import hashlib
+import threading
+from dotenv import load_dotenv
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+load_dotenv()
+
+KEY_STATE_DB = os.getenv("GEMINI_KEY_STATE_DB", "").strip() or None
+
+# columns mirrored from key_scheduler.KeyState (index is per-pool, so it stays local)
+_FIELDS = (
+    "rpm_tokens", "tpm_tokens", "refilled_at", "in_flight", "last_used",
+    "cooldown_until", "failures", "breaker", "breaker_until", "probe_in_flight",
+)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS key_state (
+    key_id TEXT PRIMARY KEY,
+    {", ".join(f + (" TEXT" if f == "breaker" else " REAL") for f in _FIELDS)}
+)
+"""
+
+
+def key_id(key):
+    """Stable, non-secret identifier for an API key (never store the key itself)."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class SharedKeyStore:
+    """SQLite-backed KeyState rows; one connection per thread, WAL mode."""
+
+    def __init__(self, path, busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        dirname = os.path.dirname(os.path.abspath(path))
+        os.makedirs(dirname, exist_ok=True)
+        conn = self._conn()
+        conn.execute(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit mode → transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def begin(self):
+        """Take the write lock up front so load → decide → save is atomic across workers."""
+        self._conn().execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        self._conn().execute("COMMIT")
+
+    def rollback(self):
+        try:
+            self._conn().execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+
+    def load(self, ids, states):
+        """Overwrite `states` (KeyState list, same order as `ids`) with stored rows, if any."""
+        marks = ",".join("?" * len(ids))
+        rows = self._conn().execute(
+            f"SELECT key_id, {', '.join(_FIELDS)} FROM key_state WHERE key_id IN ({marks})", ids
+        ).fetchall()
+        by_id = {row[0]: row[1:] for row in rows}
+        for kid, k in zip(ids, states):
+            row = by_id.get(kid)
+            if row is None:
+                continue
+            for name, value in zip(_FIELDS, row):
+                setattr(k, name, value)
+            k.in_flight = int(k.in_flight)
+            k.failures = int(k.failures)
+            k.probe_in_flight = bool(k.probe_in_flight)
+
+    def save(self, ids, states):
+        rows = [
+            (kid, *(getattr(k, name) for name in _FIELDS))
+            for kid, k in zip(ids, states)
+        ]
+        self._conn().executemany(
+            f"INSERT OR REPLACE INTO key_state (key_id, {', '.join(_FIELDS)}) "
+            f"VALUES ({','.join('?' * (len(_FIELDS) + 1))})",
+            rows,
+        )
+
+
+# -------------------------------------------------
+# Global store (None → every scheduler keeps state in-process)
+# -------------------------------------------------
+def _open_store():
+    if not KEY_STATE_DB:
+        return None
+    try:
+        store = SharedKeyStore(KEY_STATE_DB)
+        log.info("🗄️ [KEY-STATE] Sharing key quota state via %s", KEY_STATE_DB)
+        return store
+    except (OSError, sqlite3.Error) as e:
+        log.warning("⚠️ [KEY-STATE] Shared store unavailable (%s) → per-process state", e)
+        return None
+
+
+SHARED_KEY_STORE = _open_store()
@@ -0,0 +1,130 @@
+# backend/key_telemetry.py
+# Per-key call telemetry for the Gemini pools (GEMINI_KEYS / GEMINI_IR_KEYS / GEMINI_ANIMATE_KEYS).
+# Every attempt a pool makes on a key is recorded: outcome and error class, latency histogram,
+# prompt / reply tokens (Gemini's usageMetadata, else the ~4 chars/token estimate), structured
+# replies that did not parse, and the cooldown a 429 put on the key. Served on
+# /internal/key_telemetry for capacity planning. Counters are per worker process; the
+# scheduler's shared state (GEMINI_KEY_STATE_DB) only covers quotas.
+import json
+import time
+import asyncio
+import threading
+
+from backend.deadline import DeadlineExceeded
+from backend.key_scheduler import estimate_tokens
+
+# latency histogram upper bounds, seconds (the last bucket is open-ended)
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+ERROR_CLASSES = ("429", "5xx", "4xx", "timeout", "deadline", "network", "bad_response", "cancelled")
+
+
+def error_class(e):
+    """Bucket a failed attempt: HTTP status family, timeout, our own deadline, transport or payload."""
+    status = getattr(e, "status", None)
+    if status == 429:
+        return "429"
+    if status:
+        return "5xx" if status >= 500 else "4xx"
+    if isinstance(e, DeadlineExceeded):
+        return "deadline"
+    if isinstance(e, asyncio.CancelledError):
+        return "cancelled"
+    if isinstance(e, (TimeoutError, asyncio.TimeoutError)) or "Timeout" in type(e).__name__:
+        return "timeout"
+    if isinstance(e, (ConnectionError, OSError)) or "Connect" in type(e).__name__:
+        return "network"
+    return "bad_response"
+
+
+def _bucket_label(bound):
+    return f"le_{bound}s"
+
+
+class _KeyStats:
+    def __init__(self, index, key_id):
+        self.index = index
+        self.key_id = key_id
+        self.requests = 0
+        self.ok = 0
+        self.errors = dict.fromkeys(ERROR_CLASSES, 0)
+        self.parse_failures = 0         # 200 reply, but the structured JSON did not parse
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.prompt_tokens = 0
+        self.reply_tokens = 0
+        self.cooldown_seconds = 0.0
+        self.last_error = None
+        self.last_error_at = None
+
+    def as_dict(self, now):
+        done = sum(self.latency)
+        return {
+            "key": self.index + 1,
+            "key_id": self.key_id,
+            "requests": self.requests,
+            "ok": self.ok,
+            "errors": dict(self.errors),
+            "parse_failures": self.parse_failures,
+            "latency": {
+                "histogram": dict(zip([_bucket_label(b) for b in LATENCY_BUCKETS] + ["inf"], self.latency)),
+                "avg": round(self.latency_sum / done, 4) if done else 0.0,
+                "max": round(self.latency_max, 4),
+            },
+            "prompt_tokens": self.prompt_tokens,
+            "reply_tokens": self.reply_tokens,
+            "cooldown_seconds": round(self.cooldown_seconds, 1),
+            "last_error": self.last_error,
+            "last_error_age": round(now - self.last_error_at, 1) if self.last_error_at else None,
+        }
+
+
+class KeyTelemetry:
+    """Per-key counters of one pool (thread-safe)."""
+
+    def __init__(self, name, key_ids):
+        self.name = name
+        self._lock = threading.Lock()
+        self._keys = [_KeyStats(i, kid) for i, kid in enumerate(key_ids)]
+
+    def record(self, idx, latency, prompt_tokens, reply=None, usage=None, structured=False,
+               error=None, cooldown=0.0):
+        """One attempt on key `idx`: a reply (success) or an `error` (failure)."""
+        usage = usage or {}
+        parse_failed = False
+        if reply is not None and structured:
+            try:
+                json.loads(reply)
+            except ValueError:
+                parse_failed = True
+        with self._lock:
+            k = self._keys[idx]
+            k.requests += 1
+            k.prompt_tokens += usage.get("promptTokenCount") or prompt_tokens
+            if error is None:
+                k.ok += 1
+                k.reply_tokens += usage.get("candidatesTokenCount") or estimate_tokens(reply)
+                k.parse_failures += parse_failed
+            else:
+                k.errors[error_class(error)] += 1
+                k.last_error = f"{error_class(error)}: {str(error)[:160]}"
+                k.last_error_at = time.time()
+            k.cooldown_seconds += cooldown or 0.0
+            k.latency[next((i for i, b in enumerate(LATENCY_BUCKETS) if latency <= b), len(LATENCY_BUCKETS))] += 1
+            k.latency_sum += latency
+            k.latency_max = max(k.latency_max, latency)
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            keys = [k.as_dict(now) for k in self._keys]
+        totals = {"requests": 0, "ok": 0, "parse_failures": 0, "prompt_tokens": 0, "reply_tokens": 0,
+                  "cooldown_seconds": 0.0, "errors": dict.fromkeys(ERROR_CLASSES, 0)}
+        for k in keys:
+            for field in ("requests", "ok", "parse_failures", "prompt_tokens", "reply_tokens", "cooldown_seconds"):
+                totals[field] += k[field]
+            for cls, n in k["errors"].items():
+                totals["errors"][cls] += n
+        totals["cooldown_seconds"] = round(totals["cooldown_seconds"], 1)
+        totals["error_rate"] = round(1 - totals["ok"] / totals["requests"], 4) if totals["requests"] else 0.0
+        return {"pool": self.name, "totals": totals, "keys": keys}
@@ -11,7 +11,8 @@ keys = [k.strip() for k in keys if k.strip()]
 if not keys:
     raise RuntimeError("❌ No GEMINI_KEYS found in .env")
 
-url = "https://generativelanguage.googleapis.com/v1/models"
+base = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com").rstrip("/")
+url = f"{base}/v1/models"
 
 for i, key in enumerate(keys, start=1):
     print(f"\n🔑 Checking Gemini key {i}...")
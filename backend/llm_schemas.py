@@ -0,0 +1,154 @@
+# backend/llm_schemas.py
+# Response schemas for Gemini structured output (generationConfig.responseJsonSchema).
+# One schema + output-token cap per call site, so replies are plain JSON that parses in
+# one pass — no fence stripping, no brace rescue — and carry no prose around them.
+
+GATE1_FAMILIES_ENUM = ["stack", "queue", "linkedlist", "tree", "graph", "sorting", "searching", "unknown"]
+
+# any JSON object (free-form consumers like config.gemma_json)
+ANY_OBJECT = {"type": "object"}
+
+# -------------------------------------------------
+# Detection
+# -------------------------------------------------
+GATE1_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "concept": {"type": "string", "enum": GATE1_FAMILIES_ENUM},
+        "sub_concept": {"type": "string"},
+        "explanation": {"type": "string"},
+        # self-reported certainty 0..1 — the model cascade escalates low-confidence answers
+        "confidence": {"type": "number"},
+    },
+    "required": ["concept", "sub_concept", "explanation", "confidence"],
+}
+
+GATE1_BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"id": {"type": "string"}, **GATE1_SCHEMA["properties"]},
+        "required": ["id", "concept", "sub_concept", "explanation", "confidence"],
+    },
+}
+
+GATE2_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "concept": {"type": "string"},
+        "explanation": {"type": "string"},
+    },
+    "required": ["concept", "explanation"],
+}
+
+SPLIT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "segments": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "concept": {"type": "string"},
+                    "line_range": {"type": "array", "items": {"type": "integer"}, "minItems": 2, "maxItems": 2},
+                    "code": {"type": "string"},
+                },
+                "required": ["concept", "line_range", "code"],
+            },
+        },
+    },
+    "required": ["segments"],
+}
+
+# -------------------------------------------------
+# IR steps
+# -------------------------------------------------
+IR_STEP = {
+    "type": "object",
+    "properties": {
+        "action": {"type": "string"},
+        "description": {"type": "string"},
+        "vars": {"type": "object"},
+    },
+    "required": ["action", "description", "vars"],
+}
+
+IR_STEP_LIST_SCHEMA = {"type": "array", "items": IR_STEP}
+
+IR_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "steps": IR_STEP_LIST_SCHEMA,
+        "meta": {
+            "type": "object",
+            "properties": {
+                "layout": {"type": "string"},
+                "theme": {"type": "string"},
+                "parent_animator": {"type": "string"},
+            },
+        },
+    },
+    "required": ["steps", "meta"],
+}
+
+# -------------------------------------------------
+# Animation plans
+# -------------------------------------------------
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "animation_plan": {
+            "type": "object",
+            "properties": {
+                "layout": {"type": "string", "enum": ["linear", "grid", "tree", "ring", "stack", "generic"]},
+                "theme": {"type": "string", "enum": ["softblue", "vivid", "neutral"]},
+                "objects": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "string"},
+                            "type": {"type": "string"},
+                            "label": {"type": "string"},
+                            "x": {"type": "number"},
+                            "y": {"type": "number"},
+                        },
+                        "required": ["id", "type", "label"],
+                    },
+                },
+                "operations": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "step": {"type": "integer"},
+                            "op": {"type": "string"},
+                            "target": {"anyOf": [
+                                {"type": "string"},
+                                {"type": "array", "items": {"type": "string"}},
+                            ]},
+                            "comment": {"type": "string"},
+                        },
+                        "required": ["step", "op", "target"],
+                    },
+                },
+            },
+            "required": ["layout", "theme", "objects", "operations"],
+        },
+    },
+    "required": ["animation_plan"],
+}
+
+# -------------------------------------------------
+# Output-token caps per call site (visible output only: a thinking budget,
+# GEMINI_THINKING_BUDGET in backend/gemini_manager.py, is added on top)
+# -------------------------------------------------
+MAX_TOKENS = {
+    "gate1": 1024,
+    "gate1_batch": 8192,
+    "gate2": 1024,
+    "split": 4096,
+    "ir": 8192,
+    "plan": 8192,
+    "chat_json": 4096,
+}
@@ -0,0 +1,112 @@
+# backend/loadtest.py
+# Closed-loop load generator for /translate_one: throughput + latency percentiles.
+#     python -m backend.fake_gemini --latency lognormal:0.8:0.5 &
+#     GEMINI_BASE_URL=http://127.0.0.1:8089 python -m backend.app &
+#     python -m backend.loadtest --requests 500 --concurrency 32 --unique
+import os
+import glob
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SAMPLE_PROGRAMS = [
+    "stack = []\nfor x in [1, 2, 3]:\n    stack.append(x)\nwhile stack:\n    print(stack.pop())",
+    "from collections import deque\nq = deque()\nq.append(1)\nq.append(2)\nprint(q.popleft())",
+    "arr = [5, 3, 8, 1]\nfor i in range(len(arr)):\n    for j in range(len(arr) - i - 1):\n"
+    "        if arr[j] > arr[j + 1]:\n            arr[j], arr[j + 1] = arr[j + 1], arr[j]\nprint(arr)",
+    "def fib(n):\n    if n < 2:\n        return n\n    return fib(n - 1) + fib(n - 2)\nprint(fib(6))",
+    "name = 'algomap'\nprint(name[::-1].upper())",
+]
+
+
+def load_corpus(path):
+    """A .py file, a directory of .py files, or a JSON list of programs."""
+    if not path:
+        return list(SAMPLE_PROGRAMS)
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.py")))
+        return [open(f, encoding="utf-8").read() for f in files]
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".json"):
+        return [p if isinstance(p, str) else p["code"] for p in json.loads(text)]
+    return [text]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[i]
+
+
+def run(url, programs, total, concurrency, unique=False, timeout=120.0):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    lock = threading.Lock()
+    latencies, statuses = [], Counter()
+
+    def one(i):
+        code = programs[i % len(programs)]
+        if unique:
+            # defeat response cache + singleflight; a statement, since prompt compaction drops comments
+            code += f"\n_loadtest_id = {i}"
+        started = time.perf_counter()
+        try:
+            status = session.post(url, json={"code": code}, timeout=timeout).status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ok = statuses.get(200, 0)
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(total / wall, 2) if wall else 0.0,
+        "ok": ok,
+        "errors": total - ok,
+        "status_counts": {str(k): v for k, v in statuses.items()},
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p90": round(percentile(latencies, 0.90) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            "mean": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+        },
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load-test AlgoMap's /translate_one.")
+    ap.add_argument("--url", default="http://127.0.0.1:5000/translate_one")
+    ap.add_argument("--corpus", help=".py file, directory of .py files, or JSON list of programs")
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--unique", action="store_true", help="make every program distinct")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    args = ap.parse_args(argv)
+
+    report = run(args.url, load_corpus(args.corpus), args.requests, args.concurrency,
+                 unique=args.unique, timeout=args.timeout)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# backend/log.py
+# Level-gated, non-blocking logging for the request path (instead of print).
+# - one "backend.*" logger tree: LOG_LEVEL sets the default (INFO), LOG_LEVELS overrides per
+#   module, e.g. LOG_LEVELS="instrument_linkedlist=TRACE,gemini_manager=WARNING"
+# - records go onto a bounded queue; a listener thread formats and writes them, so a request
+#   pays for the level check and the message only — never for stdout I/O. A full queue drops.
+# - TRACE (below DEBUG) is for per-step / per-node breadcrumbs, sampled by LOG_TRACE_SAMPLE
+# - messages take %-style args, formatted only for records that pass the level check (on the
+#   caller's thread, so later mutation of a logged dict can't change it); lazy_json / clip
+#   defer big dumps the same way
+# - LOG_FORMAT=json → one JSON object per line (ts, level, logger, msg + `extra` fields)
+import os
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").strip().lower()
+LOG_TEXT_FORMAT = os.getenv("LOG_TEXT_FORMAT", "%(message)s")
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+try:
+    LOG_TRACE_SAMPLE = min(1.0, max(0.0, float(os.getenv("LOG_TRACE_SAMPLE", "1"))))
+except ValueError:
+    LOG_TRACE_SAMPLE = 1.0
+
+ROOT = "backend"
+_STD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _level(name, default=logging.INFO):
+    name = str(name).strip().upper()
+    if name.isdigit():
+        return int(name)
+    level = logging.getLevelName(name)
+    return level if isinstance(level, int) else default
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        out = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for k, v in record.__dict__.items():
+            if k not in _STD_ATTRS:
+                out[k] = v
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _DropQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller; the listener does the formatting + I/O."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge the args now: they may be shared objects the caller mutates right after the
+        # call. Same process → no copy / pickling; exc_info is formatted by the listener.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def configure():
+    """Install the queue handler + listener on the backend logger tree (idempotent)."""
+    global _handler, _listener
+    with _lock:
+        if _handler is not None:
+            return
+        stream = logging.StreamHandler()
+        stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(LOG_TEXT_FORMAT))
+        _handler = _DropQueueHandler(queue.Queue(maxsize=LOG_QUEUE_MAX))
+        _listener = QueueListener(_handler.queue, stream)
+        _listener.start()
+        atexit.register(_listener.stop)   # flush what is still queued
+
+        root = logging.getLogger(ROOT)
+        root.setLevel(_level(LOG_LEVEL))
+        root.addHandler(_handler)
+        root.propagate = False
+        for item in LOG_LEVELS.split(","):
+            name, _, level = item.partition("=")
+            if name.strip() and level.strip():
+                logging.getLogger(_qualify(name.strip())).setLevel(_level(level))
+
+
+def _qualify(name):
+    if name == "__main__":
+        return f"{ROOT}.app"   # `python app.py`
+    return name if name == ROOT or name.startswith(f"{ROOT}.") else f"{ROOT}.{name}"
+
+
+def get_logger(name):
+    """Logger for a backend module (pass __name__)."""
+    configure()
+    return logging.getLogger(_qualify(name))
+
+
+def make_trace(name):
+    """trace(msg, *args) for a module: TRACE level, sampled, free when TRACE is off."""
+    logger = get_logger(name)
+
+    def trace(msg, *args):
+        if logger.isEnabledFor(TRACE) and (LOG_TRACE_SAMPLE >= 1.0 or random.random() < LOG_TRACE_SAMPLE):
+            logger.log(TRACE, msg, *args)
+
+    return trace
+
+
+class lazy_json:
+    """json.dumps(value) deferred until the record is actually formatted."""
+
+    __slots__ = ("value", "indent", "limit")
+
+    def __init__(self, value, indent=None, limit=None):
+        self.value, self.indent, self.limit = value, indent, limit
+
+    def __str__(self):
+        try:
+            text = json.dumps(self.value, ensure_ascii=False, indent=self.indent, default=str)
+        except (TypeError, ValueError, RuntimeError) as e:   # RuntimeError: changed during iteration
+            text = f"(could not JSON-dump: {e}) {self.value!r}"
+        return text if not self.limit or len(text) <= self.limit else text[:self.limit] + "…"
+
+
+class clip:
+    """First `limit` characters of a long string, cut only when the record is formatted."""
+
+    __slots__ = ("text", "limit")
+
+    def __init__(self, text, limit=200):
+        self.text, self.limit = text, limit
+
+    def __str__(self):
+        text = str(self.text)
+        return text if len(text) <= self.limit else text[:self.limit] + "…"
+
+
+def stats():
+    return {
+        "level": LOG_LEVEL,
+        "format": LOG_FORMAT,
+        "trace_sample": LOG_TRACE_SAMPLE,
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+        "overrides": {name: logging.getLevelName(lg.level) for name, lg in logging.root.manager.loggerDict.items()
+                      if isinstance(lg, logging.Logger) and name.startswith(f"{ROOT}.") and lg.level},
+    }
@@ -0,0 +1,275 @@
+# backend/model_cascade.py
+# Per-call-site model routing. Each site lists its model tiers, cheapest / fastest first;
+# a reply from a lower tier is kept only when the site's acceptance check passes (valid
+# JSON for the schema, Gate-1 confidence over GEMINI_CASCADE_MIN_CONFIDENCE, non-empty
+# steps / plan …), otherwise the call escalates to the next tier. The last tier's answer is
+# always final. Tiers per site come from GEMINI_CASCADE_<SITE>="model-a,model-b";
+# GEMINI_CASCADE=0 sends every site straight to its last tier.
+import os
+import json
+import time
+import threading
+
+from backend.deadline import DeadlineExceeded
+from backend.json_repair import repair_json
+from backend.key_scheduler import estimate_tokens
+from backend.llm_schemas import GATE1_FAMILIES_ENUM
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+CASCADE_ENABLED = os.getenv("GEMINI_CASCADE", "1").strip().lower() not in ("0", "false", "no", "off")
+MIN_CONFIDENCE = _env_float("GEMINI_CASCADE_MIN_CONFIDENCE", 0.75)
+# a tier whose model the endpoint does not serve (404: retired / not enabled) is skipped this long
+TIER_COOLDOWN = _env_float("GEMINI_CASCADE_TIER_COOLDOWN", 300)
+
+LITE = "gemini-2.5-flash-lite"
+FLASH = "gemini-2.5-flash"
+
+# USD per 1M (input, output) tokens — for the per-tier cost estimate; GEMINI_PRICES overrides
+MODEL_PRICES = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+}
+try:
+    MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("GEMINI_PRICES", "{}") or "{}").items()})
+except (TypeError, ValueError, AttributeError) as e:
+    log.warning("[CASCADE] ⚠️ GEMINI_PRICES is not a {model: [input, output]} JSON object (%s) → default prices", e)
+
+
+# -------------------------------------------------
+# Acceptance checks (reply text → keep it?)
+# -------------------------------------------------
+def _load(text, expect, key="steps"):
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return repair_json(text, expect=expect, key=key)
+    except ValueError:
+        return None
+
+
+def _confident(row):
+    try:
+        confidence = float(row.get("confidence"))
+    except (TypeError, ValueError):
+        return False   # no self-reported confidence → let the bigger model decide
+    return row.get("concept") in GATE1_FAMILIES_ENUM and confidence >= MIN_CONFIDENCE
+
+
+def _gate1_ok(text):
+    data = _load(text, "object")
+    return isinstance(data, dict) and _confident(data)
+
+
+def _gate1_batch_ok(text):
+    rows = _load(text, "array")
+    return isinstance(rows, list) and bool(rows) and all(isinstance(r, dict) and _confident(r) for r in rows)
+
+
+def _gate2_ok(text):
+    data = _load(text, "object")
+    if not isinstance(data, dict):
+        return False
+    return str(data.get("concept") or "").lower().strip() not in ("", "unknown", "unknown_general")
+
+
+def _steps_ok(steps):
+    return (isinstance(steps, list) and bool(steps)
+            and all(isinstance(s, dict) and s.get("action") for s in steps))
+
+
+def _ir_ok(text):
+    data = _load(text, "object")
+    return isinstance(data, dict) and _steps_ok(data.get("steps"))
+
+
+def _step_list_ok(text):
+    return _steps_ok(_load(text, "array"))
+
+
+def _plan_ok(text):
+    data = _load(text, "object", key="operations")
+    if not isinstance(data, dict):
+        return False
+    plan = data.get("animation_plan", data)
+    return isinstance(plan, dict) and bool(plan.get("objects")) and bool(plan.get("operations"))
+
+
+def _split_ok(text):
+    data = _load(text, "object", key="segments")
+    return isinstance(data, dict) and bool(data.get("segments"))
+
+
+class CascadeSite:
+    """Model tiers (cheapest first) + the check a lower tier's reply must pass."""
+
+    def __init__(self, name, tiers, accept=None):
+        env = os.getenv(f"GEMINI_CASCADE_{name.upper()}", "")
+        self.name = name
+        self.tiers = [m.strip() for m in env.split(",") if m.strip()] or list(tiers)
+        self.accept = accept
+
+    def models(self):
+        return self.tiers if CASCADE_ENABLED and self.accept else self.tiers[-1:]
+
+
+SITES = {
+    "gate1": CascadeSite("gate1", [LITE, FLASH], _gate1_ok),
+    "gate1_batch": CascadeSite("gate1_batch", [LITE, FLASH], _gate1_batch_ok),
+    "gate2": CascadeSite("gate2", [LITE, FLASH], _gate2_ok),
+    "ir": CascadeSite("ir", [FLASH], _ir_ok),                  # free-form reconstruction → full model
+    "adaptive": CascadeSite("adaptive", [FLASH], _step_list_ok),
+    "plan": CascadeSite("plan", [LITE, FLASH], _plan_ok),
+    "split": CascadeSite("split", [LITE, FLASH], _split_ok),
+    "chat": CascadeSite("chat", ["gemini-2.0-flash"]),        # /api/chat + quiz (SDK)
+}
+
+
+def final_model(site):
+    """The site's top tier (streaming calls and SDK callers use it directly)."""
+    return SITES[site].tiers[-1]
+
+
+# -------------------------------------------------
+# Stats
+# -------------------------------------------------
+class CascadeStats:
+    """Per site, per tier: calls, accepted / escalated, errors, latency and estimated cost."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = {}            # (site, model) → counters
+        self._cooling = {}          # model → monotonic time it may be tried again
+
+    def record(self, site, model, latency, prompt, reply=None, outcome="accepted"):
+        with self._lock:
+            t = self._tiers.setdefault((site, model), {
+                "calls": 0, "accepted": 0, "escalated": 0, "errors": 0,
+                "latency_seconds": 0.0, "input_tokens": 0, "output_tokens": 0,
+            })
+            t["calls"] += 1
+            t[outcome] += 1
+            t["latency_seconds"] += latency
+            t["input_tokens"] += estimate_tokens(prompt)
+            t["output_tokens"] += estimate_tokens(reply) if reply else 0
+
+    def cool_down(self, model):
+        with self._lock:
+            self._cooling[model] = time.monotonic() + TIER_COOLDOWN
+
+    def cooling(self, model):
+        with self._lock:
+            return time.monotonic() < self._cooling.get(model, 0.0)
+
+    def snapshot(self):
+        with self._lock:
+            tiers = {k: dict(v) for k, v in self._tiers.items()}
+            cooling = [m for m, t in self._cooling.items() if time.monotonic() < t]
+        out = {}
+        for (site, model), t in sorted(tiers.items()):
+            price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+            t["avg_latency"] = round(t["latency_seconds"] / t["calls"], 4) if t["calls"] else 0.0
+            t["latency_seconds"] = round(t["latency_seconds"], 3)
+            t["est_cost_usd"] = round((t["input_tokens"] * price_in + t["output_tokens"] * price_out) / 1e6, 6)
+            t["escalation_rate"] = round(t["escalated"] / t["calls"], 4) if t["calls"] else 0.0
+            out.setdefault(site, {})[model] = t
+        out["sites"] = {name: s.models() for name, s in SITES.items()}
+        out["cooling_models"] = cooling
+        out["enabled"] = CASCADE_ENABLED
+        out["min_confidence"] = MIN_CONFIDENCE
+        return out
+
+
+CASCADE_STATS = CascadeStats()
+
+
+# -------------------------------------------------
+# Routing
+# -------------------------------------------------
+def _plan(site):
+    models = [m for m in SITES[site].models() if not CASCADE_STATS.cooling(m)] or SITES[site].models()[-1:]
+    return models, SITES[site].accept
+
+
+def _may_escalate(deadline):
+    return deadline is None or deadline.allows("escalate")
+
+
+def _escalate_after_error(e, model, last):
+    """A lower tier failed: try the next one? A model the endpoint doesn't serve also cools down."""
+    if last or isinstance(e, DeadlineExceeded):
+        return False
+    if getattr(e, "status", None) == 404:
+        CASCADE_STATS.cool_down(model)
+    return True
+
+
+def cascade_ask(pool, site, prompt, deadline=None, **ask_kwargs):
+    """pool.ask() routed through `site`'s tiers → reply text of the first accepted tier."""
+    models, accept = _plan(site)
+    fallback = None
+    for i, model in enumerate(models):
+        last = i == len(models) - 1
+        started = time.time()
+        try:
+            text = pool.ask(prompt, deadline=deadline, model=model, **ask_kwargs)
+        except Exception as e:
+            CASCADE_STATS.record(site, model, time.time() - started, prompt, outcome="errors")
+            if not _escalate_after_error(e, model, last):
+                if fallback is not None:
+                    return fallback
+                raise
+            log.warning("[CASCADE] ⚠️ %s: %s failed (%s) → escalating", site, model, e)
+            continue
+        ok = last or accept(text)
+        CASCADE_STATS.record(site, model, time.time() - started, prompt, text,
+                             outcome="accepted" if ok else "escalated")
+        if ok:
+            return text
+        if not _may_escalate(deadline):
+            return text
+        log.info("[CASCADE] ⬆️ %s: %s reply not accepted → %s", site, model, models[i + 1])
+        fallback = text
+    return fallback
+
+
+async def acascade_ask(pool, site, prompt, deadline=None, **ask_kwargs):
+    """Async cascade_ask() over an AsyncGeminiPool."""
+    models, accept = _plan(site)
+    fallback = None
+    for i, model in enumerate(models):
+        last = i == len(models) - 1
+        started = time.time()
+        try:
+            text = await pool.ask(prompt, deadline=deadline, model=model, **ask_kwargs)
+        except Exception as e:
+            CASCADE_STATS.record(site, model, time.time() - started, prompt, outcome="errors")
+            if not _escalate_after_error(e, model, last):
+                if fallback is not None:
+                    return fallback
+                raise
+            log.warning("[CASCADE] ⚠️ %s: %s failed (%s) → escalating", site, model, e)
+            continue
+        ok = last or accept(text)
+        CASCADE_STATS.record(site, model, time.time() - started, prompt, text,
+                             outcome="accepted" if ok else "escalated")
+        if ok:
+            return text
+        if not _may_escalate(deadline):
+            return text
+        log.info("[CASCADE] ⬆️ %s: %s reply not accepted → %s", site, model, models[i + 1])
+        fallback = text
+    return fallback
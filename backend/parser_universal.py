@@ -2,19 +2,23 @@
 import ast, json
 from typing import Any, Dict, List
 
+from backend.log import get_logger, make_trace, clip
+
+log = get_logger(__name__)
+trace = make_trace(__name__)   # per-node lines: TRACE level, sampled
+
 def translate_code(code: str, concept: str = "generic") -> Dict[str, Any]:
-    print("\n🧠 [UNIVERSAL-DEBUG] --- Starting Universal Translation ---")
-    print(f"[UNIVERSAL-DEBUG] Concept received → {concept}")
-    print(f"[UNIVERSAL-DEBUG] Raw code:\n{code}\n")
+    log.debug("🧠 [UNIVERSAL-DEBUG] --- Starting Universal Translation --- concept → %s", concept)
+    trace("[UNIVERSAL-DEBUG] Raw code:\n%s", clip(code, 2000))
 
     if not code.strip():
         return {"concept": concept, "steps": []}
 
     try:
         tree = ast.parse(code)
-        print("[UNIVERSAL-DEBUG] ✅ AST parsed successfully.")
+        trace("[UNIVERSAL-DEBUG] ✅ AST parsed successfully.")
     except Exception as e:
-        print(f"[UNIVERSAL-DEBUG] ❌ AST parse failed: {e}")
+        log.debug("[UNIVERSAL-DEBUG] ❌ AST parse failed: %s", e)
         return {"concept": concept, "steps": [{"action": "error", "description": str(e)}]}
 
     steps: List[Dict[str, Any]] = []
@@ -49,7 +53,7 @@ def translate_code(code: str, concept: str = "generic") -> Dict[str, Any]:
                     val = value
                 vars_state[t] = val
             desc = f"Assigned {value} to {', '.join(targets)}"
-            print(f"[UNIVERSAL-DEBUG] ➕ {desc}")
+            trace("[UNIVERSAL-DEBUG] ➕ %s", desc)
             add_step("assign", desc)
 
         # ---------- For Loop ----------
@@ -60,7 +64,7 @@ def translate_code(code: str, concept: str = "generic") -> Dict[str, Any]:
                 iterable = list(eval(iterable_code, {}, vars_state))
             except Exception:
                 iterable = [iterable_code]
-            print(f"[UNIVERSAL-LOOP] 🔁 For-loop detected → {target} over {iterable}")
+            trace("[UNIVERSAL-LOOP] 🔁 For-loop detected → %s over %s", target, iterable)
 
             add_step("loop_enter", f"Starting loop over {iterable}")
 
@@ -84,7 +88,7 @@ def translate_code(code: str, concept: str = "generic") -> Dict[str, Any]:
                             else:
                                 vars_state[list_obj] = [arg_val]
                             desc = f"Adding {arg_val} via append() to {list_obj}"
-                            print(f"[UNIVERSAL-LOOP] {desc}")
+                            trace("[UNIVERSAL-LOOP] %s", desc)
                             add_step("enqueue", desc, vars_state.copy(), value=arg_val)
 
                         # --- handle print(x)
@@ -118,8 +122,7 @@ def translate_code(code: str, concept: str = "generic") -> Dict[str, Any]:
     if not steps:
         add_step("note", "No major operation detected.")
 
-    print(f"[UNIVERSAL-DEBUG] ✅ Total steps generated: {len(steps)}")
-    print("[UNIVERSAL-DEBUG] --- Universal Translation Complete ---\n")
+    log.debug("[UNIVERSAL-DEBUG] ✅ Total steps generated: %d", len(steps))
 
         # ---------- Auto Meta Layout Detection ----------
     meta = {"layout": "linear", "theme": "neutral", "concept": concept}
@@ -136,7 +139,7 @@ def translate_code(code: str, concept: str = "generic") -> Dict[str, Any]:
     elif "sort" in code_lower:
         meta = {"layout": "grid", "theme": "softorange", "concept": "sort"}
 
-    print(f"[UNIVERSAL-META] 🧩 Auto meta detected → {meta}")
+    log.debug("[UNIVERSAL-META] 🧩 Auto meta detected → %s", meta)
 
     return {"concept": concept, "steps": steps, "meta": meta}
 
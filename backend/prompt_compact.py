@@ -0,0 +1,255 @@
+# backend/prompt_compact.py
+# Shrinks what we paste into Gemini prompts (prompt tokens drive latency and TPM quota).
+#   compact_source  → comments, docstrings and blank lines gone; long literals collapsed for
+#                     detection only (IR prompts keep every literal: they are the trace's data).
+#   skeleton        → detection-only outline: imports, signatures, loop / branch shapes and
+#                     container operations, with scalar bookkeeping and prints dropped.
+#   compact_json    → IR / step JSON without indentation.
+# Everything round-trips through ast.unparse, so the output is still valid Python; code that
+# does not parse only gets the comment / blank-line strip.
+import os
+import ast
+import json
+import threading
+
+from backend.key_scheduler import estimate_tokens
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+PROMPT_COMPACT = os.getenv("PROMPT_COMPACT", "1").strip().lower() not in ("0", "false", "no", "off")
+DETECT_LIST_MAX = int(os.getenv("PROMPT_DETECT_LIST_MAX", "6"))       # literal items kept for Gate-1/2
+STR_MAX = int(os.getenv("PROMPT_STR_MAX", "60"))                      # longer string literals are cut (detection)
+SKELETON_MIN_CHARS = int(os.getenv("PROMPT_SKELETON_MIN_CHARS", "1200"))  # shorter code is sent whole
+SKELETON_BLOCK_MAX = int(os.getenv("PROMPT_SKELETON_BLOCK_MAX", "8"))     # simple statements kept per block
+
+_CONTAINERS = (ast.List, ast.Tuple, ast.Set, ast.Dict, ast.ListComp, ast.DictComp, ast.SetComp)
+_NOISE_CALLS = {"print", "input", "len", "str", "int", "float", "format", "sleep"}
+
+
+class PromptStats:
+    """Before / after token estimates per prompt site (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites = {}
+
+    def record(self, site, before, after, mode):
+        with self._lock:
+            s = self._sites.setdefault(site, {"calls": 0, "tokens_before": 0, "tokens_after": 0,
+                                              "skeletons": 0, "unparsed": 0})
+            s["calls"] += 1
+            s["tokens_before"] += before
+            s["tokens_after"] += after
+            if mode == "skeleton":
+                s["skeletons"] += 1
+            elif mode == "text":
+                s["unparsed"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            out = {site: dict(s) for site, s in self._sites.items()}
+        for s in out.values():
+            saved = s["tokens_before"] - s["tokens_after"]
+            s["tokens_saved"] = saved
+            s["saved_ratio"] = round(saved / s["tokens_before"], 4) if s["tokens_before"] else 0.0
+        out["enabled"] = PROMPT_COMPACT
+        return out
+
+
+PROMPT_STATS = PromptStats()
+
+
+# -------------------------------------------------
+# Source compaction
+# -------------------------------------------------
+def _is_docstring(stmt):
+    return (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant)
+            and isinstance(stmt.value.value, str))
+
+
+class _Compactor(ast.NodeTransformer):
+    """Drops docstrings; with a `list_max`, also collapses long literal containers and strings."""
+
+    def __init__(self, list_max=None):
+        self.list_max = list_max
+
+    def _strip_doc(self, node):
+        self.generic_visit(node)
+        if node.body and _is_docstring(node.body[0]):
+            node.body = node.body[1:] or [ast.Pass()]
+        return node
+
+    visit_Module = visit_ClassDef = visit_FunctionDef = visit_AsyncFunctionDef = _strip_doc
+
+    def _collapse_seq(self, node):
+        self.generic_visit(node)
+        if self.list_max is None:
+            return node
+        if isinstance(getattr(node, "ctx", None), (ast.Load, type(None))) and len(node.elts) > self.list_max:
+            # keep the head + the tail element so shape and ordering stay visible
+            node.elts = node.elts[:self.list_max - 1] + [ast.Constant(...), node.elts[-1]]
+        return node
+
+    visit_List = visit_Tuple = visit_Set = _collapse_seq
+
+    def visit_Dict(self, node):
+        self.generic_visit(node)
+        if self.list_max is not None and len(node.keys) > self.list_max:
+            node.keys = node.keys[:self.list_max] + [ast.Constant("...")]
+            node.values = node.values[:self.list_max] + [ast.Constant(...)]
+        return node
+
+    def visit_Constant(self, node):
+        if self.list_max is not None and isinstance(node.value, str) and len(node.value) > STR_MAX:
+            return ast.Constant(node.value[:STR_MAX - 1] + "…")
+        return node
+
+    def visit_JoinedStr(self, node):
+        return node   # f-string parts must stay plain strings
+
+
+def _strip_text(code):
+    """Fallback for code that does not parse: drop blank and comment-only lines."""
+    return "\n".join(ln.rstrip() for ln in code.splitlines() if ln.strip() and not ln.lstrip().startswith("#"))
+
+
+def _parse(code):
+    try:
+        return ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+
+def compact_source(code, list_max=None):
+    """Source without comments, docstrings or blank lines; long literals collapsed when `list_max` is set."""
+    tree = _parse(code)
+    if tree is None:
+        return _strip_text(code)
+    try:
+        return ast.unparse(_Compactor(list_max).visit(tree))
+    except (ValueError, RecursionError):
+        return _strip_text(code)
+
+
+# -------------------------------------------------
+# Structural skeleton (detection prompts)
+# -------------------------------------------------
+def _call_name(call):
+    f = call.func
+    return f.attr if isinstance(f, ast.Attribute) else getattr(f, "id", "")
+
+
+def _does_work(node):
+    """Contains a call that is more than I/O or a conversion (push / pop / heappush / recursion …)."""
+    return any(isinstance(n, ast.Call) and _call_name(n) not in _NOISE_CALLS for n in ast.walk(node))
+
+
+def _structural(stmt):
+    """Is this simple statement worth keeping in the skeleton?"""
+    if isinstance(stmt, (ast.Import, ast.ImportFrom, ast.Return, ast.Raise, ast.Global, ast.Nonlocal)):
+        return True
+    if isinstance(stmt, ast.Expr):
+        return isinstance(stmt.value, (ast.Yield, ast.YieldFrom)) or _does_work(stmt.value)
+    if isinstance(stmt, (ast.Assign, ast.AugAssign, ast.AnnAssign)):
+        targets = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+        if any(isinstance(t, (ast.Attribute, ast.Subscript, ast.Tuple)) for t in targets):
+            return True   # pointer / slot updates, swaps
+        return isinstance(stmt.value, _CONTAINERS) or (stmt.value is not None and _does_work(stmt.value))
+    return False
+
+
+def _placeholder(body):
+    return (len(body) == 1 and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant) and body[0].value.value is ...)
+
+
+def _prune(body):
+    kept, seen, simple = [], set(), 0
+    for stmt in body:
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            stmt.body = _prune(stmt.body)
+        elif isinstance(stmt, (ast.With, ast.AsyncWith)):
+            stmt.body = _prune(stmt.body)
+        elif isinstance(stmt, (ast.For, ast.AsyncFor, ast.While, ast.If)):
+            stmt.body = _prune(stmt.body)
+            orelse = _prune(stmt.orelse) if stmt.orelse else []
+            stmt.orelse = [] if _placeholder(orelse) else orelse
+        elif isinstance(stmt, ast.Try):
+            stmt.body = _prune(stmt.body)
+            stmt.orelse, stmt.finalbody = [], []
+            for handler in stmt.handlers:
+                handler.body = [ast.Expr(ast.Constant(...))]
+        elif not _structural(stmt):
+            continue
+        else:
+            key = ast.dump(stmt)
+            if key in seen:
+                continue   # identical pushes / pops in a row say nothing new
+            seen.add(key)
+            simple += 1
+            if simple > SKELETON_BLOCK_MAX:
+                if simple == SKELETON_BLOCK_MAX + 1:
+                    kept.append(ast.Expr(ast.Constant(...)))
+                continue
+        kept.append(stmt)
+    return kept or [ast.Expr(ast.Constant(...))]
+
+
+def skeleton(code, list_max=DETECT_LIST_MAX):
+    """Outline for concept detection, or None when the code does not parse."""
+    tree = _parse(code)
+    if tree is None:
+        return None
+    try:
+        tree = _Compactor(list_max).visit(tree)
+        tree.body = _prune(tree.body)
+        return ast.unparse(ast.fix_missing_locations(tree))
+    except (ValueError, RecursionError):
+        return None
+
+
+# -------------------------------------------------
+# Prompt-site helpers
+# -------------------------------------------------
+def _report(site, original, compacted, mode):
+    before, after = estimate_tokens(original), estimate_tokens(compacted)
+    PROMPT_STATS.record(site, before, after, mode)
+    if after < before:
+        log.debug("[PROMPT] ✂️ %s: ~%s → ~%s tokens (%s, -%s%%)", site, before, after, mode, 100 * (before - after) // before)
+
+
+def for_detection(code, site="gate1"):
+    """Code as sent to Gate-1 / Gate-2: compacted, or its skeleton when still long."""
+    if not PROMPT_COMPACT:
+        return code
+    compacted, mode = compact_source(code, DETECT_LIST_MAX), "compact"
+    if _parse(code) is None:
+        mode = "text"
+    elif len(compacted) > SKELETON_MIN_CHARS:
+        outline = skeleton(code)
+        if outline and len(outline) < len(compacted):
+            compacted, mode = outline, "skeleton"
+    _report(site, code, compacted, mode)
+    return compacted
+
+
+def for_ir(code, site="ir"):
+    """Code as sent to IR reconstruction: full logic and every literal, minus comments / docstrings."""
+    if not PROMPT_COMPACT:
+        return code
+    compacted = compact_source(code)
+    _report(site, code, compacted, "compact" if _parse(code) is not None else "text")
+    return compacted
+
+
+def compact_json(value, site=None):
+    """IR / step JSON for prompts: no indentation, no spaces after separators."""
+    if isinstance(value, str):
+        return value
+    if not PROMPT_COMPACT:
+        return json.dumps(value, indent=2)
+    text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    if site:
+        _report(site, json.dumps(value, indent=2), text, "json")
+    return text
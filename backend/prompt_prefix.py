@@ -0,0 +1,48 @@
+# backend/prompt_prefix.py
+# Static prompt prefixes (detector / refiner / planner instructions), always sent first.
+# Prompt builders register each static instruction block once and return a PrefixedPrompt:
+# a str whose value is the full prompt (so response cache, cassettes and token estimates are
+# unchanged) but which remembers where the static prefix ends. Keeping the static block ahead
+# of the variable part (code, steps, the pool's hint line goes in front of both) is what lets
+# Gemini's implicit prefix caching reuse it across requests. There is no explicit
+# cachedContents upload: our prefixes (~50–250 tokens) are far below its 1024-token minimum.
+from backend.key_scheduler import estimate_tokens
+
+# name → (prefix text, pool TAG)
+PREFIXES = {}
+
+
+def register_prefix(name, text, pool):
+    """Declare a static instruction block used by `pool`'s prompts; returns `name`."""
+    PREFIXES[name] = (text, pool.TAG)
+    return name
+
+
+class PrefixedPrompt(str):
+    """
+    Full prompt text = lead + prefix + suffix. `lead` is what the pool puts in front
+    (the "Hint: …" line).
+    """
+
+    def __new__(cls, name, suffix, lead=""):
+        obj = super().__new__(cls, lead + PREFIXES[name][0] + suffix)
+        obj.prefix_name = name
+        obj.suffix = suffix
+        obj.lead = lead
+        return obj
+
+    def with_lead(self, lead):
+        return PrefixedPrompt(self.prefix_name, self.suffix, lead=lead + self.lead)
+
+
+def with_hint(prompt, hint):
+    """Prepend the pool's hint line without losing the prefix split."""
+    if not hint:
+        return prompt
+    lead = f"Hint: {hint}\n\n"
+    return prompt.with_lead(lead) if isinstance(prompt, PrefixedPrompt) else lead + prompt
+
+
+def prefix_snapshot():
+    """Registered prefixes: owning pool + estimated tokens."""
+    return {name: {"pool": tag, "est_tokens": estimate_tokens(text)} for name, (text, tag) in PREFIXES.items()}
@@ -0,0 +1,203 @@
+# backend/singleflight.py
+# Request coalescing for /translate_one.
+# When a class submits the same program within seconds, only the first request (the
+# "leader") runs detection + IR + plan; identical concurrent requests wait for its
+# result (or its exception) instead of issuing their own Gemini calls. Requests only
+# coalesce within one deadline bucket (a 120s request doesn't take a 5s request's
+# degraded result) and a follower never waits longer than its own remaining budget.
+import os
+import copy
+import time
+import asyncio
+import hashlib
+import threading
+import weakref
+from dotenv import load_dotenv
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+load_dotenv()
+
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+try:
+    SINGLEFLIGHT_WAIT = float(os.getenv("SINGLEFLIGHT_WAIT", "90"))   # max seconds a follower waits
+except ValueError:
+    SINGLEFLIGHT_WAIT = 90.0
+
+
+def normalize_code(code):
+    """
+    Canonical form used for the coalescing key: unified newlines, no trailing
+    whitespace. Blank lines are kept so line numbers in the steps stay valid.
+    """
+    lines = (code or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def request_key(code, **options):
+    """sha256 of the normalized code + the options that change the result."""
+    h = hashlib.sha256(normalize_code(code).encode("utf-8"))
+    for name in sorted(options):
+        h.update(f"\x00{name}={options[name]!r}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class FlightStats:
+    """Counters shared by the sync and async groups (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._c = {
+            "leaders": 0,           # requests that actually ran the pipeline
+            "coalesced": 0,         # requests answered by another request's run
+            "wait_timeouts": 0,     # followers that gave up waiting and ran it themselves
+            "shared_errors": 0,     # followers that received the leader's exception
+            "in_flight": 0,
+            "saved_seconds": 0.0,   # pipeline time followers didn't have to spend
+        }
+
+    def add(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items():
+                self._c[k] += v
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self._c)
+        total = out["leaders"] + out["coalesced"]
+        out["coalesce_rate"] = round(out["coalesced"] / total, 4) if total else 0.0
+        out["saved_seconds"] = round(out["saved_seconds"], 3)
+        out["enabled"] = SINGLEFLIGHT_ENABLED
+        out["max_wait"] = SINGLEFLIGHT_WAIT
+        return out
+
+
+FLIGHT_STATS = FlightStats()
+
+
+# -------------------------------------------------
+# Thread-based group (Flask / gunicorn threads)
+# -------------------------------------------------
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.elapsed = 0.0
+
+
+class SingleFlight:
+    def __init__(self, name, wait=SINGLEFLIGHT_WAIT, enabled=SINGLEFLIGHT_ENABLED):
+        self.name = name
+        self.wait = wait
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, wait=None):
+        """
+        Run fn() once per key among concurrent callers → (result, shared).
+        Followers get a deep copy of the leader's result, or its exception re-raised;
+        they wait at most `wait` seconds (their own remaining budget), capped at self.wait.
+        """
+        if not self.enabled:
+            return fn(), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            return self._lead(key, call, fn), False
+
+        wait = self.wait if wait is None else min(self.wait, wait)
+        log.debug("🤝 [SINGLEFLIGHT:%s] Identical request in flight (%s) → waiting", self.name, key[:10])
+        if not call.done.wait(wait):
+            FLIGHT_STATS.add(wait_timeouts=1)
+            log.info("⌛ [SINGLEFLIGHT:%s] Waited %gs → running it myself", self.name, wait)
+            return fn(), False
+
+        if call.error is not None:
+            FLIGHT_STATS.add(shared_errors=1)
+            raise call.error
+        FLIGHT_STATS.add(coalesced=1, saved_seconds=call.elapsed)
+        return copy.deepcopy(call.result), True
+
+    def _lead(self, key, call, fn):
+        FLIGHT_STATS.add(leaders=1, in_flight=1)
+        started = time.time()
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.elapsed = time.time() - started
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+            FLIGHT_STATS.add(in_flight=-1)
+
+
+# -------------------------------------------------
+# Event-loop group (ASGI mode)
+# -------------------------------------------------
+class AsyncSingleFlight:
+    """
+    Async twin: the leader's pipeline runs as a shielded task, so a client that
+    disconnects doesn't cancel the work its followers are waiting on.
+    """
+
+    def __init__(self, name, wait=SINGLEFLIGHT_WAIT, enabled=SINGLEFLIGHT_ENABLED):
+        self.name = name
+        self.wait = wait
+        self.enabled = enabled
+        self._tasks = weakref.WeakKeyDictionary()   # loop -> {key: task}
+
+    async def do(self, key, fn, wait=None):
+        if not self.enabled:
+            return await fn(), False
+
+        tasks = self._tasks.setdefault(asyncio.get_running_loop(), {})
+        task = tasks.get(key)
+        if task is None:
+            tasks[key] = task = asyncio.ensure_future(self._lead(fn))
+            task.add_done_callback(lambda t: tasks.pop(key, None) if tasks.get(key) is t else None)
+            result, _ = await asyncio.shield(task)
+            return result, False
+
+        wait = self.wait if wait is None else min(self.wait, wait)
+        log.debug("🤝 [SINGLEFLIGHT:%s] Identical request in flight (%s) → waiting", self.name, key[:10])
+        try:
+            result, elapsed = await asyncio.wait_for(asyncio.shield(task), wait)
+        except asyncio.TimeoutError:
+            FLIGHT_STATS.add(wait_timeouts=1)
+            log.info("⌛ [SINGLEFLIGHT:%s] Waited %gs → running it myself", self.name, wait)
+            return await fn(), False
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            FLIGHT_STATS.add(shared_errors=1)
+            raise
+        FLIGHT_STATS.add(coalesced=1, saved_seconds=elapsed)
+        return copy.deepcopy(result), True
+
+    @staticmethod
+    async def _lead(fn):
+        FLIGHT_STATS.add(leaders=1, in_flight=1)
+        started = time.time()
+        try:
+            return await fn(), time.time() - started
+        finally:
+            FLIGHT_STATS.add(in_flight=-1)
+
+
+# -------------------------------------------------
+# Global groups for /translate_one
+# -------------------------------------------------
+TRANSLATE_FLIGHT = SingleFlight("translate_one")
+ASYNC_TRANSLATE_FLIGHT = AsyncSingleFlight("translate_one")
@@ -33,15 +33,18 @@ payload = translate_segments(
     postprocess_queue_linear_fn=_guarantee_queue_linear_steps,  # from your app.py
 )
 """
-from backend.gemini_manager import GeminiKeyManager
-
-manager = GeminiKeyManager()
-
 from __future__ import annotations
 import re
-import json
 from typing import Callable, Dict, List, Optional
 
+from backend.gemini_manager import DETECT_POOL
+from backend.llm_schemas import SPLIT_SCHEMA, MAX_TOKENS
+from backend.json_repair import repair_json
+from backend.model_cascade import cascade_ask
+
+# Key manager → the shared detection pool (GEMINI_KEYS), not a second scheduler
+manager = DETECT_POOL
+
 # -----------------------------
 # Regex detectors (context-aware)
 # -----------------------------
@@ -198,13 +201,11 @@ def llm_split_call(code: str, *, api_key: Optional[str] = None, model: str = "ge
     prompt = f"{GEMINI_SYSTEM}\n\n{user_msg}"
 
     # Ask Gemini through KeyManager
-    raw_text = manager.ask(prompt)
+    raw_text = cascade_ask(manager, "split", prompt, schema=SPLIT_SCHEMA, max_tokens=MAX_TOKENS["split"])
 
     # Clean and parse JSON
-    import re, json
-    cleaned = re.sub(r"```(?:json)?|```", "", raw_text, flags=re.I).strip()
     try:
-        return json.loads(cleaned)
+        return repair_json(raw_text, expect="object", key="segments")
     except Exception as e:
         raise RuntimeError(f"❌ Gemini returned invalid JSON: {raw_text}") from e
 
@@ -0,0 +1,120 @@
+# backend/speculative_gates.py
+# Opt-in speculative concept detection: Gate-1 (strict) and Gate-2 (open) fire together.
+# When Gate-1 names a canonical family, Gate-2 is cancelled (if still queued) or discarded.
+# Stats show whether the saved latency on unknown code is worth the wasted Gate-2 calls.
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+SPECULATIVE_GATES = os.getenv("SPECULATIVE_GATES", "0").strip().lower() in ("1", "true", "yes", "on")
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SPECULATIVE_GATE_WORKERS", "8")),
+    thread_name_prefix="gate2-spec",
+)
+
+
+class SpeculationStats:
+    """Counters for speculative Gate-2 calls (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._c = {
+            "speculations": 0,          # requests that fired both gates
+            "gate2_used": 0,            # Gate-1 said unknown → Gate-2 answer was needed
+            "gate2_cancelled": 0,       # Gate-1 known, Gate-2 never started
+            "gate2_wasted_calls": 0,    # Gate-1 known, Gate-2 already in flight → discarded
+            "gate2_wasted_seconds": 0.0,
+            "latency_saved_seconds": 0.0,
+        }
+
+    def add(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items():
+                self._c[k] += v
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self._c)
+        n = out["speculations"]
+        out["gate2_used_rate"] = round(out["gate2_used"] / n, 4) if n else 0.0
+        out["waste_rate"] = round(out["gate2_wasted_calls"] / n, 4) if n else 0.0
+        out["avg_saved_per_used"] = round(out["latency_saved_seconds"] / out["gate2_used"], 3) if out["gate2_used"] else 0.0
+        out["latency_saved_seconds"] = round(out["latency_saved_seconds"], 3)
+        out["gate2_wasted_seconds"] = round(out["gate2_wasted_seconds"], 3)
+        out["enabled_by_default"] = SPECULATIVE_GATES
+        return out
+
+
+SPEC_STATS = SpeculationStats()
+
+
+def _timed(fn, code):
+    started = time.time()
+    result = fn(code)
+    return result, time.time() - started
+
+
+def speculative_detect(code, gate1_fn, gate2_fn, merge_fn):
+    """Run Gate-1 inline and Gate-2 on the speculation pool; returns the merged concept result."""
+    SPEC_STATS.add(speculations=1)
+    started = time.time()
+    gate2_future = _executor.submit(_timed, gate2_fn, code)
+
+    concept_result = gate1_fn(code)
+    gate1_elapsed = time.time() - started
+
+    if concept_result.get("concept") != "unknown":
+        if gate2_future.cancel():
+            SPEC_STATS.add(gate2_cancelled=1)
+        else:
+            SPEC_STATS.add(gate2_wasted_calls=1)
+            gate2_future.add_done_callback(
+                lambda f: SPEC_STATS.add(gate2_wasted_seconds=f.result()[1] if not f.exception() else 0.0)
+            )
+        log.debug("🎲 [SPECULATE] Gate-1 known (%s) → Gate-2 discarded", concept_result.get('concept'))
+        return concept_result
+
+    gate2, gate2_elapsed = gate2_future.result()
+    # serial cost would have been gate1 + gate2; in parallel we paid max(gate1, gate2)
+    saved = min(gate1_elapsed, gate2_elapsed)
+    SPEC_STATS.add(gate2_used=1, latency_saved_seconds=saved)
+    log.debug("🎲 [SPECULATE] Gate-1 unknown → using speculative Gate-2 (saved %.2fs)", saved)
+    return merge_fn(concept_result, gate2)
+
+
+async def speculative_detect_async(code, gate1_fn, gate2_fn, merge_fn):
+    """Async twin: Gate-2 runs as a task and is truly cancelled when Gate-1 is known."""
+    SPEC_STATS.add(speculations=1)
+    started = time.time()
+
+    async def _gate2():
+        t = time.time()
+        return await gate2_fn(code), time.time() - t
+
+    gate2_task = asyncio.ensure_future(_gate2())
+    # yield once so Gate-2's request is actually on the wire alongside Gate-1
+    await asyncio.sleep(0)
+
+    concept_result = await gate1_fn(code)
+    gate1_elapsed = time.time() - started
+
+    if concept_result.get("concept") != "unknown":
+        if gate2_task.done():
+            SPEC_STATS.add(gate2_wasted_calls=1, gate2_wasted_seconds=gate2_task.result()[1])
+        else:
+            gate2_task.cancel()
+            SPEC_STATS.add(gate2_wasted_calls=1, gate2_wasted_seconds=gate1_elapsed)
+        log.debug("🎲 [SPECULATE] Gate-1 known (%s) → Gate-2 cancelled", concept_result.get('concept'))
+        return concept_result
+
+    gate2, gate2_elapsed = await gate2_task
+    saved = min(gate1_elapsed, gate2_elapsed)
+    SPEC_STATS.add(gate2_used=1, latency_saved_seconds=saved)
+    log.debug("🎲 [SPECULATE] Gate-1 unknown → using speculative Gate-2 (saved %.2fs)", saved)
+    return merge_fn(concept_result, gate2)
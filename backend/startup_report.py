@@ -0,0 +1,86 @@
+# backend/startup_report.py
+# Import-time breakdown for worker cold starts. BOOT_TIMER.install() wraps __import__ so
+# every first-time import is timed (cumulative and self time, nested imports subtracted);
+# finish() logs the slowest modules once the app is wired up. Imports that happen after
+# boot — translators, SDKs and pools loaded lazily on first use — are listed separately, so
+# the report shows what was moved off the startup path. STARTUP_REPORT=0 disables it.
+import os
+import sys
+import time
+import builtins
+import threading
+from backend.log import get_logger
+
+log = get_logger(__name__)
+
+STARTUP_REPORT = os.getenv("STARTUP_REPORT", "1").strip().lower() not in ("0", "false", "no", "off")
+STARTUP_REPORT_TOP = int(os.getenv("STARTUP_REPORT_TOP", "15"))   # modules printed at boot
+
+
+class BootTimer:
+    """First-import timings per module (thread-safe), split into boot vs. after boot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()     # per-thread stack of child import time
+        self._original = None
+        self.started = time.perf_counter()
+        self.ready_at = None                # perf_counter() of the last finish()
+        self._boot = {}                     # module → (cumulative, self) seconds
+        self._later = {}
+
+    def install(self):
+        if not STARTUP_REPORT or self._original is not None:
+            return
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                bucket = self._later if self.ready_at is not None else self._boot
+                bucket[name] = (elapsed, elapsed - children)
+
+    def finish(self, label="app"):
+        """Mark the end of boot and log the slowest imports."""
+        if not STARTUP_REPORT:
+            return
+        with self._lock:
+            self.ready_at = time.perf_counter()
+        report = self.snapshot()
+        log.info("🚀 [STARTUP] %s ready in %.0fms (%s modules imported)",
+                 label, report['boot_seconds'] * 1000, report['imports'])
+        for row in report["slowest"][:STARTUP_REPORT_TOP]:
+            log.info("    %8.1fms self %8.1fms total  %s", row['self_ms'], row['cumulative_ms'], row['module'])
+
+    @staticmethod
+    def _rows(timings):
+        rows = [{"module": name, "cumulative_ms": round(total * 1000, 2), "self_ms": round(own * 1000, 2)}
+                for name, (total, own) in timings.items()]
+        return sorted(rows, key=lambda r: r["self_ms"], reverse=True)
+
+    def snapshot(self):
+        with self._lock:
+            boot, later, ready_at = dict(self._boot), dict(self._later), self.ready_at
+        return {
+            "enabled": STARTUP_REPORT,
+            "boot_seconds": round(((ready_at or time.perf_counter()) - self.started), 4),
+            "ready": ready_at is not None,
+            "imports": len(boot),
+            "slowest": self._rows(boot),
+            "after_boot": self._rows(later),   # lazily loaded on first use
+        }
+
+
+BOOT_TIMER = BootTimer()
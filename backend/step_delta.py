@@ -0,0 +1,232 @@
+# backend/step_delta.py
+# Keyframe + delta encoding of step traces (opt-in per request: "step_encoding": "delta").
+# Translators repeat the whole structure in every step (sort's vars.arr / set_array,
+# stack / queue / heap copies, linked-list list_state), so a full trace is O(steps × n).
+# Encoded, every list-valued field (top level, or one level down such as vars.arr) is
+# lifted out of the steps:
+#   - every KEYFRAME_INTERVAL-th step carries the full value of each field → "_keyframe"
+#   - the others carry only what changed since the previous step → "_delta", as small ops:
+#       ["swap", i, j]  ["set", i, v]  ["push", v]  ["pop"]  ["unshift", v]  ["shift"]
+#       ["=", full value]  ["from", other path] (the other field's value in the previous step)
+#       ["del"] (field absent from this step)
+#     a field that didn't change is simply not mentioned (it carries over).
+# Any step can be rebuilt from the nearest keyframe at or before it; the trace becomes
+# roughly O(steps + n). Decoders: decode_steps() here, src/api/stepDelta.js in the frontend.
+# Every encoded segment says what it is: "step_encoding": {"format", "version", "keyframe_interval"}.
+import os
+from itertools import compress
+from operator import ne
+
+FORMAT = "keyframe-delta"
+VERSION = 1
+VERSIONS = (1,)
+
+try:
+    KEYFRAME_INTERVAL = max(1, int(os.getenv("STEP_KEYFRAME_INTERVAL", "50")))
+except ValueError:
+    KEYFRAME_INTERVAL = 50
+
+KEYFRAME = "_keyframe"
+DELTA = "_delta"
+_CONTAINERS = {list, dict}
+
+
+def requested_encoding(data):
+    """Request body → VERSION to encode with, or None for the plain (full-state) steps."""
+    name = str(data.get("step_encoding") or "full").strip().lower()
+    if name == "full":
+        return None
+    if name != "delta":
+        raise ValueError(f"step_encoding must be 'full' or 'delta', got {name!r}")
+    try:
+        version = int(data.get("step_encoding_version", VERSION))
+    except (TypeError, ValueError):
+        version = None
+    if version not in VERSIONS:
+        raise ValueError(f"step_encoding_version {data.get('step_encoding_version')!r} not supported "
+                         f"(supported: {', '.join(map(str, VERSIONS))})")
+    return version
+
+
+# -------------------------------------------------
+# Encoding
+# -------------------------------------------------
+def _same(a, b):
+    """Equal on the wire: 1 == True == 1.0 in Python, not in JSON (element types compared in C)."""
+    if type(a) is not type(b) or a != b:
+        return False
+    if isinstance(a, list):
+        kinds = set(map(type, a))
+        if len(kinds) == 1:                     # the usual case: all ints, all dicts …
+            if kinds != set(map(type, b)):
+                return False
+        elif list(map(type, a)) != list(map(type, b)):
+            return False
+        return not _CONTAINERS & kinds or all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict):
+        return all(_same(v, b[k]) for k, v in a.items())
+    return True
+
+
+def _tracked(step):
+    """Lift list-valued fields out of a step → (rest of the step, {path: value}).
+    Only string keys make paths; anything else (graph IRs' int node ids) stays in place."""
+    rest, state = {}, {}
+    for key, value in step.items():
+        if isinstance(value, list) and isinstance(key, str) and "." not in key:
+            state[key] = value
+        elif isinstance(value, dict) and isinstance(key, str) and "." not in key:
+            inner = {}
+            for k, v in value.items():
+                if isinstance(v, list) and isinstance(k, str) and "." not in k:
+                    state[f"{key}.{k}"] = v
+                else:
+                    inner[k] = v
+            rest[key] = inner
+        else:
+            rest[key] = value
+    return rest, state
+
+
+def _replace(new, prev):
+    """A whole new value: a copy of some field of the previous step (set_array's `array` is
+    usually vars.arr), else the value itself."""
+    for path, value in prev.items():
+        if _same(value, new):
+            return [["from", path]]
+    return [["=", new]]
+
+
+def _diff(old, new, prev):
+    """Ops turning list `old` into `new` (falls back to a whole value when that's as small)."""
+    if len(new) == len(old):
+        kinds = set(map(type, old)) | set(map(type, new))
+        if len(kinds) == 1 and not _CONTAINERS & kinds:
+            changed = list(compress(range(len(new)), map(ne, old, new)))   # flat, one type → all in C
+        else:
+            changed = [i for i, (a, b) in enumerate(zip(old, new)) if not _same(a, b)]
+        if len(changed) == 2:
+            i, j = changed
+            if _same(old[i], new[j]) and _same(old[j], new[i]):
+                return [["swap", i, j]]
+        if len(changed) * 3 < len(new):
+            return [["set", i, new[i]] for i in changed]
+    elif len(new) == len(old) + 1:
+        if all(_same(a, b) for a, b in zip(old, new)):
+            return [["push", new[-1]]]
+        if all(_same(a, b) for a, b in zip(old, new[1:])):
+            return [["unshift", new[0]]]
+    elif len(new) == len(old) - 1:
+        if all(_same(a, b) for a, b in zip(new, old)):
+            return [["pop"]]
+        if all(_same(a, b) for a, b in zip(new, old[1:])):
+            return [["shift"]]
+    return _replace(new, prev)
+
+
+def encode_steps(steps, interval=None):
+    """Full-state steps → keyframe + delta steps (the input is not modified)."""
+    interval = interval or KEYFRAME_INTERVAL
+    out, prev = [], {}
+    for n, step in enumerate(steps):
+        if not isinstance(step, dict):
+            out.append(step)
+            continue
+        rest, state = _tracked(step)
+        if n % interval == 0:
+            rest[KEYFRAME] = state   # even when empty: it resets what decoders carry over
+        else:
+            delta = {}
+            for path, value in state.items():
+                if path not in prev:
+                    delta[path] = _replace(value, prev)
+                elif not _same(prev[path], value):
+                    delta[path] = _diff(prev[path], value, prev)
+            for path in prev.keys() - state.keys():
+                delta[path] = [["del"]]
+            if delta:
+                rest[DELTA] = delta
+        out.append(rest)
+        prev = state
+    return out
+
+
+def encode_payload_steps(payload, version=VERSION, interval=None):
+    """Copy of a translate payload ({"segments": [...]}) with every segment's steps encoded."""
+    if not isinstance(payload, dict) or not isinstance(payload.get("segments"), list):
+        return payload
+    interval = interval or KEYFRAME_INTERVAL
+    segments = []
+    for seg in payload["segments"]:
+        if isinstance(seg, dict) and isinstance(seg.get("steps"), list):
+            seg = {**seg, "steps": encode_steps(seg["steps"], interval),
+                   "step_encoding": {"format": FORMAT, "version": version, "keyframe_interval": interval}}
+        segments.append(seg)
+    return {**payload, "segments": segments}
+
+
+def encode_batch_steps(result, version=VERSION, interval=None):
+    """encode_payload_steps() over every item of a /translate_batch result."""
+    return {**result, "results": [
+        {**r, "payload": encode_payload_steps(r["payload"], version, interval)} if r.get("ok") else r
+        for r in result.get("results", [])
+    ]}
+
+
+# -------------------------------------------------
+# Decoding (reference for the frontend's stepDelta.js; used to verify round trips)
+# -------------------------------------------------
+def _apply(value, ops, prev):
+    for op in ops:
+        kind = op[0]
+        if kind == "=":
+            value = op[1]
+        elif kind == "from":
+            value = prev[op[1]]
+        elif kind == "del":
+            value = None
+        else:
+            value = list(value)
+            if kind == "swap":
+                value[op[1]], value[op[2]] = value[op[2]], value[op[1]]
+            elif kind == "set":
+                value[op[1]] = op[2]
+            elif kind == "push":
+                value.append(op[1])
+            elif kind == "pop":
+                value.pop()
+            elif kind == "unshift":
+                value.insert(0, op[1])
+            elif kind == "shift":
+                value.pop(0)
+            else:
+                raise ValueError(f"unknown step delta op {kind!r}")
+    return value
+
+
+def decode_steps(steps):
+    """Keyframe + delta steps → full-state steps."""
+    out, state = [], {}
+    for step in steps:
+        if not isinstance(step, dict):
+            out.append(step)
+            continue
+        step = dict(step)
+        if KEYFRAME in step:
+            state = dict(step.pop(KEYFRAME))
+        elif DELTA in step:
+            prev, state = state, dict(state)
+            for path, ops in step.pop(DELTA).items():
+                value = _apply(prev.get(path), ops, prev)
+                if value is None:
+                    state.pop(path, None)
+                else:
+                    state[path] = value
+        for path, value in state.items():
+            key, _, inner = path.partition(".")
+            if inner:
+                step[key] = {**step.get(key, {}), inner: value}
+            else:
+                step[key] = value
+        out.append(step)
+    return out
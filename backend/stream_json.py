@@ -0,0 +1,108 @@
+# backend/stream_json.py
+# Incremental JSON scanner for streamed IR replies.
+# Gemini streams {"steps":[{...},{...},...],"meta":{...}} in arbitrary text chunks;
+# feed() returns each element of steps[] as soon as its closing brace arrives, so the
+# first frames can be rendered while the rest of the IR is still being generated.
+import json
+
+
+class IncrementalStepParser:
+    """
+    Single forward pass over the reply text (O(n) overall, state kept between feeds).
+    Tolerates code fences / prose around the JSON: only braces, brackets and strings
+    are tracked. Elements that don't parse on their own are skipped and counted.
+    """
+
+    def __init__(self, key="steps"):
+        self.key = key
+        self._chunks = []         # everything received so far (final parse uses it)
+        self._buf = ""            # unscanned tail + any element/string still open
+        self.steps = []           # elements emitted so far
+        self.skipped = 0
+        self._pos = 0
+        self._stack = []          # open containers: "{" / "["
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_string = None  # last complete string literal (candidate object key)
+        self._after_key = False   # saw `"steps"` followed by ':'
+        self._array_depth = None  # stack depth of the steps[] array once found
+        self._elem_start = None
+        self.done = False         # steps[] closed
+
+    def feed(self, chunk):
+        """Append a text chunk; return the list of step dicts completed by it."""
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        out = []
+        text = self._buf + chunk
+        i = self._pos
+        n = len(text)
+        while i < n and not self.done:
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1:i]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+                self._after_key = False
+            elif ch == ":":
+                # only the top-level object's key: a nested "steps" (meta.steps …) is just data
+                self._after_key = (self._last_string == self.key and self._array_depth is None
+                                   and len(self._stack) == 1)
+            elif ch in "{[":
+                if ch == "[" and self._after_key:
+                    self._array_depth = len(self._stack) + 1
+                elif ch == "{" and self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._elem_start = i
+                self._stack.append(ch)
+                self._after_key = False
+                self._last_string = None
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                depth = len(self._stack)
+                if ch == "}" and self._elem_start is not None and depth == self._array_depth:
+                    self._emit(text[self._elem_start:i + 1], out)
+                    self._elem_start = None
+                elif ch == "]" and self._array_depth is not None and depth == self._array_depth - 1:
+                    self.done = True
+                self._after_key = False
+            elif not ch.isspace():
+                if ch != ",":
+                    self._after_key = False
+            i += 1
+        # keep only what an open element / string still needs → scanning stays linear
+        keep = i
+        if self._elem_start is not None:
+            keep = min(keep, self._elem_start)
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        self._buf = text[keep:]
+        self._pos = i - keep
+        if self._elem_start is not None:
+            self._elem_start -= keep
+        if self._in_string:
+            self._string_start -= keep
+        return out
+
+    @property
+    def text(self):
+        return "".join(self._chunks)
+
+    def _emit(self, raw, out):
+        try:
+            step = json.loads(raw)
+        except ValueError:
+            self.skipped += 1
+            return
+        if isinstance(step, dict):
+            self.steps.append(step)
+            out.append(step)
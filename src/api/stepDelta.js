@@ -0,0 +1,93 @@
+// src/api/stepDelta.js
+// Decoder for the keyframe + delta step encoding (backend/step_delta.py), requested with
+// { step_encoding: "delta" } in the translate request body. Segments encoded this way carry
+// step_encoding: { format: "keyframe-delta", version: 1, keyframe_interval }.
+// Array fields are lifted out of the steps: "_keyframe" steps hold their full values, the
+// others an "_delta" of ops against the previous step. Unchanged arrays are shared between
+// consecutive decoded steps — treat them as read-only.
+
+export const STEP_ENCODING_FORMAT = "keyframe-delta";
+export const STEP_ENCODING_VERSIONS = [1];
+
+function applyOps(value, ops, prev) {
+  for (const op of ops) {
+    const [kind] = op;
+    if (kind === "=") value = op[1];
+    else if (kind === "from") value = prev[op[1]];
+    else if (kind === "del") value = undefined;
+    else {
+      value = value.slice();
+      if (kind === "swap") [value[op[1]], value[op[2]]] = [value[op[2]], value[op[1]]];
+      else if (kind === "set") value[op[1]] = op[2];
+      else if (kind === "push") value.push(op[1]);
+      else if (kind === "pop") value.pop();
+      else if (kind === "unshift") value.unshift(op[1]);
+      else if (kind === "shift") value.shift();
+      else throw new Error(`unknown step delta op ${kind}`);
+    }
+  }
+  return value;
+}
+
+function nextState(state, step) {
+  if (step._keyframe) return { ...step._keyframe };
+  if (!step._delta) return state;
+  const next = { ...state };
+  for (const [path, ops] of Object.entries(step._delta)) {
+    const value = applyOps(state[path], ops, state);
+    if (value === undefined) delete next[path];
+    else next[path] = value;
+  }
+  return next;
+}
+
+function materialize(step, state) {
+  const { _keyframe, _delta, ...out } = step;
+  for (const [path, value] of Object.entries(state)) {
+    const dot = path.indexOf(".");
+    if (dot === -1) out[path] = value;
+    else {
+      const key = path.slice(0, dot);
+      out[key] = { ...out[key], [path.slice(dot + 1)]: value };
+    }
+  }
+  return out;
+}
+
+// All steps of an encoded trace → full-state steps.
+export function decodeSteps(steps) {
+  let state = {};
+  return steps.map((step) => {
+    if (!step || typeof step !== "object") return step;
+    state = nextState(state, step);
+    return materialize(step, state);
+  });
+}
+
+// One step, replayed from the nearest keyframe at or before it (seeking without decoding all).
+export function decodeStepAt(steps, index) {
+  let start = index;
+  while (start > 0 && !steps[start]?._keyframe) start--;
+  let state = {};
+  for (let i = start; i <= index; i++) {
+    if (steps[i] && typeof steps[i] === "object") state = nextState(state, steps[i]);
+  }
+  return materialize(steps[index], state);
+}
+
+// A /translate_one payload (or a /translate_batch item's payload) → plain full-state steps.
+export function decodePayload(payload) {
+  if (!payload?.segments) return payload;
+  return {
+    ...payload,
+    segments: payload.segments.map((seg) => {
+      const enc = seg?.step_encoding;
+      if (!enc) return seg;
+      if (enc.format !== STEP_ENCODING_FORMAT || !STEP_ENCODING_VERSIONS.includes(enc.version)) {
+        throw new Error(`unsupported step encoding ${enc.format} v${enc.version}`);
+      }
+      const { step_encoding, ...rest } = seg;
+      return { ...rest, steps: decodeSteps(seg.steps) };
+    }),
+  };
+}
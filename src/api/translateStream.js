@@ -0,0 +1,46 @@
+// src/api/translateStream.js
+// Client for POST /translate_one/stream (NDJSON).
+// Calls onConcept / onStep as events arrive so the first frames can render while
+// Gemini is still generating; resolves with the final payload (same shape as
+// /translate_one). The final payload is authoritative — replace streamed steps with it.
+
+export async function translateOneStream(url, code, { onConcept, onStep, signal, speculative } = {}) {
+  const body = { code };
+  if (speculative !== undefined) body.speculative = speculative;
+
+  const res = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+    signal,
+  });
+  if (!res.ok || !res.body) throw new Error(`translate_one/stream failed (${res.status})`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let payload = null;
+
+  const handle = (line) => {
+    if (!line.trim()) return;
+    const event = JSON.parse(line);
+    if (event.event === "concept") onConcept?.(event);
+    else if (event.event === "step") onStep?.(event.step, event.index);
+    else if (event.event === "payload") payload = event.payload;
+  };
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buffer.indexOf("\n")) !== -1) {
+      handle(buffer.slice(0, nl));
+      buffer = buffer.slice(nl + 1);
+    }
+  }
+  handle(buffer + decoder.decode());
+
+  if (!payload) throw new Error("translate_one/stream ended without a payload");
+  return payload;
+}